@@ -31,49 +31,49 @@ class Tokenizer(Lexer):
 class Visitor(metaclass=multimeta):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     def accept(self, visitor: Visitor, *args, **kwargs):
         return visitor.visit(self, *args, **kwargs)
 
-@dataclass
+@dataclass(slots=True)
 class Statement(Node):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Node):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Literal(Expression):
     '''
     Una Constante como 2, 2.5, 'dos', Nil, True, False
     '''
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Location(Node):
     pass
 
 # Nodos Reales del AST
-@dataclass
+@dataclass(slots=True)
 class Number(Literal):
     value : float
 
-@dataclass
+@dataclass(slots=True)
 class SimpleLocation(Location):
     name : str
 
-@dataclass
+@dataclass(slots=True)
 class ReadLocation(Expression):
     location : Location
 
-@dataclass
+@dataclass(slots=True)
 class WriteLocation(Statement):
     location : Location
     expr     : Expression
 
-@dataclass
+@dataclass(slots=True)
 class Binop(Expression):
     '''
     Operador binario coom: +, -, *, /, ^
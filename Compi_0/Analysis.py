@@ -0,0 +1,275 @@
+# ----------------------------------------
+# Utilidades de analisis sobre el AST de LuaParser
+# ----------------------------------------
+from dataclasses import fields, is_dataclass
+from Parser import Name, Var, Number, Table, Binop, FunctionBody, DefFunction, Assignment
+
+# ----------------------------------------
+# Notas sobre el AST de LuaParser:
+#
+# - explist, varlist, namelist, params y fieldlist se construyen
+#   con reglas recursivas por la derecha, por eso quedan en orden
+#   inverso al del fuente. source_order() los devuelve al derecho.
+# - CallTable usado como valor es CallTable(field=clave, table=tabla),
+#   pero como destino de una asignacion es CallTable(field=tabla,
+#   table=clave).
+# - Los nombres con puntos (math.floor) llegan como un solo Name.
+# - Los argumentos de f{...} llegan como un Table en vez de una lista.
+# ----------------------------------------
+
+def source_order(nodes):
+    return list(reversed(nodes))
+
+def call_args(node):
+    '''
+    Arguments of a CallFunction, in source order.
+    '''
+    if isinstance(node.explist, Table):
+        return [node.explist]
+    return source_order(node.explist)
+
+def array_fields(table):
+    '''
+    Values of the Table {table} when its keys are the literals
+    1, 2, ..., n in that order, so the engines can build it as
+    the array part of a LuaTable. None otherwise.
+    '''
+    values = []
+    for index, data in enumerate(source_order(table.data), 1):
+        key = data.value
+        if key.__class__ is not Number or key.value.__class__ is not int or key.value != index:
+            return None
+        values.append(data.exp)
+    return values
+
+def concat_operands(node):
+    '''
+    Operands of the chain of .. that starts at {node}, in source
+    order: a .. b .. c is Binop(a, Binop(b, c)) and gives [a, b, c].
+    Parentheses are not kept in the AST, so (a .. b) .. c is
+    flattened too; the result is the same string.
+    '''
+    out = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is Binop and node.operator == '..':
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            out.append(node)
+    return out
+
+def children(node):
+    '''
+    Direct child nodes of {node} (lists are flattened).
+    '''
+    for f in fields(node):
+        value = getattr(node, f.name)
+        if isinstance(value, list):
+            for item in value:
+                if is_dataclass(item):
+                    yield item
+        elif is_dataclass(value):
+            yield value
+
+def walk(node):
+    '''
+    Every node below {node}, {node} included, in preorder.
+    '''
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        yield node
+        stack.extend(reversed(list(children(node))))
+
+def captured_names(stmtlist):
+    '''
+    Base names referenced from the functions nested in {stmtlist}.
+    Locals with one of these names may be captured as upvalues,
+    so the engines keep them in cells.
+    '''
+    out = set()
+    stack = list(stmtlist)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, FunctionBody):
+            for inner in walk(node):
+                if isinstance(inner, (Name, Var)):
+                    out.add(inner.value.split('.')[0])
+        else:
+            stack.extend(children(node))
+    return out
+
+# ----------------------------------------
+# Funciones puras
+# ----------------------------------------
+# Funciones de la biblioteca que no tienen efectos ni dependen
+# de estado (math.random si depende).
+PURE_BUILTINS = {
+    'type', 'tostring', 'tonumber', 'select', 'unpack', 'next', 'pairs', 'ipairs',
+    'math.abs', 'math.ceil', 'math.floor', 'math.sqrt', 'math.sin', 'math.cos',
+    'math.tan', 'math.exp', 'math.log', 'math.fmod', 'math.pow', 'math.max',
+    'math.min', 'math.pi', 'math.huge',
+    'string.format', 'string.len', 'string.sub', 'string.upper', 'string.lower',
+    'string.rep', 'string.reverse', 'string.byte', 'string.char',
+}
+
+class _Impure(Exception):
+    pass
+
+class _PurityChecker:
+    '''
+    Walks one function body in source order, keeping its local
+    scopes. Raises _Impure at the first global write, table
+    mutation, table or function creation, or read/call of a global
+    that is not a builtin of PURE_BUILTINS; global functions it
+    uses are collected in {self.uses}.
+    '''
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.scopes = []
+        self.uses = set()
+
+    def check(self, body):
+        self.scopes = [{p.value for p in body.params}]
+        self.block(body.stmtlist, new_scope=False)
+
+    def is_local(self, name):
+        return any(name in scope for scope in self.scopes)
+
+    def block(self, stmtlist, new_scope=True):
+        if new_scope:
+            self.scopes.append(set())
+        for stmt in stmtlist:
+            self.stmt(stmt)
+        if new_scope:
+            self.scopes.pop()
+
+    def read(self, path):
+        base = path.split('.')[0]
+        if self.is_local(base):
+            return
+        if path in PURE_BUILTINS:
+            return
+        if path in self.candidates:
+            self.uses.add(path)
+            return
+        raise _Impure(path)
+
+    def stmt(self, node):
+        cls = node.__class__.__name__
+        if cls == 'Assignment':
+            self.exprs(node.explist)
+            if node.local:
+                self.scopes[-1].update(v.value for v in node.varlist)
+                return
+            for target in node.varlist:
+                if not isinstance(target, (Name, Var)) or '.' in target.value:
+                    raise _Impure('table mutation')
+                if not self.is_local(target.value):
+                    raise _Impure(f'global write {target.value}')
+        elif cls == 'CallFunction':
+            self.expr(node)
+        elif cls in ('Do', 'While', 'If'):
+            if cls != 'Do':
+                self.expr(node.cond)
+            self.block(node.stmtlist)
+            if cls == 'If':
+                self.block(node.elsepart)
+        elif cls == 'For':
+            self.exprs(node.assign.explist + [node.limit, node.step])
+            self.scopes.append({v.value for v in node.assign.varlist})
+            self.block(node.stmtlist, new_scope=False)
+            self.scopes.pop()
+        elif cls == 'Forin':
+            self.exprs(node.exprlist)
+            self.scopes.append({n.value for n in node.namelist})
+            self.block(node.stmtlist, new_scope=False)
+            self.scopes.pop()
+        elif cls == 'Return':
+            self.exprs(node.exprlist)
+        elif cls == 'Break':
+            pass
+        else:
+            # DefFunction y cualquier otra sentencia
+            raise _Impure(cls)
+
+    def exprs(self, nodes):
+        for node in nodes:
+            self.expr(node)
+
+    def expr(self, node):
+        if isinstance(node, list):
+            self.exprs(node)
+            return
+        cls = node.__class__.__name__
+        if cls in ('Number', 'String', 'Boolean', 'Nil'):
+            return
+        if cls in ('Name', 'Var'):
+            self.read(node.value)
+        elif cls == 'Not':
+            self.expr(node.value)
+        elif cls == 'Binop':
+            self.expr(node.left)
+            self.expr(node.right)
+        elif cls == 'CallTable':
+            self.expr(node.field)
+            self.expr(node.table)
+        elif cls == 'CallFunction':
+            # una funcion recibida o local puede ser cualquiera
+            if not isinstance(node.value, (Name, Var)) or self.is_local(node.value.value.split('.')[0]):
+                raise _Impure('call of an unknown function')
+            self.read(node.value.value)
+            self.exprs(call_args(node))
+        else:
+            # Table y FunctionBody crean objetos nuevos
+            raise _Impure(cls)
+
+def pure_functions(program):
+    '''
+    Names of the global functions of {program} that have no
+    global writes, no table mutation and no I/O: they only read
+    their arguments and locals, and call pure builtins or other
+    pure functions. Their result depends only on the arguments.
+    Only 'function name(...)' statements at the top level count,
+    and the name must not be assigned anywhere else.
+    '''
+    definitions = {}
+    assigned = set()
+    for node in walk(program):
+        if isinstance(node, DefFunction):
+            name = node.function.value.value
+            if node.local or '.' in name:
+                assigned.add(name)
+            else:
+                definitions[name] = definitions.get(name, 0) + 1
+        elif isinstance(node, Assignment) and not node.local:
+            assigned.update(v.value for v in node.varlist if isinstance(v, (Name, Var)))
+    top = {stmt.function.value.value: stmt.function.funcbody for stmt in program.stmtlist
+           if isinstance(stmt, DefFunction) and not stmt.local}
+    candidates = {name for name, body in top.items()
+                  if definitions.get(name) == 1 and name not in assigned}
+
+    uses = {}
+    for name in list(candidates):
+        checker = _PurityChecker(candidates)
+        try:
+            checker.check(top[name])
+        except _Impure:
+            candidates.discard(name)
+            continue
+        uses[name] = checker.uses
+
+    # una funcion que usa una impura tampoco es pura
+    changed = True
+    while changed:
+        changed = False
+        for name in list(candidates):
+            if not uses[name] <= candidates:
+                candidates.discard(name)
+                changed = True
+    return candidates
@@ -0,0 +1,151 @@
+# ----------------------------------------
+# Revision por lotes de archivos Lua
+#
+# Recibe directorios, archivos o patrones glob, y reparte el
+# analisis lexico y sintactico de cada archivo entre varios
+# procesos (o hilos). Cada proceso o hilo crea una sola vez su
+# LuaLexer y su LuaParser y los reutiliza para todos sus
+# archivos; cada archivo tiene su propio Diagnostics, y sus
+# Diagnostic vuelven en el FileResult.
+# ----------------------------------------
+import glob
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+@dataclass
+class FileResult:
+    filename: str
+    tokens: int = 0
+    statements: int = 0
+    seconds: float = 0.0
+    diagnostics: list = field(default_factory=list)
+    errors: int = 0         # con los que max_errors dejo fuera
+
+    @property
+    def ok(self):
+        return not self.errors
+
+@dataclass
+class BatchResult:
+    files: list
+    seconds: float
+    workers: int
+    threads: bool = False
+
+    @property
+    def tokens(self):
+        return sum(r.tokens for r in self.files)
+
+    @property
+    def failed(self):
+        return [r for r in self.files if not r.ok]
+
+    def report(self):
+        lines = []
+        for r in self.files:
+            status = 'OK' if r.ok else f'{r.errors} error(s)'
+            lines.append(f'{r.filename}: {status} ({r.tokens} tokens, {r.statements} statements)')
+            for d in r.diagnostics:
+                where = f'{d.line}:{d.column}: ' if d.column is not None else ''
+                lines.append(f'    {where}[{d.code}] {d}')
+            if r.errors > len(r.diagnostics):
+                lines.append(f'    ... {r.errors - len(r.diagnostics)} more error(s)')
+        n = len(self.files)
+        seconds = self.seconds or 1e-9
+        lines.append(f'{n} files, {len(self.failed)} with errors, {self.tokens} tokens '
+                     f'in {self.seconds:.2f}s with {self.workers} '
+                     f'{"threads" if self.threads else "workers"}')
+        lines.append(f'{n / seconds:.1f} files/s, {self.tokens / seconds:.0f} tokens/s')
+        return '\n'.join(lines)
+
+def expand(paths):
+    '''
+    Lua files named by {paths}: directories are searched
+    recursively for *.lua, and glob patterns are expanded.
+    Each file appears once, in the given order.
+    '''
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, '**', '*.lua'), recursive=True))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+        else:
+            matches = [path]
+        found.extend(m for m in matches if not os.path.isdir(m))
+    return list(dict.fromkeys(found))
+
+# Lexer y parser de cada proceso o hilo, creados por _init_worker().
+_local = threading.local()
+
+def _init_worker():
+    from Lexer import LuaLexer
+    from Parser import LuaParser
+
+    _local.lexer = LuaLexer()
+    _local.parser = LuaParser()
+
+def _count(tokens, result):
+    for tok in tokens:
+        result.tokens += 1
+        yield tok
+
+def check_file(filename, max_errors=None):
+    '''
+    Lexes and parses {filename} with the warm lexer and parser
+    of this process or thread. The diagnostics (at most
+    {max_errors}) are returned in the result instead of being
+    printed.
+    '''
+    from Errors import Diagnostics, IO_ERROR
+
+    if getattr(_local, 'parser', None) is None:
+        _init_worker()
+    lexer, parser = _local.lexer, _local.parser
+    result = FileResult(filename)
+    start = time.perf_counter()
+    diagnostics = lexer.diagnostics = parser.diagnostics = Diagnostics(max_errors)
+    try:
+        with open(filename) as file:
+            source = diagnostics.source = file.read()
+        program = parser.parse(_count(lexer.tokenize(source), result))
+    except (OSError, UnicodeDecodeError) as e:
+        diagnostics.report(f'{type(e).__name__}: {e}', code=IO_ERROR)
+        program = None
+    result.diagnostics = diagnostics.records
+    result.errors = diagnostics.errors
+    if program is not None:
+        result.statements = len(program.stmtlist)
+    result.seconds = time.perf_counter() - start
+    return result
+
+def check(paths, workers=None, threads=False, max_errors=None):
+    '''
+    Checks every Lua file named by {paths} using {workers}
+    processes, or threads if {threads} (os.cpu_count() by
+    default), keeping at most {max_errors} diagnostics per file.
+    Results keep the order of the files.
+    '''
+    # La gramatica se construye aqui una vez; con fork los procesos
+    # la heredan ya construida.
+    import Parser
+
+    files = expand(paths)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(files)))
+    task = partial(check_file, max_errors=max_errors)
+    start = time.perf_counter()
+    if threads:
+        # cada hilo crea su lexer y su parser en su primer archivo
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(task, files))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            # chunks de varios archivos para no pagar un viaje por archivo
+            chunksize = max(1, len(files) // (workers * 4))
+            results = list(pool.map(task, files, chunksize=chunksize))
+    return BatchResult(results, time.perf_counter() - start, workers, threads)
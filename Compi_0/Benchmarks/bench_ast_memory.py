@@ -0,0 +1,104 @@
+# ----------------------------------------
+# Benchmark: memoria de los nodos del AST con __slots__
+# (dataclass(slots=True), como en Parser.py) vs. las mismas
+# clases con __dict__ por instancia, sobre los archivos de
+# Testing_Files repetidos N veces (1000 por defecto).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_ast_memory.py [N]
+# ----------------------------------------
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from ParseCache import NODE_TYPES
+
+TESTING_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Testing_Files')
+
+sys.setrecursionlimit(20000)
+
+# Las mismas clases, con los mismos campos, pero sin __slots__.
+DICT_TYPES = {cls: make_dataclass(cls.__name__, [(f.name, f.type) for f in fields(cls)])
+              for cls in NODE_TYPES}
+
+def corpus(scale):
+    source = ''
+    for name in sorted(os.listdir(TESTING_FILES)):
+        with open(os.path.join(TESTING_FILES, name)) as file:
+            source += file.read() + '\n'
+    return source * scale
+
+def copy(value, types):
+    '''
+    Copy of the tree {value} with the classes given by {types};
+    leaf values (strings, numbers) are shared, not copied.
+    '''
+    if isinstance(value, list):
+        return [copy(item, types) for item in value]
+    cls = types.get(value.__class__)
+    if cls is None:
+        return value
+    return cls(*[copy(getattr(value, f.name), types) for f in fields(value)])
+
+def nodes(value):
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif item.__class__ in DICT_TYPES or item.__class__ in DICT_TYPES.values():
+            yield item
+            stack.extend(getattr(item, f.name) for f in fields(item))
+
+def node_size(cls, node, count=1000):
+    '''
+    Bytes per instance of {cls} with the field values of {node}.
+    Measured with tracemalloc: reading __dict__ would create a
+    dict that Python 3.11 does not allocate until it is needed.
+    '''
+    values = [getattr(node, f.name) for f in fields(node)]
+    instances, size = traced(lambda: [cls(*values) for _ in range(count)])
+    return (size - sys.getsizeof(instances)) / count
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main(scale=1000):
+    text = corpus(scale)
+    start = time.perf_counter()
+    program = LuaParser().parse(LuaLexer().tokenize(text))
+    print(f'{len(text) / 2**20:.2f} MB of source ({scale}x), parsed in {time.perf_counter() - start:.1f}s')
+
+    identity = {cls: cls for cls in NODE_TYPES}
+    slotted, slotted_bytes = traced(lambda: copy(program, identity))
+    del slotted
+    plain, plain_bytes = traced(lambda: copy(program, DICT_TYPES))
+
+    print(f"\n{'node':<14}{'count':>10}{'__dict__ (B)':>14}{'__slots__ (B)':>15}")
+    by_class = {}
+    for node in nodes(program):
+        by_class.setdefault(node.__class__, node)
+    counts = {}
+    for node in nodes(program):
+        counts[node.__class__] = counts.get(node.__class__, 0) + 1
+    for cls, node in sorted(by_class.items(), key=lambda item: -counts[item[0]]):
+        print(f'{cls.__name__:<14}{counts[cls]:>10}{node_size(DICT_TYPES[cls], node):>14.0f}'
+              f'{node_size(cls, node):>15.0f}')
+
+    n = sum(counts.values())
+    print(f"\n{'AST':<14}{'nodes':>10}{'MB':>10}{'B / node':>10}")
+    print(f"{'__dict__':<14}{n:>10}{plain_bytes / 2**20:>10.1f}{plain_bytes / n:>10.1f}")
+    print(f"{'__slots__':<14}{n:>10}{slotted_bytes / 2**20:>10.1f}{slotted_bytes / n:>10.1f}")
+    print(f"{'reduction':<14}{'':>10}{plain_bytes / slotted_bytes:>9.2f}x")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,75 @@
+# ----------------------------------------
+# Benchmark: formatos para guardar un AST de LuaParser
+#
+# Compara el repr del Program (lo que imprime -parse), la
+# serializacion de ParseCache (tuplas + marshal + zlib) y el
+# formato binario de BinaryAST.py: tamano, tiempo de escritura,
+# tiempo de carga completa y, para BinaryAST, abrir el archivo
+# con mmap y decodificar una sola funcion. El programa son los
+# archivos de Testing_Files repetidos N veces (200 por defecto),
+# cada copia con sus funciones renombradas.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_binary_ast.py [N]
+# ----------------------------------------
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+import ParseCache
+import BinaryAST
+
+TESTING_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Testing_Files')
+
+sys.setrecursionlimit(20000)
+
+def corpus(scale):
+    source = ''
+    for name in sorted(os.listdir(TESTING_FILES)):
+        with open(os.path.join(TESTING_FILES, name)) as file:
+            source += file.read() + '\n'
+    # funciones distintas en cada copia: shuffle_0, shuffle_1, ...
+    return ''.join(re.sub(r'\bfunction (\w+)', rf'function \1_{i}', source) for i in range(scale))
+
+def timed(run, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(scale=200):
+    program = LuaParser().parse(iter(LuaLexer().tokenize(corpus(scale))))
+    path = os.path.join(tempfile.gettempdir(), 'bench_binary_ast.ast')
+    print(f"{'format':<16}{'bytes':>12}{'write (s)':>12}{'load (s)':>12}")
+
+    write, text = timed(lambda: repr(program))
+    print(f"{'repr':<16}{len(text.encode()):>12}{write:>12.3f}{'-':>12}")
+
+    write, data = timed(lambda: ParseCache.dumps(program))
+    load, _ = timed(lambda: ParseCache.loads(data))
+    print(f"{'marshal + zlib':<16}{len(data):>12}{write:>12.3f}{load:>12.3f}")
+
+    write, data = timed(lambda: BinaryAST.dumps(program))
+    load, loaded = timed(lambda: BinaryAST.loads(data))
+    assert loaded == program
+    print(f"{'BinaryAST':<16}{len(data):>12}{write:>12.3f}{load:>12.3f}")
+
+    with open(path, 'wb') as file:
+        file.write(data)
+    name = f'playRandom_{scale // 2}'
+    def one_function():
+        with BinaryAST.ASTFile(path) as ast:
+            return ast.function(name)
+    load, _ = timed(one_function)
+    print(f"{'  one function':<16}{'':>12}{'':>12}{load:>12.4f}   (mmap + {name})")
+    os.remove(path)
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,71 @@
+# ----------------------------------------
+# Microbenchmark: concatenacion de cadenas con `..`
+#
+# Compara la concatenacion anterior (un str nuevo por cada `..`,
+# de a dos operandos) con Runtime: lua_concat, que acumula en un
+# LuaRope los resultados largos, y lua_concat_all, que une una
+# cadena a .. b .. c en un solo join. Casos: acumular en un ciclo
+# (s = s .. x, cuadratico con str), una cadena de varios
+# operandos por iteracion, y ambas cosas juntas.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_concat.py [n]
+# ----------------------------------------
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Runtime import lua_concat, lua_concat_all, lua_tostring
+
+def str_concat(a, b):
+    # la version anterior de lua_concat
+    return lua_tostring(a) + lua_tostring(b)
+
+def accumulate(concat, concat_all, n):
+    # s = s .. "x"
+    s = ''
+    for _ in range(n):
+        s = concat(s, 'x')
+    return str(s)
+
+def chain(concat, concat_all, n):
+    # line = "bottle " .. i .. " of " .. n .. "\n"
+    if concat_all is None:
+        for i in range(n):
+            str_concat('bottle ', str_concat(i, str_concat(' of ', str_concat(n, '\n'))))
+    else:
+        for i in range(n):
+            concat_all('bottle ', i, ' of ', n, '\n')
+
+def build(concat, concat_all, n):
+    # s = s .. i .. " bottles\n"
+    s = ''
+    if concat_all is None:
+        for i in range(n):
+            s = str_concat(s, str_concat(i, ' bottles\n'))
+    else:
+        for i in range(n):
+            s = concat_all(s, i, ' bottles\n')
+    return str(s)
+
+CASES = [accumulate, chain, build]
+
+def timed(case, concat, concat_all, n, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case(concat, concat_all, n)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(n=100_000):
+    print(f'{n} iterations')
+    print(f"\n{'case':<12}{'str (s)':>12}{'rope (s)':>12}{'speedup':>10}")
+    for case in CASES:
+        old = timed(case, str_concat, None, n)
+        new = timed(case, lua_concat, lua_concat_all, n)
+        print(f'{case.__name__:<12}{old:>12.4f}{new:>12.4f}{old / new:>9.2f}x')
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
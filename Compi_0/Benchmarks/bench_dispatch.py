@@ -0,0 +1,90 @@
+# ----------------------------------------
+# Microbenchmark: despacho de visit() con multimethod.multimeta
+# (el Visitor anterior) vs. Dispatch.Visitor (tabla por clase).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_dispatch.py
+# ----------------------------------------
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from multimethod import multimeta, multimethod
+from Lexer import LuaLexer
+from Parser import LuaParser, ASTRender, Program, Statement, Expression, Binop
+from Dispatch import Visitor
+
+TESTING_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Testing_Files')
+
+class MultiCounter(metaclass=multimeta):
+    def visit(self, node: Expression, depth=0):
+        return 1
+
+    def visit(self, node: Statement, depth=0):
+        return 1
+
+    def visit(self, node: Binop, depth=0):
+        return 1 + self.visit(node.left, depth + 1) + self.visit(node.right, depth + 1)
+
+    def visit(self, node: Program, depth=0):
+        return 1 + sum(self.visit(s, depth + 1) for s in node.stmtlist)
+
+class TableCounter(Visitor):
+    def visit(self, node: Expression, depth=0):
+        return 1
+
+    def visit(self, node: Statement, depth=0):
+        return 1
+
+    def visit(self, node: Binop, depth=0):
+        return 1 + self.visit(node.left, depth + 1) + self.visit(node.right, depth + 1)
+
+    def visit(self, node: Program, depth=0):
+        return 1 + sum(self.visit(s, depth + 1) for s in node.stmtlist)
+
+def multimeta_render():
+    '''
+    ASTRender with the same visit() functions, dispatched by
+    multimethod as before.
+    '''
+    handlers = list(ASTRender._handlers.values())
+    visit = multimethod(handlers[0])
+    for func in handlers[1:]:
+        visit.register(func)
+    return type('MultimethodRender', (ASTRender,), {'visit': visit})
+
+def program():
+    source = ''
+    for name in sorted(os.listdir(TESTING_FILES)):
+        with open(os.path.join(TESTING_FILES, name)) as file:
+            source += file.read() + '\n'
+    source += ''.join(f'x{i} = {i} + y * {i} - z / 2;\n' for i in range(2000))
+    return LuaParser().parse(LuaLexer().tokenize(source))
+
+def best(run, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    root = program()
+    assert MultiCounter().visit(root) == TableCounter().visit(root)
+    old_render = multimeta_render()
+    a, b = old_render(), ASTRender()
+    root.accept(a)
+    root.accept(b)
+    assert a.dot.source == b.dot.source
+    print(f"{'visitor':<16}{'multimeta (ms)':>16}{'table (ms)':>14}{'speedup':>10}")
+    for label, old, new in (
+        ('node counter', lambda: MultiCounter().visit(root), lambda: TableCounter().visit(root)),
+        ('ASTRender', lambda: root.accept(old_render()), lambda: root.accept(ASTRender())),
+    ):
+        t_old, t_new = best(old), best(new)
+        print(f'{label:<16}{t_old * 1000:>16.1f}{t_new * 1000:>14.1f}{t_old / t_new:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
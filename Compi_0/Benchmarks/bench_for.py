@@ -0,0 +1,137 @@
+# ----------------------------------------
+# Benchmark: for numerico del interprete por closures
+#
+# Compara Interpreter.ClosureCompiler, que recorre un for con
+# inicio y paso enteros sobre un range de Python, con la version
+# anterior de stmt_For (un while que suma el paso y compara con
+# el limite en cada vuelta). Los programas son ciclos anidados
+# de 10^6 a 10^7 iteraciones en total, con cuerpo vacio y con
+# un cuerpo como el de 100Prisoners.lua (secrets[i] = i).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_for.py [--full]
+#   --full  incluye los casos de 10^7 iteraciones
+# ----------------------------------------
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from Runtime import LuaError, lua_tonumber
+from Interpreter import ClosureCompiler, BREAK
+
+class WhileForCompiler(ClosureCompiler):
+    '''
+    The ClosureCompiler with the numeric for as it was before
+    the range fast path.
+    '''
+    def stmt_For(self, node):
+        start = self.expr(node.assign.explist[0])
+        limit = self.expr(node.limit)
+        step = self.expr(node.step)
+        self.scope.blocks.append({})
+        slot, boxed = self.scope.declare(node.assign.varlist[0].value)
+        body = self.block(node.stmtlist)
+        if boxed:
+            inner = body
+            def body(f):
+                f[slot] = [f[slot]]
+                return inner(f)
+        self.scope.blocks.pop()
+        def for_(f):
+            i = lua_tonumber(start(f))
+            stop = lua_tonumber(limit(f))
+            inc = lua_tonumber(step(f))
+            if i is None:
+                raise LuaError("'for' initial value must be a number")
+            if stop is None:
+                raise LuaError("'for' limit must be a number")
+            if inc is None:
+                raise LuaError("'for' step must be a number")
+            if inc > 0:
+                while i <= stop:
+                    f[slot] = i
+                    r = body(f)
+                    if r is not None:
+                        if r is BREAK:
+                            return
+                        return r
+                    i += inc
+            else:
+                while i >= stop:
+                    f[slot] = i
+                    r = body(f)
+                    if r is not None:
+                        if r is BREAK:
+                            return
+                        return r
+                    i += inc
+        return for_
+
+def nested(outer, inner):
+    # limites literales
+    return f'''
+local n = 0;
+for i = 1, {outer} do
+    for j = 1, {inner} do
+        n = j;
+    end;
+end;
+'''
+
+def nested_vars(outer, inner):
+    # limites en variables, paso negativo
+    return f'''
+local m = {outer};
+local k = {inner};
+local n = 0;
+for i = m, 1, -1 do
+    for j = 1, k do
+        n = j;
+    end;
+end;
+'''
+
+def prisoners(outer, inner):
+    # el cuerpo de 100Prisoners.lua
+    return f'''
+local secrets = {{}};
+for r = 1, {outer} do
+    for i = 1, {inner} do
+        secrets[i] = i;
+    end;
+end;
+'''
+
+CASES = [nested, nested_vars, prisoners]
+
+def compile_program(compiler, source):
+    program = LuaParser().parse(iter(LuaLexer().tokenize(source)))
+    return compiler().compile(program)
+
+def timed(compiler, source, repeat=3):
+    chunk = compile_program(compiler, source)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunk()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sizes = [(1000, 1000)]
+    if '--full' in argv:
+        sizes.append((10_000, 1000))
+    print(f"{'case':<14}{'iterations':>12}{'while (s)':>12}{'range (s)':>12}{'speedup':>10}")
+    for outer, inner in sizes:
+        for case in CASES:
+            source = case(outer, inner)
+            old = timed(WhileForCompiler, source)
+            new = timed(ClosureCompiler, source)
+            print(f'{case.__name__:<14}{outer * inner:>12}{old:>12.3f}{new:>12.3f}{old / new:>9.2f}x')
+
+if __name__ == '__main__':
+    main()
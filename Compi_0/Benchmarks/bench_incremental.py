@@ -0,0 +1,63 @@
+# ----------------------------------------
+# Benchmark: analisis completo vs. incremental al escribir
+# una sentencia, tecla por tecla, en un archivo de ~5000 lineas.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_incremental.py
+# ----------------------------------------
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from Incremental import IncrementalParser
+
+FUNCTION = '''function f{i}(n)
+    local total = 0;
+    for k = 1, n do
+        if k % 2 == 0 then
+            total = total + k;
+        else
+            total = total - 1;
+        end;
+    end;
+    return total;
+end;
+'''
+
+def source(lines=5000):
+    per = FUNCTION.count('\n')
+    return ''.join(FUNCTION.format(i=i) for i in range(lines // per + 1))
+
+def main():
+    text = source()
+    typed = 'x = f1(10) + 2;\n'
+    pos = text.index('function f200(')
+
+    # Mientras se escribe el texto tiene errores de sintaxis; los
+    # mensajes no se muestran.
+    with redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for n in range(1, len(typed) + 1):
+            current = text[:pos] + typed[:n] + text[pos:]
+            program = LuaParser().parse(LuaLexer().tokenize(current))
+        full = (time.perf_counter() - start) / len(typed)
+
+        inc = IncrementalParser(text)
+        start = time.perf_counter()
+        for n, ch in enumerate(typed):
+            inc.edit(pos + n, pos + n, ch)
+        incremental = (time.perf_counter() - start) / len(typed)
+
+    assert inc.program == program
+    print(f'{text.count(chr(10))} lines, {len(inc.chunks)} top-level statements')
+    print(f"{'full parse per keystroke (ms)':<36}{full * 1000:>10.2f}")
+    print(f"{'incremental per keystroke (ms)':<36}{incremental * 1000:>10.2f}")
+    print(f"{'speedup':<36}{full / incremental:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+# ----------------------------------------
+# Benchmark: interprete por closures, VM de bytecode y
+# traduccion a Python vs. recorrido ingenuo del AST con
+# un Visitor (multimethod).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_interpreter.py
+# ----------------------------------------
+import io
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from multimethod import multimeta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import (LuaParser, Program, Number, String, Boolean, Nil, Name, Var, Not,
+                    Table, CallTable, Binop, FunctionBody, CallFunction, Assignment,
+                    DefFunction, Do, While, If, Return, Break, For)
+from Runtime import (LuaTable, make_globals, lua_string_literal,
+                     lua_tonumber, arith, lua_div, lua_mod, lua_pow,
+                     lua_concat, lua_eq, lua_lt, lua_le, lua_index,
+                     lua_setindex, first)
+import Interpreter
+import VM
+import Transpiler
+import CodeCache
+
+TESTING_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Testing_Files')
+
+class _BreakLoop(Exception):
+    pass
+
+class _ReturnValue(Exception):
+    def __init__(self, value):
+        self.value = value
+
+class _Env:
+    def __init__(self, parent=None):
+        self.vars = {}
+        self.parent = parent
+
+    def find(self, name):
+        env = self
+        while env:
+            if name in env.vars:
+                return env
+            env = env.parent
+        return None
+
+class TreeWalker(metaclass=multimeta):
+    '''
+    Reference evaluator: walks the AST on every evaluation and
+    dispatches each node through multimethod, like ASTRender.
+    '''
+    def __init__(self, G):
+        self.G = G
+
+    def lookup(self, path, env):
+        parts = path.split('.')
+        scope = env.find(parts[0])
+        value = scope.vars[parts[0]] if scope else self.G.get(parts[0])
+        for key in parts[1:]:
+            value = lua_index(value, key)
+        return value
+
+    def store(self, path, value, env):
+        parts = path.split('.')
+        if len(parts) > 1:
+            lua_setindex(self.lookup('.'.join(parts[:-1]), env), parts[-1], value)
+            return
+        scope = env.find(path)
+        if scope:
+            scope.vars[path] = value
+        else:
+            self.G.set(path, value)
+
+    def values(self, nodes, env):
+        out = []
+        for i, node in enumerate(nodes):
+            if i == len(nodes) - 1 and isinstance(node, CallFunction):
+                r = self.visit(node, env)
+                out.extend(r if isinstance(r, tuple) else (r,))
+            else:
+                out.append(first(self.visit(node, env)))
+        return out
+
+    def block(self, stmtlist, env):
+        for stmt in stmtlist:
+            self.visit(stmt, env)
+
+    def visit(self, node: Number, env):
+        return node.value
+
+    def visit(self, node: String, env):
+        return lua_string_literal(node.value)
+
+    def visit(self, node: Boolean, env):
+        return node.value
+
+    def visit(self, node: Nil, env):
+        return None
+
+    def visit(self, node: Name, env):
+        return self.lookup(node.value, env)
+
+    def visit(self, node: Var, env):
+        return self.lookup(node.value, env)
+
+    def visit(self, node: Not, env):
+        v = first(self.visit(node.value, env))
+        return v is None or v is False
+
+    def visit(self, node: Table, env):
+        t = LuaTable()
+        for data in reversed(node.data):
+            key = data.value.value if isinstance(data.value, Name) else first(self.visit(data.value, env))
+            t.set(key, first(self.visit(data.exp, env)))
+        return t
+
+    def visit(self, node: CallTable, env):
+        return lua_index(first(self.visit(node.table, env)), first(self.visit(node.field, env)))
+
+    def visit(self, node: Binop, env):
+        op = node.operator
+        a = first(self.visit(node.left, env))
+        if op == 'and':
+            return a if a is None or a is False else first(self.visit(node.right, env))
+        if op == 'or':
+            return first(self.visit(node.right, env)) if a is None or a is False else a
+        b = first(self.visit(node.right, env))
+        if op in ('+', '-', '*'):
+            return arith(op, a, b)
+        if op == '/':
+            return lua_div(a, b)
+        if op == '%':
+            return lua_mod(a, b)
+        if op == '^':
+            return lua_pow(a, b)
+        if op == '..':
+            return lua_concat(a, b)
+        if op == '==':
+            return lua_eq(a, b)
+        if op == '~=':
+            return not lua_eq(a, b)
+        if op == '<':
+            return lua_lt(a, b)
+        if op == '<=':
+            return lua_le(a, b)
+        if op == '>':
+            return lua_lt(b, a)
+        if op == '>=':
+            return lua_le(b, a)
+
+    def visit(self, node: FunctionBody, env):
+        params = [p.value for p in reversed(node.params)]
+        def lua_function(*args):
+            local = _Env(env)
+            for i, name in enumerate(params):
+                local.vars[name] = args[i] if i < len(args) else None
+            try:
+                self.block(node.stmtlist, local)
+            except _ReturnValue as r:
+                return r.value
+        return lua_function
+
+    def visit(self, node: CallFunction, env):
+        fn = first(self.visit(node.value, env))
+        args = [node.explist] if isinstance(node.explist, Table) else list(reversed(node.explist))
+        return fn(*self.values(args, env))
+
+    def visit(self, node: Assignment, env):
+        values = self.values(list(reversed(node.explist)), env)
+        targets = list(reversed(node.varlist))
+        values += [None] * (len(targets) - len(values))
+        for target, value in zip(targets, values):
+            if node.local:
+                env.vars[target.value] = value
+            elif isinstance(target, CallTable):
+                lua_setindex(first(self.visit(target.field, env)), first(self.visit(target.table, env)), value)
+            else:
+                self.store(target.value, value, env)
+
+    def visit(self, node: DefFunction, env):
+        name = node.function.value.value
+        if node.local:
+            env.vars[name] = None
+            env.vars[name] = self.visit(node.function.funcbody, env)
+        else:
+            self.store(name, self.visit(node.function.funcbody, env), env)
+
+    def visit(self, node: Do, env):
+        self.block(node.stmtlist, _Env(env))
+
+    def visit(self, node: While, env):
+        try:
+            while True:
+                c = first(self.visit(node.cond, env))
+                if c is None or c is False:
+                    break
+                self.block(node.stmtlist, _Env(env))
+        except _BreakLoop:
+            pass
+
+    def visit(self, node: If, env):
+        c = first(self.visit(node.cond, env))
+        if c is not None and c is not False:
+            self.block(node.stmtlist, _Env(env))
+        else:
+            self.block(node.elsepart, _Env(env))
+
+    def visit(self, node: Return, env):
+        values = self.values(list(reversed(node.exprlist)), env)
+        raise _ReturnValue(values[0] if len(values) == 1 else tuple(values))
+
+    def visit(self, node: Break, env):
+        raise _BreakLoop()
+
+    def visit(self, node: For, env):
+        i = lua_tonumber(first(self.visit(node.assign.explist[0], env)))
+        stop = lua_tonumber(first(self.visit(node.limit, env)))
+        step = lua_tonumber(first(self.visit(node.step, env)))
+        name = node.assign.varlist[0].value
+        try:
+            while (step > 0 and i <= stop) or (step <= 0 and i >= stop):
+                local = _Env(env)
+                local.vars[name] = i
+                self.block(node.stmtlist, local)
+                i += step
+        except _BreakLoop:
+            pass
+
+    def visit(self, node: Program, env):
+        try:
+            self.block(node.stmtlist, env)
+        except _ReturnValue as r:
+            return r.value
+
+def load(filename, driver='', replace=()):
+    with open(os.path.join(TESTING_FILES, filename)) as file:
+        source = file.read()
+    for old, new in replace:
+        source = source.replace(old, new)
+    return LuaParser().parse(LuaLexer().tokenize(source + driver))
+
+def measure(run, repeat):
+    best = None
+    for _ in range(repeat):
+        random.seed(1)
+        out = io.StringIO()
+        start = time.perf_counter()
+        with redirect_stdout(out):
+            run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out.getvalue()
+
+CASES = [
+    ('Fibonacci.lua', dict(driver='\nprint(fibs(18), pfibs(14), trfib(40));')),
+    ('100Prisoners.lua', dict(replace=[('local N = 1000000', 'local N = 20')])),
+    ('99BottlesOfBeer.lua', {}),
+]
+
+def main(repeat=3):
+    print(f"{'program':<22}{'visitor (s)':>14}{'closures (s)':>14}{'speedup':>10}{'vm (s)':>12}{'speedup':>10}{'python (s)':>12}{'speedup':>10}")
+    for filename, options in CASES:
+        program = load(filename, **options)
+        walk_time, walk_out = measure(lambda: TreeWalker(make_globals()).visit(program, _Env()), repeat)
+        closure_time, closure_out = measure(lambda: Interpreter.run(program), repeat)
+        vm_time, vm_out = measure(lambda: VM.run(program), repeat)
+        code = Transpiler.compile_program(program)
+        py_time, py_out = measure(lambda: CodeCache.run_code(code), repeat)
+        assert walk_out == closure_out == vm_out == py_out, f'{filename}: outputs differ'
+        print(f'{filename:<22}{walk_time:>14.4f}{closure_time:>14.4f}{walk_time / closure_time:>9.1f}x'
+              f'{vm_time:>12.4f}{walk_time / vm_time:>9.1f}x{py_time:>12.4f}{walk_time / py_time:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# ----------------------------------------
+# Benchmark: escalamiento del parser con archivos grandes
+# generados (1k, 10k y 100k sentencias / campos de tabla).
+# Si las listas se construyen en tiempo lineal, el costo
+# por elemento se mantiene constante.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_parser_scaling.py
+# ----------------------------------------
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+
+SIZES = (1_000, 10_000, 100_000)
+
+def statements(n):
+    return ''.join(f'x{i} = x{i} + {i};\n' for i in range(n))
+
+def table_fields(n):
+    return 'print({' + ', '.join(f'k{i} = {i}' for i in range(n)) + '});\n'
+
+def arguments(n):
+    return 'print(' + ', '.join(str(i) for i in range(n)) + ');\n'
+
+GENERATORS = [
+    ('statements', statements),
+    ('table fields', table_fields),
+    ('call arguments', arguments),
+]
+
+def measure(source):
+    tokens = list(LuaLexer().tokenize(source))
+    start = time.perf_counter()
+    LuaParser().parse(iter(tokens))
+    return time.perf_counter() - start
+
+def main():
+    print(f"{'input':<16}{'n':>10}{'parse (s)':>12}{'us / item':>12}")
+    for label, generate in GENERATORS:
+        for n in SIZES:
+            elapsed = measure(generate(n))
+            print(f'{label:<16}{n:>10}{elapsed:>12.4f}{elapsed / n * 1e6:>12.2f}')
+
+if __name__ == '__main__':
+    main()
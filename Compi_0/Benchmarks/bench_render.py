@@ -0,0 +1,74 @@
+# ----------------------------------------
+# Benchmark: ASTRender (graphviz.Digraph en memoria) vs.
+# StreamRender (DOT escrito a medida que se recorre el arbol),
+# sin correr Graphviz. Mide tiempo y pico de memoria sobre
+# programas generados de distinto numero de nodos: sentencias
+# sueltas, y las mismas sentencias dentro de bloques do ... end
+# anidados (el visit() de Statement de ASTRender pone el repr de
+# todo el bloque en la etiqueta).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_render.py [nodos ...]
+# ----------------------------------------
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser, ASTRender
+from StreamRender import StreamRender
+from Analysis import walk
+
+sys.setrecursionlimit(20000)
+
+STATEMENT = 'local x{i} = a{i} * {i} + f(b, "s{i}");\n'
+
+def flat(n):
+    return ''.join(STATEMENT.format(i=i) for i in range(n))
+
+def nested(n, depth=20):
+    # grupos de {depth} bloques do anidados, una sentencia en cada uno
+    out = []
+    for g in range(0, n, depth):
+        out.append('do ' * depth)
+        out.extend(STATEMENT.format(i=i) for i in range(g, g + depth))
+        out.append('end; ' * depth + '\n')
+    return ''.join(out)
+
+CASES = [flat, nested]
+
+def measure(run):
+    # el tiempo sin tracemalloc, que hace mas lenta cada asignacion
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def render_digraph(program):
+    dot = ASTRender()
+    program.accept(dot)
+    return dot.dot.source
+
+def main(sizes=(10_000, 100_000)):
+    out = os.path.join(tempfile.gettempdir(), 'bench_render.gv')
+    print(f"{'case':<8}{'nodes':>9}{'Digraph (s)':>13}{'(MB)':>8}{'stream (s)':>12}{'(MB)':>8}")
+    for size in sizes:
+        for case in CASES:
+            # ~12 nodos por sentencia
+            program = LuaParser().parse(iter(LuaLexer().tokenize(case(size // 12))))
+            nodes = sum(1 for _ in walk(program))
+            old, old_peak = measure(lambda: render_digraph(program))
+            new, new_peak = measure(lambda: StreamRender.write(program, out))
+            print(f'{case.__name__:<8}{nodes:>9}{old:>13.2f}{old_peak / 2**20:>8.1f}'
+                  f'{new:>12.2f}{new_peak / 2**20:>8.1f}')
+    os.remove(out)
+
+if __name__ == '__main__':
+    main(*[tuple(map(int, sys.argv[1:]))] if sys.argv[1:] else ())
@@ -0,0 +1,56 @@
+# ----------------------------------------
+# Benchmark: tiempo de arranque (import Parser y MiniLua -p)
+# construyendo las tablas LALR en cada import (como antes,
+# con AFD.txt) vs. cargandolas de LuaParser.tables.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_startup.py
+# ----------------------------------------
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+COMPI = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, COMPI)
+
+from ParserTables import TABLES_FILE
+
+SAMPLE = os.path.join(COMPI, 'Testing_Files', 'Fibonacci.lua')
+
+def run(args, env, cwd):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], env=env, cwd=cwd, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def measure(args, mode, cwd, repeat):
+    env = dict(os.environ, PYTHONPATH=COMPI)
+    env.pop('MINILUA_DEBUGFILE', None)
+    if mode == 'rebuild+debugfile':
+        env['MINILUA_DEBUGFILE'] = 'AFD.txt'
+    best = None
+    for _ in range(repeat):
+        if mode != 'load tables' and os.path.exists(TABLES_FILE):
+            os.remove(TABLES_FILE)
+        elapsed = run(args, env, cwd)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(repeat=5):
+    commands = [
+        ('import Parser', ['-c', 'import Parser']),
+        ('MiniLua.py -p', [os.path.join(COMPI, 'MiniLua.py'), '-p', SAMPLE]),
+    ]
+    modes = ['rebuild+debugfile', 'rebuild', 'load tables']
+    # AFD.txt se escribe en un directorio temporal para no tocar el del repo.
+    with tempfile.TemporaryDirectory() as cwd:
+        print(f"{'command':<18}" + ''.join(f'{m + " (s)":>24}' for m in modes) + f"{'speedup':>10}")
+        for label, args in commands:
+            times = [measure(args, mode, cwd, repeat) for mode in modes]
+            print(f'{label:<18}' + ''.join(f'{t:>24.4f}' for t in times) + f'{times[0] / times[-1]:>9.1f}x')
+    # Deja las tablas generadas para los siguientes usos.
+    run(['-c', 'import Parser'], dict(os.environ, PYTHONPATH=COMPI), COMPI)
+
+if __name__ == '__main__':
+    main()
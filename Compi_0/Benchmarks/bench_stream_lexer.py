@@ -0,0 +1,60 @@
+# ----------------------------------------
+# Benchmark: memoria pico al tokenizar un archivo grande
+# generado, leyendolo completo (file.read()) vs. por
+# bloques con StreamLexer.tokenize_file (mmap).
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_stream_lexer.py [MB]
+# ----------------------------------------
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from StreamLexer import tokenize_file
+
+STATEMENTS = '''t{i} = {{name = "item {i}", value = {i} * 2.5}};
+--[[ comentario largo
+     del elemento {i} ]]
+print(t{i}.value .. " unidades");
+'''
+
+def generate(path, megabytes):
+    size = megabytes * 1024 * 1024
+    with open(path, 'w') as file:
+        i = 0
+        while file.tell() < size:
+            file.write(''.join(STATEMENTS.format(i=i + k) for k in range(1000)))
+            i += 1000
+
+def read_all(path):
+    with open(path) as file:
+        return sum(1 for _ in LuaLexer().tokenize(file.read()))
+
+def streaming(path):
+    return sum(1 for _ in tokenize_file(path))
+
+def measure(count, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tokens = count(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return tokens, elapsed, peak
+
+def main(megabytes=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'big.lua')
+        generate(path, megabytes)
+        print(f'{os.path.getsize(path) / 2**20:.1f} MB of Lua source')
+        print(f"{'mode':<14}{'tokens':>12}{'time (s)':>12}{'peak (MB)':>12}")
+        for label, count in (('file.read()', read_all), ('streaming', streaming)):
+            tokens, elapsed, peak = measure(count, path)
+            print(f'{label:<14}{tokens:>12}{elapsed:>12.2f}{peak / 2**20:>12.1f}')
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
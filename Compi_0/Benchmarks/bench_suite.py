@@ -0,0 +1,225 @@
+# ----------------------------------------
+# Suite de benchmarks: LuaLexer.tokenize, LuaParser.parse,
+# ASTRender y la calculadora de AST/ASTCalculator.py, medidos
+# por separado sobre los archivos de Testing_Files y sobre
+# programas generados que crecen en numero de sentencias,
+# profundidad de anidamiento, largo de expresiones y tamano
+# de constructores de tablas.
+#
+# Los resultados se escriben en JSON; con --compare se comparan
+# contra un resultado anterior y se marcan las regresiones.
+#
+# Uso (desde Compi_0):
+#   python Benchmarks/bench_suite.py [-o results.json] [--quick]
+#                                    [--compare base.json] [--threshold 1.2]
+# ----------------------------------------
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser, ASTRender
+
+TESTING_FILES = os.path.join(HERE, '..', 'Testing_Files')
+CALCULATOR = os.path.join(HERE, '..', '..', 'AST')
+FORMAT_VERSION = 1
+
+# Las expresiones largas y el anidamiento profundo se recorren
+# recursivamente (parser de la calculadora, ASTRender).
+sys.setrecursionlimit(20000)
+
+# ----------------------------------------
+# Corpus
+# ----------------------------------------
+def testing_files():
+    for name in sorted(os.listdir(TESTING_FILES)):
+        if name.endswith('.lua'):
+            with open(os.path.join(TESTING_FILES, name)) as file:
+                yield name, 0, file.read()
+
+def statements(n):
+    return ''.join(f'local v{i} = {i} * 2 + 1;\nprint("v{i}", v{i});\n' for i in range(n))
+
+def nesting(depth):
+    text = 'x = 0;\n'
+    for i in range(depth):
+        text += '  ' * i + f'if x < {i} then\n'
+    text += '  ' * depth + 'x = x + 1;\n'
+    for i in reversed(range(depth)):
+        text += '  ' * i + 'end;\n'
+    return text
+
+def expression(length):
+    return 'x = ' + ' + '.join(f'{i} * y' for i in range(length)) + ';\n'
+
+def table(size):
+    return 't = {' + ', '.join(f'k{i} = {i}' for i in range(size)) + '};\n'
+
+GENERATORS = {
+    'statements': (statements, (10, 100, 1000)),
+    'nesting':    (nesting,    (5, 25, 100)),
+    'expression': (expression, (10, 100, 500)),
+    'table':      (table,      (10, 100, 1000)),
+}
+
+def lua_corpus(quick=False):
+    yield from testing_files()
+    for kind, (generate, sizes) in GENERATORS.items():
+        for size in sizes[:2] if quick else sizes:
+            yield kind, size, generate(size)
+
+def calculator_source(n, length):
+    '''
+    {n} assignments, each one an expression of {length} terms
+    over x0 (the calculator evaluates a variable again every
+    time it is read, so chains of variables grow exponentially).
+    '''
+    lines = ['x0 = 1/2;']
+    for i in range(1, n):
+        terms = ' + '.join(f'(x0^{k % 3 + 1})/{k + 1}' for k in range(length))
+        lines.append(f'x{i} = {terms};')
+    return ' '.join(lines)
+
+def calculator_corpus(quick=False):
+    for n in (10, 100) if quick else (10, 100, 400):
+        yield 'calc statements', n, calculator_source(n, 4)
+    for length in (10, 100) if quick else (10, 100, 400):
+        yield 'calc expression', length, calculator_source(2, length)
+
+# ----------------------------------------
+# Medicion
+# ----------------------------------------
+def measure(run, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+def result(stage, corpus, size, tokens, run, repeat):
+    best, median = measure(run, repeat)
+    return {'stage': stage, 'corpus': corpus, 'size': size, 'tokens': tokens,
+            'repeat': repeat, 'best': best, 'median': median}
+
+def bench_lua(corpus, size, source, repeat):
+    tokens = list(LuaLexer().tokenize(source))
+    program = LuaParser().parse(iter(tokens))
+    n = len(tokens)
+
+    def render():
+        ASTRender().visit(program)
+
+    return [
+        result('tokenize', corpus, size, n, lambda: list(LuaLexer().tokenize(source)), repeat),
+        result('parse', corpus, size, n, lambda: LuaParser().parse(iter(tokens)), repeat),
+        result('render', corpus, size, n, render, repeat),
+    ]
+
+def load_calculator():
+    # ASTCalculator evalua un ejemplo al importarse
+    sys.path.insert(0, CALCULATOR)
+    with redirect_stdout(io.StringIO()):
+        import ASTCalculator
+    return ASTCalculator
+
+def bench_calculator(calc, corpus, size, source, repeat):
+    '''
+    Lexer, recursive descent parser and evaluation of every
+    assignment; the module keeps its state in globals.
+    '''
+    def pipeline():
+        calc.ExpressionList.clear()
+        calc.assing_dict.clear()
+        calc.RecursiveDescentParser().parse(calc.Tokenizer().tokenize(source))
+        for value in calc.assing_dict.values():
+            str(value)
+
+    tokens = sum(1 for _ in calc.Tokenizer().tokenize(source))
+    return [result('calculator', corpus, size, tokens, pipeline, repeat)]
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(quick=False, repeat=5):
+    results = []
+    for corpus, size, source in lua_corpus(quick):
+        results.extend(bench_lua(corpus, size, source, repeat))
+    calc = load_calculator()
+    for corpus, size, source in calculator_corpus(quick):
+        results.extend(bench_calculator(calc, corpus, size, source, repeat))
+    return {
+        'format': FORMAT_VERSION,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+# ----------------------------------------
+# Reporte
+# ----------------------------------------
+def _key(r):
+    return (r['stage'], r['corpus'], r['size'])
+
+def print_table(report):
+    print(f"{'stage':<12}{'corpus':<22}{'size':>6}{'tokens':>9}{'best (ms)':>12}{'tokens/s':>12}")
+    for r in report['results']:
+        rate = r['tokens'] / r['best'] if r['best'] else 0
+        print(f"{r['stage']:<12}{r['corpus']:<22}{r['size']:>6}{r['tokens']:>9}"
+              f"{r['best'] * 1000:>12.2f}{rate:>12.0f}")
+
+def compare(report, baseline, threshold):
+    '''
+    Prints the cases that are {threshold} times slower than in
+    {baseline}; returns how many there are.
+    '''
+    base = {_key(r): r for r in baseline['results']}
+    regressions = 0
+    for r in report['results']:
+        old = base.get(_key(r))
+        if old is None or not old['best']:
+            continue
+        ratio = r['best'] / old['best']
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {r['stage']} {r['corpus']} {r['size']}: "
+                  f"{old['best'] * 1000:.2f} ms -> {r['best'] * 1000:.2f} ms ({ratio:.2f}x)")
+    print(f"{regressions} regressions against {baseline.get('revision')} (threshold {threshold}x)")
+    return regressions
+
+def main(argv=None):
+    args = argparse.ArgumentParser(description='MiniLua benchmark suite')
+    args.add_argument('-o', '--output', help='JSON file for the results')
+    args.add_argument('--quick', action='store_true', help='smaller corpora')
+    args.add_argument('--repeat', type=int, default=5)
+    args.add_argument('--compare', help='previous JSON results')
+    args.add_argument('--threshold', type=float, default=1.2)
+    args = args.parse_args(argv)
+
+    report = run(args.quick, args.repeat)
+    print_table(report)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            if compare(report, json.load(file), args.threshold):
+                raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# ----------------------------------------
+# Microbenchmark: Runtime.LuaTable (parte arreglo + hash) vs.
+# la tabla anterior, con todas las claves en un dict. Mide las
+# operaciones que usan los programas con indices enteros (como
+# 100Prisoners.lua): llenar 1..n, leer, sobrescribir, #t,
+# ipairs, pairs, table.insert al final, y la memoria por tabla.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_table.py [n]
+# ----------------------------------------
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Runtime import LuaTable, LuaError
+
+class DictTable:
+    '''
+    The LuaTable before the array part: one dict for every key.
+    '''
+    __slots__ = ('hash',)
+
+    def __init__(self, data=None):
+        self.hash = {} if data is None else data
+
+    def get(self, key):
+        return self.hash.get(key)
+
+    def set(self, key, value):
+        if value is None:
+            self.hash.pop(key, None)
+        elif key is None:
+            raise LuaError('table index is nil')
+        else:
+            self.hash[key] = value
+
+    def length(self):
+        n = 0
+        hash = self.hash
+        while n + 1 in hash:
+            n += 1
+        return n
+
+    def items(self):
+        return list(self.hash.items())
+
+# Con LuaTable las lecturas y escrituras van por la parte arreglo
+# sin llamar a get()/set(), como en Interpreter, VM y Transpiler.
+
+def filled(cls, n):
+    t = cls()
+    if cls is LuaTable:
+        for i in range(1, n + 1):
+            if i.__class__ is int and 0 < i <= len(t.array):
+                t.array[i - 1] = i
+            else:
+                t.set(i, i)
+    else:
+        for i in range(1, n + 1):
+            t.set(i, i)
+    return t
+
+def fill(cls, n, rounds):
+    for _ in range(rounds):
+        filled(cls, n)
+
+def read(cls, n, rounds):
+    t = filled(cls, n)
+    keys = [random.randint(1, n) for _ in range(n)]
+    if cls is LuaTable:
+        for _ in range(rounds):
+            for k in keys:
+                t.array[k - 1] if k.__class__ is int and 0 < k <= len(t.array) else t.get(k)
+    else:
+        for _ in range(rounds):
+            for k in keys:
+                t.get(k)
+
+def overwrite(cls, n, rounds):
+    t = filled(cls, n)
+    if cls is LuaTable:
+        for _ in range(rounds):
+            for i in range(1, n + 1):
+                if i.__class__ is int and 0 < i <= len(t.array):
+                    t.array[i - 1] = -i
+                else:
+                    t.set(i, -i)
+    else:
+        for _ in range(rounds):
+            for i in range(1, n + 1):
+                t.set(i, -i)
+
+def length(cls, n, rounds):
+    t = filled(cls, n)
+    for _ in range(rounds):
+        t.length()
+
+def ipairs(cls, n, rounds):
+    # el iterador de _ipairs en Runtime.py
+    t = filled(cls, n)
+    if cls is LuaTable:
+        for _ in range(rounds):
+            i = 1
+            array = t.array
+            while (array[i - 1] if i <= len(array) else t.get(i)) is not None:
+                i += 1
+    else:
+        for _ in range(rounds):
+            i = 1
+            while t.get(i) is not None:
+                i += 1
+
+def pairs(cls, n, rounds):
+    t = filled(cls, n)
+    t.set('name', 'x')
+    for _ in range(rounds):
+        for k, v in t.items():
+            pass
+
+def append(cls, n, rounds):
+    # table.insert(t, v): #t + 1 en cada llamada
+    for _ in range(rounds // 10 or 1):
+        t = cls()
+        for i in range(n):
+            t.set(t.length() + 1, i)
+
+CASES = [fill, read, overwrite, length, ipairs, pairs, append]
+
+def timed(case, cls, n, rounds, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        case(cls, n, rounds)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def memory(cls, n, count=200):
+    '''
+    Bytes per table of {n} integers 1..n.
+    '''
+    tracemalloc.start()
+    tables = [filled(cls, n) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(tables)
+
+def main(n=100):
+    rounds = max(1, 200_000 // n)
+    print(f'{n} integer keys, {rounds} rounds')
+    print(f"\n{'operation':<12}{'dict (s)':>12}{'hybrid (s)':>12}{'speedup':>10}")
+    for case in CASES:
+        old = timed(case, DictTable, n, rounds)
+        new = timed(case, LuaTable, n, rounds)
+        print(f'{case.__name__:<12}{old:>12.4f}{new:>12.4f}{old / new:>9.2f}x')
+    old = memory(DictTable, n)
+    new = memory(LuaTable, n)
+    print(f"\n{'memory':<12}{'dict (B)':>12}{'hybrid (B)':>12}{'ratio':>10}")
+    print(f"{'per table':<12}{old:>12.0f}{new:>12.0f}{old / new:>9.2f}x")
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
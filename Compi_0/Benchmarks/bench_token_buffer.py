@@ -0,0 +1,59 @@
+# ----------------------------------------
+# Benchmark: memoria por token de una lista de tokens de sly
+# vs. TokenBuffer, y analisis sintactico desde ambos.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_token_buffer.py
+# ----------------------------------------
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from TokenBuffer import TokenBuffer
+
+FUNCTION = '''function step{i}(state, n)
+    local total = state.total + n * {i};
+    if total > 100 then
+        print("overflow in step {i}", total);
+        total = total - 100;
+    end;
+    return total;
+end;
+'''
+
+def source(functions=20000):
+    return ''.join(FUNCTION.format(i=i) for i in range(functions))
+
+def traced(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main():
+    text = source()
+    tokens, list_bytes = traced(lambda: list(LuaLexer().tokenize(text)))
+    buffer, buffer_bytes = traced(lambda: TokenBuffer.from_source(text))
+    n = len(tokens)
+    print(f'{n} tokens, {len(buffer.values)} distinct values')
+    print(f"{'storage':<16}{'bytes / token':>16}")
+    print(f"{'list of Token':<16}{list_bytes / n:>16.1f}")
+    print(f"{'TokenBuffer':<16}{buffer_bytes / n:>16.1f}")
+    print(f"{'reduction':<16}{list_bytes / buffer_bytes:>15.1f}x")
+
+    start = time.perf_counter()
+    from_list = LuaParser().parse(iter(tokens))
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    from_buffer = LuaParser().parse(buffer.tokens())
+    buffer_time = time.perf_counter() - start
+    assert from_list == from_buffer
+    print(f'parse from list {list_time:.2f}s, from buffer {buffer_time:.2f}s')
+
+if __name__ == '__main__':
+    main()
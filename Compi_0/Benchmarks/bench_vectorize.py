@@ -0,0 +1,83 @@
+# ----------------------------------------
+# Benchmark: for numericos vectorizados con NumPy (Vectorize.py)
+#
+# Corre con Interpreter.ClosureCompiler ciclos cuyo cuerpo es de
+# la forma t[i] = exp sobre tablas de distintos tamanos, con la
+# vectorizacion apagada (VECTOR_MIN infinito: el ciclo normal) y
+# prendida. Casos: llenar una tabla nueva (secrets[i] = i, como
+# en 100Prisoners.lua), t[i] = a[i] * k + b[i] sobre tablas
+# llenas, y dos sentencias con floats y division.
+#
+# Uso (desde Compi_0):  python Benchmarks/bench_vectorize.py [n ...]
+# ----------------------------------------
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from Interpreter import ClosureCompiler
+import Vectorize
+
+SETUP = '''
+local a = {{}};
+local b = {{}};
+local t = {{}};
+for i = 1, {n} do a[i] = i; b[i] = i + 0.5; t[i] = 0; end;
+local k = 3;
+'''
+
+# Cada caso se repite {rounds} veces dentro del programa
+CASES = {
+    'fill': '''
+for r = 1, {rounds} do
+    local secrets = {{}};
+    for i = 1, {n} do secrets[i] = i; end;
+end;
+''',
+    'axpy': '''
+for r = 1, {rounds} do
+    for i = 1, {n} do t[i] = a[i] * k + b[i]; end;
+end;
+''',
+    'two stmts': '''
+for r = 1, {rounds} do
+    for i = 1, {n} do t[i] = (a[i] + b[i]) / 2; b[i] = t[i] - i * 0.5; end;
+end;
+''',
+}
+
+def compile_program(source):
+    program = LuaParser().parse(iter(LuaLexer().tokenize(source)))
+    return ClosureCompiler().compile(program)
+
+def timed(chunk, minimum, repeat=3):
+    saved = Vectorize.VECTOR_MIN
+    Vectorize.VECTOR_MIN = minimum
+    try:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunk()
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        Vectorize.VECTOR_MIN = saved
+
+def main(sizes=(100, 1000, 100_000)):
+    if Vectorize.numpy() is None:
+        print('NumPy is not installed: every loop runs the scalar path')
+        return
+    print(f"{'case':<12}{'n':>8}{'scalar (s)':>12}{'numpy (s)':>12}{'speedup':>10}")
+    for n in sizes:
+        rounds = max(1, 1_000_000 // n)
+        for name, case in CASES.items():
+            chunk = compile_program(SETUP.format(n=n) + case.format(n=n, rounds=rounds))
+            old = timed(chunk, float('inf'))
+            new = timed(chunk, 0)
+            print(f'{name:<12}{n:>8}{old:>12.3f}{new:>12.3f}{old / new:>9.2f}x')
+
+if __name__ == '__main__':
+    main(*[tuple(map(int, sys.argv[1:]))] if sys.argv[1:] else ())
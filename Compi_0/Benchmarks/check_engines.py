@@ -0,0 +1,88 @@
+# ----------------------------------------
+# Prueba de las tres formas de ejecutar Lua
+#
+# Corre cada caso con el interprete por closures (-r), la VM de
+# bytecode (-v) y la traduccion a Python (-y, con un cache de
+# code objects temporal) y compara lo que imprime cada uno con
+# la salida esperada, que es la de Lua 5.1. Imprime los casos
+# que fallan y termina con error si hay alguno.
+#
+# Uso (desde Compi_0):  python Benchmarks/check_engines.py
+# ----------------------------------------
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from Runtime import LuaError
+import CodeCache
+import Interpreter
+import VM
+
+# (nombre, fuente, salida esperada)
+CASES = [
+    ('nan', '''
+        local nan = 0/0;
+        print(nan == nan, nan ~= nan, 0/0 == 0/0, 0/0 ~= 0/0);
+        local t = {}; t["x"] = 0/0;
+        print(t["x"] == t["x"], t["x"] ~= nan);
+    ''', 'false\ttrue\tfalse\ttrue\nfalse\ttrue\n'),
+    ('equality', '''
+        local t = {}; local u = {};
+        print(t == t, t == u, 1 == 1.0, "1" == 1, nil == false);
+    ''', 'true\tfalse\ttrue\tfalse\tfalse\n'),
+    ('library', '''
+        print(math.floor(3.5), math.max(1, 5, 2), string.upper(5), string.len(12));
+        print(math.sqrt(-1) ~= math.sqrt(-1), math.log(0));
+    ''', '3\t5\t5\t2\ntrue\t-inf\n'),
+    ('bad argument', '''
+        print(math.floor(nil));
+    ''', "LuaError: bad argument #1 to 'floor' (number expected, got nil)\n"),
+    ('bad argument', '''
+        print(string.rep("a"));
+    ''', "LuaError: bad argument #2 to 'rep' (number expected, got no value)\n"),
+    ('bad argument', '''
+        table.insert(nil, 1);
+    ''', "LuaError: bad argument #1 to 'insert' (table expected, got nil)\n"),
+]
+
+def parse(source):
+    return LuaParser().parse(LuaLexer().tokenize(source))
+
+def output(run, source):
+    '''
+    What {run}({source}) prints, with its LuaError if any.
+    '''
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        try:
+            run(source)
+        except LuaError as e:
+            print(f'LuaError: {e}')
+    return out.getvalue()
+
+def main():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engines = {
+            '-r': lambda source: Interpreter.run(parse(source)),
+            '-v': lambda source: VM.run(parse(source)),
+            '-y': lambda source: CodeCache.run_source(source, cache_dir=cache_dir),
+        }
+        failed = 0
+        for name, source, expected in CASES:
+            for engine, run in engines.items():
+                got = output(run, source)
+                if got != expected:
+                    failed += 1
+                    print(f'{name} {engine}: expected {expected!r}, got {got!r}')
+    print(f'{len(CASES)} cases, {len(engines)} engines, {failed} failures')
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# ----------------------------------------
+# Prueba diferencial de Vectorize.py
+#
+# Genera programas al azar con un for numerico vectorizable
+# (t[i] = exp con + - * /, lecturas a[i], la variable del for,
+# numeros y variables) sobre tablas de enteros, floats, tipos
+# mezclados, huecos (nil), claves en el hash y strings, con
+# limites y pasos positivos y negativos. Cada programa corre
+# con Interpreter.ClosureCompiler con la vectorizacion apagada
+# (VECTOR_MIN infinito) y prendida (VECTOR_MIN = 1, para que la
+# pruebe en ciclos cortos); la salida, que imprime el largo y
+# todos los pares de cada tabla en el orden de pairs(), tiene
+# que ser la misma. Al primer programa distinto lo imprime y
+# termina con error.
+#
+# Uso (desde Compi_0):  python Benchmarks/check_vectorize.py [seed [programas]]
+# ----------------------------------------
+import contextlib
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Lexer import LuaLexer
+from Parser import LuaParser
+from Interpreter import ClosureCompiler
+from Runtime import LuaError
+import Vectorize
+
+TABLES = ('a', 'b', 'c')
+
+# Incluye -0.0, overflow de float, enteros cerca de 2^62 (overflow
+# de int64 al multiplicar) y 2^53 + 1 (no exacto como double)
+NUMBERS = ('0', '1', '2', '3', '-1', '0.5', '2.5', '-0.0', '1e308',
+           '4611686018427387904', '3037000500', '9007199254740993')
+
+KINDS = ('int', 'float', 'mix', 'hole', 'hash', 'str')
+
+def expression(rng, depth=0):
+    if depth > 2 or rng.random() < 0.3:
+        return rng.choice(['i', rng.choice(NUMBERS), 'k', 'x',
+                           f'{rng.choice(TABLES)}[i]', f'{rng.choice(TABLES)}[i]'])
+    return (f'({expression(rng, depth + 1)} {rng.choice("+-*/")} '
+            f'{expression(rng, depth + 1)})')
+
+def table(rng, name):
+    n = rng.randint(0, 12)
+    kind = rng.choice(KINDS)
+    lines = [f'local {name} = {{}};']
+    for j in range(1, n + 1):
+        value = {'int': str(j),
+                 'float': f'{j}.5',
+                 'mix': rng.choice([str(j), f'{j}.5']),
+                 'hole': rng.choice([str(j), 'nil']),
+                 'hash': str(j),
+                 'str': rng.choice([str(j), f'"{j}"'])}[kind]
+        lines.append(f'{name}[{j}] = {value};')
+    if kind == 'hash':
+        lines.append(f'{name}["name"] = 1; {name}[{n + 3}] = 7;')
+    return lines
+
+def program(rng):
+    '''
+    Source of one random program.
+    '''
+    lines = [f'local k = {rng.choice(NUMBERS)};', f'x = {rng.choice(NUMBERS)};']
+    for name in TABLES:
+        lines.extend(table(rng, name))
+    if rng.random() < 0.2:
+        # dos nombres para la misma tabla
+        lines.append('c = a;')
+    start, stop = rng.randint(-1, 5), rng.randint(-1, 14)
+    step = rng.choice([1, 1, 1, 2, -1, -2])
+    if step < 0:
+        start, stop = stop, start
+    body = ' '.join(f'{rng.choice(TABLES)}[i] = {expression(rng)};'
+                    for _ in range(rng.randint(1, 3)))
+    lines.append(f'for i = {start}, {stop}, {step} do {body} end;')
+    for name in TABLES:
+        lines.append(f'print("{name}", table.getn({name})); '
+                     f'for key, v in pairs({name}) do print(key, v); end;')
+    return '\n'.join(lines)
+
+def output(source, minimum):
+    '''
+    What {source} prints with Vectorize.VECTOR_MIN = {minimum}.
+    '''
+    program = LuaParser().parse(LuaLexer().tokenize(source))
+    chunk = ClosureCompiler().compile(program)
+    out = io.StringIO()
+    saved = Vectorize.VECTOR_MIN
+    Vectorize.VECTOR_MIN = minimum
+    try:
+        with contextlib.redirect_stdout(out):
+            chunk()
+    except LuaError as e:
+        out.write(f'LuaError: {e}\n')
+    finally:
+        Vectorize.VECTOR_MIN = saved
+    return out.getvalue()
+
+def main(seed=0, count=3000):
+    if Vectorize.numpy() is None:
+        print('NumPy is not installed: nothing to check')
+        return
+    rng = random.Random(seed)
+    vectorized = 0
+    run = Vectorize.VectorLoop.run
+    def counted(self, r, values):
+        nonlocal vectorized
+        done = run(self, r, values)
+        vectorized += done
+        return done
+    Vectorize.VectorLoop.run = counted
+    try:
+        for _ in range(count):
+            source = program(rng)
+            scalar = output(source, float('inf'))
+            vector = output(source, 1)
+            if scalar != vector:
+                print(source)
+                print('--- scalar\n' + scalar)
+                print('--- vectorized\n' + vector)
+                raise SystemExit(1)
+    finally:
+        Vectorize.VectorLoop.run = run
+    print(f'{count} programs, same output; {vectorized} loops ran vectorized')
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
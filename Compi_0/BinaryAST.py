@@ -0,0 +1,275 @@
+# ----------------------------------------
+# Formato binario compacto para los AST de LuaParser
+#
+# Pensado para guardar o enviar AST ya parseados y volver a
+# cargarlos sin el lexer ni el parser. El archivo tiene:
+#
+#   MAGIC, version del formato, hash de los nodos de Parser.py
+#   tabla de cadenas: cantidad, y cada una (largo, utf-8)
+#   arbol: cada valor empieza con un byte de tipo
+#       NONE FALSE TRUE
+#       INT      entero zigzag
+#       FLOAT    8 bytes (double, little endian)
+#       STR      indice en la tabla de cadenas
+#       LIST     cantidad de elementos, y los elementos
+#       NODE+k   nodo de la clase NODE_TYPES[k], y sus campos
+#   indice de funciones: cantidad, y (nombre, posicion) de cada
+#   DefFunction, con la posicion relativa al inicio del arbol
+#   posicion del indice (8 bytes)
+#
+# Las cantidades, largos e indices son varints (LEB128). Los
+# nombres de Name, Var y String, y los operadores, se guardan
+# una sola vez en la tabla de cadenas.
+#
+# ASTFile abre el archivo con mmap y solo lee el encabezado, la
+# tabla de cadenas y el indice; cada funcion se decodifica
+# cuando se pide.
+#
+#   BinaryAST.dump(program, 'prog.ast')
+#   ast = BinaryAST.ASTFile('prog.ast')
+#   ast.function('shuffle')      # solo ese DefFunction
+#   ast.program()                # todo el Program
+# ----------------------------------------
+import hashlib
+import mmap
+import struct
+from dataclasses import fields
+from Parser import DefFunction
+from ParseCache import NODE_TYPES
+
+MAGIC = b'MLAST'
+FORMAT_VERSION = 1
+
+NONE, FALSE, TRUE, INT, FLOAT, STR, LIST = range(7)
+NODE = 16
+
+_TAGS = {cls: NODE + tag for tag, cls in enumerate(NODE_TYPES)}
+_FIELDS = {cls: tuple(f.name for f in fields(cls)) for cls in NODE_TYPES}
+_DOUBLE = struct.Struct('<d')
+_OFFSET = struct.Struct('<Q')
+
+def schema():
+    '''
+    Hash of the node classes and their fields: a file written
+    with other AST nodes is rejected.
+    '''
+    text = ';'.join(f'{cls.__name__}({",".join(_FIELDS[cls])})' for cls in NODE_TYPES)
+    return hashlib.sha256(text.encode()).digest()[:8]
+
+_HEADER = MAGIC + bytes([FORMAT_VERSION]) + schema()
+
+class FormatError(ValueError):
+    pass
+
+# ----------------------------------------
+# Escritura
+# ----------------------------------------
+def _varint(out, n):
+    while n > 0x7f:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+class _Writer:
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {}
+        self.functions = []     # (indice del nombre, posicion)
+
+    def string(self, text):
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def value(self, value):
+        out = self.out
+        cls = value.__class__
+        tag = _TAGS.get(cls)
+        if tag is not None:
+            if cls is DefFunction:
+                name = value.function.value.value
+                self.functions.append((self.string(name), len(out)))
+            out.append(tag)
+            for name in _FIELDS[cls]:
+                self.value(getattr(value, name))
+        elif cls is list:
+            out.append(LIST)
+            _varint(out, len(value))
+            for item in value:
+                self.value(item)
+        elif cls is str:
+            out.append(STR)
+            _varint(out, self.string(value))
+        elif value is None:
+            out.append(NONE)
+        elif cls is bool:
+            out.append(TRUE if value else FALSE)
+        elif cls is int:
+            out.append(INT)
+            _varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif cls is float:
+            out.append(FLOAT)
+            out += _DOUBLE.pack(value)
+        else:
+            raise TypeError(f'cannot serialize {cls.__name__}')
+
+def dumps(program):
+    '''
+    Binary form of the AST {program}.
+    '''
+    writer = _Writer()
+    writer.value(program)
+    out = bytearray(_HEADER)
+    _varint(out, len(writer.strings))
+    for text in writer.strings:
+        data = text.encode('utf-8')
+        _varint(out, len(data))
+        out += data
+    _varint(out, len(writer.out))
+    out += writer.out
+    index = len(out)
+    _varint(out, len(writer.functions))
+    for name, offset in writer.functions:
+        _varint(out, name)
+        _varint(out, offset)
+    out += _OFFSET.pack(index)
+    return bytes(out)
+
+def dump(program, filename):
+    with open(filename, 'wb') as file:
+        file.write(dumps(program))
+
+# ----------------------------------------
+# Lectura
+# ----------------------------------------
+class _Reader:
+    '''
+    Decoder over {data} (bytes or an mmap), with the values of
+    the string table in {strings}.
+    '''
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+
+    def varint(self):
+        data = self.data
+        pos = self.pos
+        n = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            n |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return n
+            shift += 7
+
+    def value(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag >= NODE:
+            cls = NODE_TYPES[tag - NODE]
+            return cls(*[self.value() for _ in _FIELDS[cls]])
+        if tag == LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == STR:
+            return self.strings[self.varint()]
+        if tag == INT:
+            n = self.varint()
+            return -((n + 1) >> 1) if n & 1 else n >> 1
+        if tag == FLOAT:
+            value, = _DOUBLE.unpack_from(self.data, self.pos)
+            self.pos += 8
+            return value
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        raise FormatError(f'unknown tag {tag} at byte {self.pos - 1}')
+
+class ASTFile:
+    '''
+    Serialized AST read on demand from {source}: a file name
+    (opened with mmap) or bytes. Only the header, the string
+    table and the function index are read when it is opened.
+    '''
+    def __init__(self, source):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._mmap = None
+            data = source
+        else:
+            with open(source, 'rb') as file:
+                self._mmap = data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(data) < len(_HEADER) + _OFFSET.size or data[:len(_HEADER)] != _HEADER:
+            self.close()
+            if data[:len(MAGIC)] != MAGIC:
+                raise FormatError('not a MiniLua binary AST')
+            raise FormatError('binary AST written with another format or node set')
+        reader = _Reader(data, len(_HEADER))
+        strings = reader.strings
+        for _ in range(reader.varint()):
+            size = reader.varint()
+            strings.append(str(data[reader.pos:reader.pos + size], 'utf-8'))
+            reader.pos += size
+        size = reader.varint()
+        self.tree = reader.pos
+        index, = _OFFSET.unpack_from(data, len(data) - _OFFSET.size)
+        if index != self.tree + size:
+            self.close()
+            raise FormatError('truncated binary AST')
+        reader.pos = index
+        self.functions = {}
+        for _ in range(reader.varint()):
+            name = strings[reader.varint()]
+            offset = reader.varint()
+            # la primera definicion con ese nombre
+            self.functions.setdefault(name, offset)
+        self.data = data
+        self.strings = strings
+
+    def _decode(self, offset):
+        reader = _Reader(self.data, self.tree + offset)
+        reader.strings = self.strings
+        return reader.value()
+
+    def program(self):
+        '''
+        The whole Program.
+        '''
+        return self._decode(0)
+
+    def function(self, name):
+        '''
+        The first DefFunction of {name} (e.g. 'shuffle' or
+        'M.helper'), at any depth, decoded alone.
+        '''
+        try:
+            offset = self.functions[name]
+        except KeyError:
+            raise KeyError(f'no function {name!r} in the binary AST') from None
+        return self._decode(offset)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def loads(data):
+    '''
+    Program stored in the bytes {data}.
+    '''
+    return ASTFile(data).program()
+
+def load(filename):
+    with ASTFile(filename) as ast:
+        return ast.program()
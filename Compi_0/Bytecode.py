@@ -0,0 +1,623 @@
+# ----------------------------------------
+# Compilador a bytecode de registros para MiniLua
+#
+# Baja el AST de LuaParser a un bytecode al estilo de
+# Lua 5.1. Cada instruccion ocupa cuatro enteros
+# (op, A, B, C) dentro de un array('i').
+# ----------------------------------------
+from array import array
+from Parser import Number, String, Var, Name, CallTable, CallFunction
+from Runtime import LuaError, lua_string_literal, lua_tostring
+from Analysis import source_order, call_args, captured_names, concat_operands
+
+# ----------------------------------------
+# Opcodes
+#
+# R[x] registro, K[x] constante, U[x] upvalue.
+# RK(x) es R[x] si x >= 0 y K[~x] si x < 0.
+# Los saltos guardan la posicion absoluta en el array.
+# ----------------------------------------
+OPNAMES = [
+    'MOVE',      # A B      R[A] = R[B]
+    'LOADK',     # A B      R[A] = K[B]
+    'LOADNIL',   # A B      R[A..A+B-1] = nil
+    'GETGLOBAL', # A B      R[A] = G[K[B]]
+    'SETGLOBAL', # A B      G[K[B]] = R[A]
+    'GETUPVAL',  # A B      R[A] = U[B][0]
+    'SETUPVAL',  # A B      U[B][0] = R[A]
+    'GETCELL',   # A B      R[A] = R[B][0]     local capturado
+    'SETCELL',   # A B      R[A][0] = R[B]
+    'BOX',       # A        R[A] = [R[A]]
+    'GETTABLE',  # A B C    R[A] = R[B][RK(C)]
+    'SETTABLE',  # A B C    R[A][RK(B)] = RK(C)
+    'NEWTABLE',  # A        R[A] = {}
+    'ADD',       # A B C    R[A] = RK(B) + RK(C)
+    'SUB',
+    'MUL',
+    'DIV',
+    'MOD',
+    'POW',
+    'CONCAT',    # A B C    R[A] = RK(B) .. RK(C)
+    'NOT',       # A B      R[A] = not R[B]
+    'EQ',        # A B C    R[A] = RK(B) == RK(C)
+    'NE',
+    'LT',
+    'LE',
+    'JMP',       # B        pc = B
+    'JMPIF',     # A B      if R[A] then pc = B
+    'JMPIFNOT',  # A B      if not R[A] then pc = B
+    'CALL',      # A B C    R[A..A+C-2] = R[A](R[A+1..A+B-1]), 0 = hasta top
+    'RETURN',    # A B      return R[A..A+B-2], 0 = hasta top
+    'FORPREP',   # A B      R[A] -= R[A+2]; pc = B
+    'FORLOOP',   # A B      R[A] += R[A+2]; if R[A] <?= R[A+1] { pc = B; R[A+3] = R[A] }
+    'TFORLOOP',  # A B C    R[A+3..A+2+C] = R[A](R[A+1], R[A+2]); if R[A+3] ~= nil { R[A+2] = R[A+3]; pc = B }
+    'CLOSURE',   # A B      R[A] = closure(P[B])
+    'CONCATN',   # A B C    R[A] = R[B] .. ... .. R[B+C-1]
+]
+
+for _index, _name in enumerate(OPNAMES):
+    globals()[_name] = _index
+
+_ARITH = {
+    '+': ADD, '-': SUB, '*': MUL, '/': DIV, '%': MOD, '^': POW,
+    '..': CONCAT, '==': EQ, '~=': NE, '<': LT, '<=': LE,
+}
+
+class Proto:
+    '''
+    A compiled function: instructions, constants, nested
+    functions and how to capture its upvalues.
+    '''
+    __slots__ = ('name', 'code', 'constants', 'protos', 'upvals',
+                 'upnames', 'nparams', 'maxstack')
+
+    def __init__(self, name):
+        self.name = name
+        self.code = array('i')
+        self.constants = []
+        self.protos = []
+        self.upvals = []        # (1, registro del padre) o (0, upvalue del padre)
+        self.upnames = []
+        self.nparams = 0
+        self.maxstack = 0
+
+    def __len__(self):
+        return len(self.code) // 4
+
+class _FuncState:
+    def __init__(self, parent, proto, stmtlist):
+        self.parent = parent
+        self.proto = proto
+        self.blocks = [{}]
+        self.freereg = 0
+        self.captured = captured_names(stmtlist)
+        self.upindex = {}
+        self.kindex = {}
+        self.loops = []
+
+    def lookup(self, name):
+        for block in reversed(self.blocks):
+            if name in block:
+                return block[name]
+        return None
+
+class BytecodeCompiler:
+    '''
+    Lowers a Program into a tree of Proto objects.
+    '''
+    def compile(self, program, name='main chunk'):
+        return self.function(None, [], program.stmtlist, name)
+
+    # ----------------------------------------
+    # Utilidades
+    # ----------------------------------------
+    def emit(self, op, a=0, b=0, c=0):
+        code = self.fs.proto.code
+        pc = len(code)
+        code.extend((op, a, b, c))
+        return pc
+
+    def here(self):
+        return len(self.fs.proto.code)
+
+    def patch(self, pc, target=None):
+        self.fs.proto.code[pc + 2] = self.here() if target is None else target
+
+    def constant(self, value):
+        key = (value.__class__, value)
+        fs = self.fs
+        if key not in fs.kindex:
+            fs.kindex[key] = len(fs.proto.constants)
+            fs.proto.constants.append(value)
+        return fs.kindex[key]
+
+    def reserve(self, n=1):
+        fs = self.fs
+        reg = fs.freereg
+        fs.freereg += n
+        if fs.freereg > fs.proto.maxstack:
+            fs.proto.maxstack = fs.freereg
+        return reg
+
+    def enter_block(self):
+        self.fs.blocks.append({})
+        return self.fs.freereg
+
+    def leave_block(self, saved):
+        self.fs.blocks.pop()
+        self.fs.freereg = saved
+
+    def declare(self, name, reg):
+        '''
+        Binds {name} to register {reg}, boxing it if an inner function uses it.
+        '''
+        boxed = name in self.fs.captured
+        self.fs.blocks[-1][name] = (reg, boxed)
+        if boxed:
+            self.emit(BOX, reg)
+        return boxed
+
+    def resolve(self, name):
+        '''
+        ('local', reg, boxed), ('upval', index) or ('global', name).
+        '''
+        where = self.fs.lookup(name)
+        if where is not None:
+            return ('local',) + where
+        index = self._upvalue(self.fs, name)
+        if index is not None:
+            return ('upval', index)
+        return ('global', name)
+
+    def _upvalue(self, fs, name):
+        if name in fs.upindex:
+            return fs.upindex[name]
+        parent = fs.parent
+        if parent is None:
+            return None
+        where = parent.lookup(name)
+        if where is not None:
+            reg, boxed = where
+            desc = (1, reg)
+        else:
+            index = self._upvalue(parent, name)
+            if index is None:
+                return None
+            desc = (0, index)
+        fs.upindex[name] = len(fs.proto.upvals)
+        fs.proto.upvals.append(desc)
+        fs.proto.upnames.append(name)
+        return fs.upindex[name]
+
+    # ----------------------------------------
+    # Funciones
+    # ----------------------------------------
+    def function(self, parent, params, stmtlist, name):
+        proto = Proto(name)
+        self.fs = _FuncState(parent, proto, stmtlist)
+        proto.nparams = len(params)
+        base = self.reserve(len(params))
+        for i, param in enumerate(params):
+            self.declare(param, base + i)
+        self.block(stmtlist)
+        self.emit(RETURN, 0, 1)
+        self.fs = parent
+        return proto
+
+    def closure(self, node, dest, name='function'):
+        params = [p.value for p in source_order(node.params)]
+        proto = self.function(self.fs, params, node.stmtlist, name)
+        index = len(self.fs.proto.protos)
+        self.fs.proto.protos.append(proto)
+        self.emit(CLOSURE, dest, index)
+
+    # ----------------------------------------
+    # Expresiones
+    # ----------------------------------------
+    def expr(self, node, dest):
+        '''
+        Emits code that leaves the value of {node} in R[dest].
+        '''
+        saved = self.fs.freereg
+        method = getattr(self, 'expr_' + node.__class__.__name__, None)
+        if method is None:
+            raise LuaError(f'cannot compile {node.__class__.__name__}')
+        method(node, dest)
+        self.fs.freereg = saved
+
+    def anyreg(self, node):
+        '''
+        Register holding the value of {node}. Plain locals are
+        used in place; anything else goes to a new temporary.
+        '''
+        if isinstance(node, (Name, Var)) and '.' not in node.value:
+            where = self.fs.lookup(node.value)
+            if where is not None and not where[1]:
+                return where[0]
+        reg = self.reserve()
+        self.expr(node, reg)
+        return reg
+
+    def rk(self, node):
+        if isinstance(node, Number):
+            return ~self.constant(node.value)
+        if isinstance(node, String):
+            return ~self.constant(lua_string_literal(node.value))
+        return self.anyreg(node)
+
+    def expr_Number(self, node, dest):
+        self.emit(LOADK, dest, self.constant(node.value))
+
+    def expr_String(self, node, dest):
+        self.emit(LOADK, dest, self.constant(lua_string_literal(node.value)))
+
+    def expr_Boolean(self, node, dest):
+        self.emit(LOADK, dest, self.constant(node.value))
+
+    def expr_Nil(self, node, dest):
+        self.emit(LOADNIL, dest, 1)
+
+    def load_name(self, name, dest):
+        where = self.resolve(name)
+        if where[0] == 'local':
+            reg, boxed = where[1], where[2]
+            if boxed:
+                self.emit(GETCELL, dest, reg)
+            elif reg != dest:
+                self.emit(MOVE, dest, reg)
+        elif where[0] == 'upval':
+            self.emit(GETUPVAL, dest, where[1])
+        else:
+            self.emit(GETGLOBAL, dest, self.constant(name))
+
+    def store_name(self, name, src):
+        where = self.resolve(name)
+        if where[0] == 'local':
+            reg, boxed = where[1], where[2]
+            if boxed:
+                self.emit(SETCELL, reg, src)
+            elif reg != src:
+                self.emit(MOVE, reg, src)
+        elif where[0] == 'upval':
+            self.emit(SETUPVAL, src, where[1])
+        else:
+            self.emit(SETGLOBAL, src, self.constant(name))
+
+    def expr_Name(self, node, dest):
+        parts = node.value.split('.')
+        self.load_name(parts[0], dest)
+        for key in parts[1:]:
+            self.emit(GETTABLE, dest, dest, ~self.constant(key))
+
+    expr_Var = expr_Name
+
+    def expr_Not(self, node, dest):
+        self.emit(NOT, dest, self.anyreg(node.value))
+
+    def expr_Table(self, node, dest):
+        self.emit(NEWTABLE, dest)
+        for data in source_order(node.data):
+            saved = self.fs.freereg
+            if isinstance(data.value, Name):
+                key = ~self.constant(data.value.value)
+            else:
+                key = self.rk(data.value)
+            self.emit(SETTABLE, dest, key, self.rk(data.exp))
+            self.fs.freereg = saved
+
+    def expr_CallTable(self, node, dest):
+        table = self.anyreg(node.table)
+        self.emit(GETTABLE, dest, table, self.rk(node.field))
+
+    def expr_FunctionBody(self, node, dest):
+        self.closure(node, dest)
+
+    def expr_CallFunction(self, node, dest):
+        base = self.call(node, 1)
+        if base != dest:
+            self.emit(MOVE, dest, base)
+
+    def expr_Binop(self, node, dest):
+        op = node.operator
+        if op == 'and' or op == 'or':
+            self.expr(node.left, dest)
+            jump = self.emit(JMPIFNOT if op == 'and' else JMPIF, dest)
+            self.expr(node.right, dest)
+            self.patch(jump)
+            return
+        if op == '..':
+            operands = concat_operands(node)
+            if len(operands) > 2:
+                # los operandos en registros consecutivos, como en Lua
+                base = self.reserve(len(operands))
+                for i, operand in enumerate(operands):
+                    self.expr(operand, base + i)
+                self.emit(CONCATN, dest, base, len(operands))
+                return
+        b = self.rk(node.left)
+        c = self.rk(node.right)
+        if op == '>':
+            self.emit(LT, dest, c, b)
+        elif op == '>=':
+            self.emit(LE, dest, c, b)
+        elif op in _ARITH:
+            self.emit(_ARITH[op], dest, b, c)
+        else:
+            raise LuaError(f'unknown operator {op}')
+
+    def call(self, node, nresults):
+        '''
+        Emits a call on fresh registers. Returns the base register,
+        where the results are left. nresults = -1 keeps them all.
+        '''
+        base = self.reserve()
+        callee = node.value
+        self.expr(callee, base)
+        args = call_args(node)
+        nargs = self.explist(args, -1)
+        self.emit(CALL, base, 0 if nargs < 0 else nargs + 1, nresults + 1)
+        return base
+
+    def explist(self, nodes, want):
+        '''
+        Puts the values of {nodes} in consecutive new registers.
+        With want = -1 the last call keeps all its results (and the
+        count is returned as -1); otherwise exactly {want} values.
+        '''
+        base = self.fs.freereg
+        count = len(nodes)
+        for i, node in enumerate(nodes):
+            last = i == count - 1
+            if last and isinstance(node, CallFunction):
+                if want < 0:
+                    self.call(node, -1)
+                    return -1
+                needed = max(want - i, 0)
+                self.call(node, needed)
+                self.fs.freereg = base + i + needed
+                if needed:
+                    self.reserve(0)
+                    return want
+                break
+            reg = self.reserve()
+            self.expr(node, reg)
+        if want < 0:
+            return count
+        if count < want:
+            self.emit(LOADNIL, base + count, want - count)
+        self.fs.freereg = base + max(want, 0)
+        self.reserve(0)
+        return want
+
+    # ----------------------------------------
+    # Statements
+    # ----------------------------------------
+    def block(self, stmtlist):
+        for stmt in stmtlist:
+            method = getattr(self, 'stmt_' + stmt.__class__.__name__, None)
+            if method is None:
+                raise LuaError(f'cannot compile {stmt.__class__.__name__}')
+            method(stmt)
+
+    def scoped_block(self, stmtlist):
+        saved = self.enter_block()
+        self.block(stmtlist)
+        self.leave_block(saved)
+
+    def stmt_Assignment(self, node):
+        targets = source_order(node.varlist)
+        exps = source_order(node.explist)
+        if node.local:
+            base = self.fs.freereg
+            self.explist(exps, len(targets))
+            for i, target in enumerate(targets):
+                self.declare(target.value, base + i)
+            return
+        saved = self.fs.freereg
+        if len(targets) == 1 and len(exps) == 1:
+            target = targets[0]
+            if isinstance(target, CallTable):
+                table = self.anyreg(target.field)
+                key = self.rk(target.table)
+                self.emit(SETTABLE, table, key, self.rk(exps[0]))
+            else:
+                self.store(target.value, self.anyreg(exps[0]))
+            self.fs.freereg = saved
+            return
+        # Todos los valores se evaluan antes de asignar.
+        base = self.fs.freereg
+        self.explist(exps, len(targets))
+        for i, target in enumerate(targets):
+            if isinstance(target, CallTable):
+                inner = self.fs.freereg
+                table = self.anyreg(target.field)
+                key = self.rk(target.table)
+                self.emit(SETTABLE, table, key, base + i)
+                self.fs.freereg = inner
+            else:
+                self.store(target.value, base + i)
+        self.fs.freereg = saved
+
+    def store(self, path, src):
+        parts = path.split('.')
+        if len(parts) == 1:
+            self.store_name(path, src)
+            return
+        table = self.reserve()
+        self.expr(Name('.'.join(parts[:-1])), table)
+        self.emit(SETTABLE, table, ~self.constant(parts[-1]), src)
+
+    def stmt_CallFunction(self, node):
+        saved = self.fs.freereg
+        self.call(node, 0)
+        self.fs.freereg = saved
+
+    def stmt_DefFunction(self, node):
+        function = node.function
+        name = function.value.value
+        if node.local:
+            reg = self.reserve()
+            if self.declare_pending(name, reg):
+                tmp = self.reserve()
+                self.closure(function.funcbody, tmp, name)
+                self.emit(SETCELL, reg, tmp)
+                self.fs.freereg = reg + 1
+            else:
+                self.closure(function.funcbody, reg, name)
+            return
+        saved = self.fs.freereg
+        tmp = self.reserve()
+        self.closure(function.funcbody, tmp, name)
+        self.store(name, tmp)
+        self.fs.freereg = saved
+
+    def declare_pending(self, name, reg):
+        '''
+        Declares a local that must be visible before its value
+        exists (local function). Returns True when it is boxed.
+        '''
+        if name in self.fs.captured:
+            self.emit(LOADNIL, reg, 1)
+        return self.declare(name, reg)
+
+    def stmt_Do(self, node):
+        self.scoped_block(node.stmtlist)
+
+    def stmt_While(self, node):
+        start = self.here()
+        saved = self.fs.freereg
+        cond = self.anyreg(node.cond)
+        exit_jump = self.emit(JMPIFNOT, cond)
+        self.fs.freereg = saved
+        self.fs.loops.append([])
+        self.scoped_block(node.stmtlist)
+        self.emit(JMP, 0, start)
+        self.patch(exit_jump)
+        for jump in self.fs.loops.pop():
+            self.patch(jump)
+
+    def stmt_If(self, node):
+        saved = self.fs.freereg
+        cond = self.anyreg(node.cond)
+        else_jump = self.emit(JMPIFNOT, cond)
+        self.fs.freereg = saved
+        self.scoped_block(node.stmtlist)
+        if node.elsepart:
+            end_jump = self.emit(JMP)
+            self.patch(else_jump)
+            self.scoped_block(node.elsepart)
+            self.patch(end_jump)
+        else:
+            self.patch(else_jump)
+
+    def stmt_Return(self, node):
+        saved = self.fs.freereg
+        exps = source_order(node.exprlist)
+        if not exps:
+            self.emit(RETURN, 0, 1)
+        elif len(exps) == 1 and not isinstance(exps[0], CallFunction):
+            self.emit(RETURN, self.anyreg(exps[0]), 2)
+        else:
+            base = self.fs.freereg
+            count = self.explist(exps, -1)
+            self.emit(RETURN, base, 0 if count < 0 else count + 1)
+        self.fs.freereg = saved
+
+    def stmt_Break(self, node):
+        if not self.fs.loops:
+            raise LuaError('no loop to break')
+        self.fs.loops[-1].append(self.emit(JMP))
+
+    def stmt_For(self, node):
+        saved = self.enter_block()
+        base = self.fs.freereg
+        self.explist([node.assign.explist[0], node.limit, node.step], 3)
+        var = self.reserve()
+        prep = self.emit(FORPREP, base)
+        body = self.here()
+        self.declare(node.assign.varlist[0].value, var)
+        self.fs.loops.append([])
+        self.scoped_block(node.stmtlist)
+        self.patch(prep)
+        self.emit(FORLOOP, base, body)
+        for jump in self.fs.loops.pop():
+            self.patch(jump)
+        self.leave_block(saved)
+
+    def stmt_Forin(self, node):
+        saved = self.enter_block()
+        base = self.fs.freereg
+        self.explist(source_order(node.exprlist), 3)
+        names = [n.value for n in source_order(node.namelist)]
+        nvars = self.reserve(len(names))
+        start_jump = self.emit(JMP)
+        body = self.here()
+        for i, name in enumerate(names):
+            self.declare(name, nvars + i)
+        self.fs.loops.append([])
+        self.scoped_block(node.stmtlist)
+        self.patch(start_jump)
+        self.emit(TFORLOOP, base, body, len(names))
+        for jump in self.fs.loops.pop():
+            self.patch(jump)
+        self.leave_block(saved)
+
+def compile_program(program):
+    '''
+    Compiles {program} and returns the Proto of the main chunk.
+    '''
+    return BytecodeCompiler().compile(program)
+
+# ----------------------------------------
+# Desensamblador
+# ----------------------------------------
+def _rk(proto, x):
+    if x < 0:
+        value = proto.constants[~x]
+        return repr(value) if value.__class__ is str else lua_tostring(value)
+    return f'R{x}'
+
+def _comment(proto, op, a, b, c):
+    if op in (LOADK, GETGLOBAL, SETGLOBAL):
+        return _rk(proto, ~b)
+    if op in (GETUPVAL, SETUPVAL):
+        return proto.upnames[b]
+    if op == GETTABLE:
+        return _rk(proto, c)
+    if op == SETTABLE:
+        return f'{_rk(proto, b)} {_rk(proto, c)}'
+    if ADD <= op <= LE:
+        return f'{_rk(proto, b)} {_rk(proto, c)}'
+    if op == CLOSURE:
+        return proto.protos[b].name
+    return ''
+
+def disassemble(proto, out=None):
+    '''
+    Listing of {proto} and of every function nested in it,
+    in the style of 'luac -l'.
+    '''
+    lines = [] if out is None else out
+    lines.append(f'function <{proto.name}> ({len(proto)} instructions)')
+    lines.append(f'{proto.nparams} params, {proto.maxstack} slots, '
+                 f'{len(proto.upvals)} upvalues, {len(proto.constants)} constants, '
+                 f'{len(proto.protos)} functions')
+    code = proto.code
+    for pc in range(0, len(code), 4):
+        op, a, b, c = code[pc], code[pc+1], code[pc+2], code[pc+3]
+        name = OPNAMES[op]
+        if op in (JMP, JMPIF, JMPIFNOT, FORPREP, FORLOOP, TFORLOOP):
+            args = f'{a} [{b // 4 + 1}]' if op != JMP else f'[{b // 4 + 1}]'
+            if op == TFORLOOP:
+                args += f' {c}'
+        else:
+            args = f'{a} {b} {c}'
+        comment = _comment(proto, op, a, b, c)
+        # indice de ancho fijo: con un tab la columna del ; se corre
+        line = f'\t{pc // 4 + 1:>5}  {name:<10}{args}'
+        lines.append(f'{line:<40}; {comment}' if comment else line)
+    for child in proto.protos:
+        lines.append('')
+        disassemble(child, lines)
+    if out is None:
+        return '\n'.join(lines)
@@ -0,0 +1,194 @@
+# ----------------------------------------
+# Cache de code objects para el traductor a Python
+#
+# Guarda en disco (marshal) el code object generado por
+# Transpiler.py, con el resumen de Optimizer.py si se optimizo,
+# indexado por el hash del codigo fuente y por
+# la version del codigo que lo genera (code_version()). Si el
+# archivo ya esta en el cache no se usa ni el lexer ni el
+# parser, ni se importan.
+# ----------------------------------------
+import os
+import re
+import sys
+import hashlib
+import marshal
+import importlib.util
+import Runtime
+from Runtime import LuaError, LuaRope, LuaTable, make_globals, call_deep
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__luacache__')
+
+# Cambia si cambia el formato de los archivos del cache.
+FORMAT_VERSION = 2
+
+_HEADER = importlib.util.MAGIC_NUMBER + FORMAT_VERSION.to_bytes(4, 'little')
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modulos de los que depende el codigo generado; Optimizer.py
+# solo para el codigo optimizado.
+_SOURCES = ('Lexer.py', 'Parser.py', 'Transpiler.py', 'Runtime.py')
+_OPTIMIZER = 'Optimizer.py'
+
+_versions = {}
+
+def code_version(optimize=False):
+    '''
+    Hash of the sources of the lexer, the parser (the grammar and
+    the AST nodes), the translator and the runtime, plus the
+    optimizer if {optimize}: a change to any of them invalidates
+    the cached code. The files are read, not imported.
+    '''
+    version = _versions.get(optimize)
+    if version is None:
+        h = hashlib.sha256(str(FORMAT_VERSION).encode())
+        for name in _SOURCES + ((_OPTIMIZER,) if optimize else ()):
+            with open(os.path.join(_HERE, name), 'rb') as file:
+                h.update(file.read())
+        version = _versions[optimize] = h.hexdigest()[:16]
+    return version
+
+def source_key(source):
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+def _cache_path(key, cache_dir):
+    return os.path.join(cache_dir, key + '.lpyc')
+
+def _read(path):
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if not data.startswith(_HEADER):
+        return None
+    try:
+        entry = marshal.loads(data[len(_HEADER):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 2:
+        return None
+    return entry
+
+def _write(path, code, report):
+    '''
+    Writes atomically: a partial file is never visible.
+    '''
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            file.write(_HEADER + marshal.dumps((code, report)))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def load_code(source, filename='<lua>', cache_dir=CACHE_DIR, optimize=False):
+    '''
+    Code object for the Lua {source}, from the cache when possible.
+    With {optimize} the AST goes through Optimizer.py first; that
+    code is cached apart, and what each pass did is printed on
+    stderr as MiniLua.optimizeTree does, also when the code comes
+    from the cache. If the source has errors they are printed
+    and None is returned; nothing is written to the cache.
+    '''
+    key = source_key(source) + '-' + code_version(optimize)
+    if optimize:
+        key += '.O'
+    path = _cache_path(key, cache_dir)
+    entry = _read(path)
+    if entry is not None:
+        code, report = entry
+        if report is not None:
+            print(report, file=sys.stderr)
+        return code
+
+    from Lexer import LuaLexer
+    from Parser import LuaParser
+    from Errors import Diagnostics
+    import Transpiler
+
+    diagnostics = Diagnostics(echo=True, source=source)
+    program = LuaParser(diagnostics).parse(LuaLexer(diagnostics).tokenize(source))
+    if program is None or diagnostics:
+        return None
+    report = None
+    if optimize:
+        import Optimizer
+
+        program, passes = Optimizer.optimize(program)
+        report = Optimizer.format_report(passes)
+        print(report, file=sys.stderr)
+    code = Transpiler.compile_program(program, filename)
+    _write(path, code, report)
+    return code
+
+def namespace(G):
+    '''
+    Globals the generated code runs with.
+    '''
+    ns = {name: getattr(Runtime, name) for name in (
+        'LuaError', 'arith', 'first', 'values', 'adjust', 'make_table',
+        'make_array', 'for_range', 'for_in', 'lua_index', 'lua_setindex', 'lua_add',
+        'lua_sub', 'lua_mul', 'lua_div', 'lua_mod', 'lua_pow', 'lua_concat',
+        'lua_concat_all', 'lua_eq', 'lua_lt', 'lua_le', 'lua_gt', 'lua_ge')}
+    ns['LuaTable'] = LuaTable
+    ns['_N'] = (int, float)
+    ns['Gget'] = G.hash.get
+    ns['Gset'] = G.set
+    return ns
+
+_NOT_CALLABLE = re.compile(r"'(\w+)' object is not callable")
+
+_TYPES = {'NoneType': 'nil', 'bool': 'boolean', 'int': 'number', 'float': 'number',
+          'str': 'string', LuaRope.__name__: 'string'}
+
+def _call_error(e):
+    '''
+    LuaError for the TypeError {e} raised by calling a value that
+    is not a function (the generated code calls it directly), or
+    None if {e} is another error.
+    '''
+    match = _NOT_CALLABLE.fullmatch(str(e))
+    if match is None:
+        return None
+    name = match.group(1)
+    kind = _TYPES.get(name)
+    if kind is None:
+        kind = 'table' if name in _subclass_names(LuaTable) else 'userdata'
+    return LuaError(f'attempt to call a {kind} value')
+
+def _subclass_names(cls):
+    names = {cls.__name__}
+    for sub in cls.__subclasses__():
+        names |= _subclass_names(sub)
+    return names
+
+def run_code(code, G=None):
+    '''
+    Runs the main chunk of {code} as Interpreter.run() does: in a
+    thread with a large stack (Runtime.call_deep), and with the
+    errors of calling a non-function reported as LuaError.
+    '''
+    G = make_globals() if G is None else G
+    ns = namespace(G)
+    exec(code, ns)
+    try:
+        return call_deep(ns['chunk'])
+    except TypeError as e:
+        error = _call_error(e)
+        if error is None:
+            raise
+        raise error from None
+
+def run_source(source, filename='<lua>', G=None, cache_dir=CACHE_DIR, optimize=False):
+    '''
+    Translates (or loads from the cache) and runs {source}.
+    Returns False if the source has syntax errors.
+    '''
+    code = load_code(source, filename, cache_dir, optimize)
+    if code is None:
+        return False
+    run_code(code, G)
+    return True
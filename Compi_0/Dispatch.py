@@ -0,0 +1,80 @@
+# ----------------------------------------
+# Despacho de visit() por clase de nodo, con cache
+#
+# Reemplaza a multimethod.multimeta para los Visitor del AST.
+# Una clase puede definir visit() varias veces, anotando el
+# tipo del nodo en cada una; la version a usar se busca una
+# sola vez por clase concreta de nodo (por su MRO, de modo que
+# visit(node: Expression) atiende a las subclases que no tienen
+# su propia version) y se guarda en una tabla.
+# ----------------------------------------
+
+class _Namespace(dict):
+    '''
+    Class body that keeps every definition of visit().
+    '''
+    def __init__(self):
+        super().__init__()
+        self.overloads = []
+
+    def __setitem__(self, key, value):
+        if key == 'visit' and callable(value):
+            self.overloads.append(value)
+        super().__setitem__(key, value)
+
+def _node_type(func):
+    # tipo anotado del primer argumento despues de self
+    code = func.__code__
+    if code.co_argcount < 2:
+        return object
+    return func.__annotations__.get(code.co_varnames[1], object)
+
+class VisitorMeta(type):
+    @classmethod
+    def __prepare__(mcls, name, bases):
+        return _Namespace()
+
+    def __new__(mcls, name, bases, namespace):
+        handlers = {}
+        for base in reversed(bases):
+            handlers.update(getattr(base, '_handlers', {}))
+        # type(name, bases, dict) no pasa por __prepare__
+        overloads = getattr(namespace, 'overloads', ())
+        for func in overloads:
+            handlers[_node_type(func)] = func
+        attrs = dict(namespace)
+        if overloads:
+            del attrs['visit']
+        cls = super().__new__(mcls, name, bases, attrs)
+        cls._handlers = handlers
+        cls._dispatch = {}
+        return cls
+
+    def resolve(cls, node_class):
+        '''
+        Handler of {node_class}: the visit() of the nearest class
+        in its MRO. The result is cached in cls._dispatch.
+        '''
+        for klass in node_class.__mro__:
+            handler = cls._handlers.get(klass)
+            if handler is not None:
+                cls._dispatch[node_class] = handler
+                return handler
+        raise TypeError(f'{cls.__name__}: no visit() for {node_class.__name__}')
+
+def _visit(self, node, *args, **kwargs):
+    cls = self.__class__
+    try:
+        handler = cls._dispatch[node.__class__]
+    except KeyError:
+        handler = cls.resolve(node.__class__)
+    return handler(self, node, *args, **kwargs)
+
+class Visitor(metaclass=VisitorMeta):
+    '''
+    Base class of the AST visitors. Define visit(self, node: T)
+    once for each node type T.
+    '''
+
+# fuera del cuerpo de la clase, para que no cuente como una version
+Visitor.visit = _visit
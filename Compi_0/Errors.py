@@ -1,26 +1,146 @@
 # Errors.py
+# ----------------------------------------
+# Diagnosticos del lexer y del parser
+#
+# LuaLexer y LuaParser reciben un Diagnostics y le reportan
+# cada error como un Diagnostic (severidad, mensaje, linea,
+# columna, codigo). Solo se llama al sink cuando hay un error,
+# asi que no cuesta nada en los fuentes sin errores. Cada
+# compilacion puede tener su propio sink, de modo que varias
+# pueden correr a la vez en hilos, y los Diagnostic se pueden
+# enviar entre procesos (Batch.py).
+#
+# Sin sink, el lexer y el parser usan el sink global de este
+# modulo, que imprime cada mensaje como antes; error(),
+# errors_detected(), errors_list() y clear_errors() operan
+# sobre el.
+# ----------------------------------------
+import sys
+import threading
+from dataclasses import dataclass
+
+# Codigos de los diagnosticos
+ILLEGAL_CHARACTER = 'L001'
+BAD_ESCAPE = 'L002'
+UNTERMINATED_COMMENT = 'L003'
+SYNTAX_ERROR = 'P001'
+UNEXPECTED_EOF = 'P002'
+IO_ERROR = 'F001'
+
+@dataclass(frozen=True, slots=True)
+class Diagnostic:
+    '''
+    One reported problem. {message} is the text shown to the
+    user; {line} and {column} start at 1 and are None when they
+    are not known.
+    '''
+    severity: str
+    message: str
+    line: int = None
+    column: int = None
+    code: str = None
+
+    def __str__(self):
+        return self.message
+
+class Diagnostics:
+    '''
+    Sink for the diagnostics of one or more compilations.
+    Keeps at most {max_errors} records (all of them if None) but
+    counts every error. With {echo} each kept message is also
+    printed to {file} (stdout by default). {source}, if given,
+    is the text being compiled, used to find columns.
+    '''
+    def __init__(self, max_errors=None, echo=False, file=None, source=None):
+        self.max_errors = max_errors
+        self.echo = echo
+        self.file = file
+        self.source = source
+        self.records = []
+        self.errors = 0
+        self.warnings = 0
+        self._lock = threading.Lock()
+
+    def report(self, message, line=None, index=None, code=None, severity='error', column=None):
+        '''
+        Records a diagnostic. Without {column}, {index} (the offset
+        of the problem in the source of the sink) gives it.
+        '''
+        if column is None and index is not None and self.source is not None:
+            column = index - self.source.rfind('\n', 0, index)
+        record = Diagnostic(severity, message, line, column, code)
+        self._add(record)
+        return record
+
+    def extend(self, records):
+        '''
+        Adds the Diagnostic {records} of another sink (of another
+        thread or process), applying the cap of this one.
+        '''
+        for record in records:
+            self._add(record)
+
+    def _add(self, record):
+        with self._lock:
+            if record.severity == 'error':
+                self.errors += 1
+                if self.max_errors is not None and self.errors > self.max_errors:
+                    if self.errors == self.max_errors + 1 and self.echo:
+                        print(f'Too many errors, only the first {self.max_errors} are reported.',
+                              file=self.file or sys.stdout)
+                    return
+            else:
+                self.warnings += 1
+            self.records.append(record)
+            if self.echo:
+                print(record.message, file=self.file or sys.stdout)
+
+    @property
+    def suppressed(self):
+        '''
+        Errors counted but not kept because of max_errors.
+        '''
+        return self.errors - sum(1 for r in self.records if r.severity == 'error')
+
+    def messages(self):
+        return [r.message for r in self.records]
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+            self.errors = 0
+            self.warnings = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return self.errors > 0
+
+    def __getstate__(self):
+        # el lock no se puede enviar a otro proceso
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+# Sink de LuaLexer y LuaParser cuando no reciben uno
+default = Diagnostics(echo=True)
 
-_errors_list = []
-_errors_detected = 0
 def error(message, lineno=None):
-    global _errors_detected
-    global _errors_list
     if lineno:
-        print(f'LexerError: {message} in line {lineno}.')
-        _errors_list.append(f'LexerError: {message} in line {lineno}.')
+        default.report(f'LexerError: {message} in line {lineno}.', lineno)
     else:
-        print(message)
-        _errors_list.append(message)
-    _errors_detected += 1
+        default.report(message)
 
 def errors_detected():
-    return _errors_detected
+    return default.errors
 
 def errors_list():
-    return _errors_list
+    return default.messages()
 
 def clear_errors():
-    global _errors_detected
-    global _errors_list
-    _errors_detected = 0
-    _errors_list = []
\ No newline at end of file
+    default.clear()
\ No newline at end of file
@@ -0,0 +1,241 @@
+# ----------------------------------------
+# Analisis incremental para editores (LSP)
+#
+# El fuente se divide en sentencias de nivel superior (cada
+# una termina en un ';' fuera de bloques y parentesis) y cada
+# una se analiza por separado. Ante una edicion solo se vuelve
+# a tokenizar desde la sentencia afectada hasta que el lexer
+# se sincroniza con una frontera del texto anterior, y solo
+# esas sentencias se vuelven a analizar; las demas se
+# reutilizan del Program anterior.
+#
+# Cada sentencia tiene su propio Diagnostics, en el que el lexer
+# y el parser reportan sus errores sin imprimirlos;
+# IncrementalParser.diagnostics los junta todos.
+# ----------------------------------------
+from dataclasses import replace
+from Lexer import LuaLexer
+from Parser import LuaParser, Program
+from Errors import Diagnostics
+
+_OPEN = {'FUNCTION', 'IF', 'WHILE', 'FOR', 'DO', '(', '{', '['}
+_CLOSE = {'END', ')', '}', ']'}
+
+class _Chunk:
+    '''
+    A top-level statement: text span [start, end), line where the
+    span starts, offset of its first token, the parsed statement
+    (None if it has errors) and the Diagnostics of the span.
+    {forced} marks a span cut at an old boundary while the
+    statement was still open (see edit()).
+    '''
+    __slots__ = ('start', 'end', 'line', 'first', 'stmt', 'forced', 'diagnostics')
+
+    def __init__(self, start, end, line, first, diagnostics, forced=False):
+        self.start = start
+        self.end = end
+        self.line = line
+        self.first = first
+        self.stmt = None
+        self.forced = forced
+        self.diagnostics = diagnostics
+
+    def shift(self, delta, delta_lines):
+        self.start += delta
+        self.end += delta
+        self.line += delta_lines
+        if self.first is not None:
+            self.first += delta
+        if delta_lines and self.diagnostics.records:
+            self.diagnostics.records = [r if r.line is None else replace(r, line=r.line + delta_lines)
+                                        for r in self.diagnostics.records]
+
+class _Splitter:
+    '''
+    Groups tokens into top-level statements: a statement ends at a
+    ';' that is outside blocks, parentheses and table constructors.
+    It is also the sink of the lexer: the errors go to the
+    Diagnostics of the statement being read.
+    '''
+    def __init__(self, start, line, source):
+        self.stack = []
+        self.start = start
+        self.line = line
+        self.tokens = []
+        self.source = source
+        self.diagnostics = Diagnostics(source=source)
+
+    def report(self, *args, **kwargs):
+        return self.diagnostics.report(*args, **kwargs)
+
+    def push(self, tok):
+        '''
+        Adds {tok}; returns (chunk, tokens) if it closes a statement.
+        '''
+        self.tokens.append(tok)
+        t = tok.type
+        if t in _OPEN:
+            # el 'do' de while/for no abre otro bloque
+            if t == 'DO' and self.stack and self.stack[-1] in ('WHILE', 'FOR'):
+                self.stack[-1] = 'DO'
+            else:
+                self.stack.append(t)
+        elif t in _CLOSE:
+            if self.stack:
+                self.stack.pop()
+        elif t == ';' and not self.stack:
+            return self.close(tok.end, tok.lineno)
+        return None
+
+    def close(self, end, line, forced=False):
+        tokens = self.tokens
+        chunk = _Chunk(self.start, end, self.line, tokens[0].index if tokens else None,
+                       self.diagnostics, forced)
+        self.stack = []
+        self.start = end
+        self.line = line
+        self.tokens = []
+        self.diagnostics = Diagnostics(source=self.source)
+        return chunk, tokens
+
+def _parse(chunk, tokens):
+    '''
+    Parses the statement of {chunk}. The errors of the lexer in
+    its span are already in chunk.diagnostics; with any error the
+    statement stays None.
+    '''
+    diagnostics = chunk.diagnostics
+    program = LuaParser(diagnostics).parse(iter(tokens))
+    # las columnas ya estan calculadas; no se retiene el texto
+    diagnostics.source = None
+    if program is not None and not diagnostics and len(program.stmtlist) == 1:
+        chunk.stmt = program.stmtlist[0]
+
+class IncrementalParser:
+    '''
+    Keeps the source of a document and its Program up to date
+    through edits. Offsets are character indexes in the text.
+    {diagnostics} has the errors of the lexer and the parser in
+    the current text; nothing is printed.
+    '''
+    def __init__(self, text):
+        self.reset(text)
+
+    def reset(self, text):
+        '''
+        Full tokenization and parse of {text}.
+        '''
+        self.text = text
+        self.chunks = []
+        splitter = _Splitter(0, 1, text)
+        for tok in LuaLexer(splitter).tokenize(text):
+            closed = splitter.push(tok)
+            if closed:
+                _parse(*closed)
+                self.chunks.append(closed[0])
+        self.tail = self._tail(splitter, len(text))
+        self.reparsed = len(self.chunks)
+        return self._program()
+
+    def _tail(self, splitter, end):
+        '''
+        Text after the last statement; any token there is an error.
+        '''
+        tail, tokens = splitter.close(end, splitter.line)
+        if tokens:
+            _parse(tail, tokens)
+        else:
+            tail.diagnostics.source = None
+        return tail
+
+    def _program(self):
+        self.diagnostics = Diagnostics()
+        for chunk in self.chunks:
+            if chunk.diagnostics:
+                self.diagnostics.extend(chunk.diagnostics.records)
+        self.diagnostics.extend(self.tail.diagnostics.records)
+        if self.tail.first is not None or self.diagnostics or any(c.stmt is None for c in self.chunks):
+            self.program = None
+        else:
+            self.program = Program([c.stmt for c in self.chunks])
+        return self.program
+
+    def _first_affected(self, offset):
+        '''
+        Index of the first chunk whose span reaches {offset}
+        (len(chunks) if the offset is in the tail).
+        '''
+        lo, hi = 0, len(self.chunks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.chunks[mid].end <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def edit(self, start, end, replacement):
+        '''
+        Replaces text[start:end] with {replacement} and returns the
+        updated Program (None if the source has errors).
+        '''
+        old = self.text
+        text = old[:start] + replacement + old[end:]
+        delta = len(replacement) - (end - start)
+        delta_lines = replacement.count('\n') - old.count('\n', start, end)
+        edit_end = start + len(replacement)
+
+        chunks = self.chunks
+        first = self._first_affected(start)
+        # Un corte forzado no es una frontera real: se vuelve a
+        # tokenizar desde el inicio de la sentencia cortada.
+        while first > 0 and chunks[first-1].forced:
+            first -= 1
+        begin = chunks[first] if first < len(chunks) else self.tail
+
+        # Puntos de sincronizacion del texto anterior, a partir de la
+        # primera sentencia afectada: el final de cada sentencia y,
+        # para recuperarse de errores, el primer token de la siguiente.
+        ends = {c.end: j for j, c in enumerate(chunks[first:], first) if not c.forced}
+        firsts = {c.first: j - 1 for j, c in enumerate(chunks[first+1:], first + 1)
+                  if not chunks[j-1].forced}
+
+        splitter = _Splitter(begin.start, begin.line, text)
+        new_chunks = []
+        synced = None
+        prev_end = begin.start
+        for tok in LuaLexer(splitter).tokenize(text, begin.line, begin.start):
+            if splitter.tokens and tok.index >= edit_end and tok.index - delta in firsts:
+                # Sentencia sin cerrar (p.ej. mientras se escribe): se corta
+                # en la frontera anterior si ahi el lexer esta sincronizado.
+                j = firsts[tok.index - delta]
+                boundary = chunks[j].end + delta
+                if edit_end <= boundary and prev_end <= boundary and not text[prev_end:boundary].strip():
+                    closed = splitter.close(boundary, splitter.line, forced=True)
+                    _parse(*closed)
+                    new_chunks.append(closed[0])
+                    synced = j
+                    break
+            closed = splitter.push(tok)
+            prev_end = tok.end
+            if closed:
+                _parse(*closed)
+                chunk = closed[0]
+                new_chunks.append(chunk)
+                if chunk.end >= edit_end and chunk.end - delta in ends:
+                    synced = ends[chunk.end - delta]
+                    break
+
+        if synced is None:
+            chunks[first:] = new_chunks
+            self.tail = self._tail(splitter, len(text))
+        else:
+            rest = chunks[synced+1:]
+            for chunk in rest:
+                chunk.shift(delta, delta_lines)
+            self.tail.shift(delta, delta_lines)
+            chunks[first:] = new_chunks + rest
+
+        self.text = text
+        self.reparsed = len(new_chunks)
+        return self._program()
@@ -0,0 +1,898 @@
+# ----------------------------------------
+# Interprete de MiniLua
+#
+# Compila el AST de LuaParser a closures de Python
+# una sola vez y luego las ejecuta, sin volver a
+# despachar por tipo de nodo en cada evaluacion.
+#
+# 'return f(...)' es una llamada de cola: la funcion que
+# retorna no llama a f, le deja (f, args) a quien la llamo,
+# que la ejecuta en un ciclo sin crecer la pila. Los programas
+# corren en un hilo con una pila grande, para que la recursion
+# que no es de cola pueda ser mucho mas profunda que el limite
+# por defecto de Python.
+# ----------------------------------------
+from Parser import Number, Nil, Boolean, String, Name, CallTable, CallFunction
+from Runtime import (LuaError, LuaTable, make_globals, lua_string_literal,
+                     lua_type, arith, lua_div, lua_mod, lua_pow, lua_concat, lua_concat_all, lua_eq, lua_lt, lua_le,
+                     lua_index, lua_setindex, for_range, NO_VALUES, call_deep)
+from Analysis import source_order, call_args, captured_names, array_fields, concat_operands
+from Vectorize import match
+
+_NUMBERS = (int, float)
+
+# Senales que devuelven los statements compilados.
+BREAK = 'break'
+RETURN = 'return'
+TAILCALL = 'tailcall'       # frame[1] = (funcion, argumentos)
+
+def _constant(node):
+    '''
+    (True, value) if {node} is a literal, (False, None) otherwise.
+    '''
+    if isinstance(node, Number):
+        return True, node.value
+    if isinstance(node, String):
+        return True, lua_string_literal(node.value)
+    if isinstance(node, Boolean):
+        return True, node.value
+    if isinstance(node, Nil):
+        return True, None
+    return False, None
+
+class _FunctionScope:
+    '''
+    Compile-time scope of one Lua function. Every local gets its
+    own slot in the activation frame:
+        frame[0]  upvalues of the function (a list of cells)
+        frame[1]  values of the last 'return'
+        frame[2:] parameters and locals
+    Locals used by inner functions are kept in a cell ([value]),
+    created again each time the declaration runs.
+    '''
+    def __init__(self, parent, stmtlist):
+        self.parent = parent
+        self.blocks = [{}]
+        self.nslots = 2
+        self.captured = captured_names(stmtlist)
+        self.upindex = {}
+        self.upvals = []        # (1, slot del padre) o (0, upvalue del padre)
+        self.loops = 0          # ciclos abiertos, para 'break'
+
+    def declare(self, name):
+        slot = self.nslots
+        self.nslots += 1
+        boxed = name in self.captured
+        self.blocks[-1][name] = (slot, boxed)
+        return slot, boxed
+
+    def lookup(self, name):
+        for block in reversed(self.blocks):
+            if name in block:
+                return block[name]
+        return None
+
+    def upvalue(self, name):
+        '''
+        Index of {name} among the upvalues, None if it is a global.
+        '''
+        if name in self.upindex:
+            return self.upindex[name]
+        if self.parent is None:
+            return None
+        where = self.parent.lookup(name)
+        if where is not None:
+            desc = (1, where[0])
+        else:
+            index = self.parent.upvalue(name)
+            if index is None:
+                return None
+            desc = (0, index)
+        self.upindex[name] = len(self.upvals)
+        self.upvals.append(desc)
+        return self.upindex[name]
+
+class ClosureCompiler:
+    '''
+    Turns a Program into a Python callable made of nested closures.
+    Each expression becomes e(frame) -> value and each statement
+    s(frame) -> None | BREAK | RETURN | TAILCALL.
+    '''
+    def __init__(self, G=None):
+        self.G = make_globals() if G is None else G
+        self.scope = None
+
+    def compile(self, program):
+        '''
+        Compiles {program} and returns the main chunk as a callable.
+        '''
+        self.scope = _FunctionScope(None, program.stmtlist)
+        body = self.block(program.stmtlist, new_scope=False)
+        pad = (None,) * (self.scope.nslots - 2)
+        self.scope = None
+        def chunk():
+            frame = [[], None, *pad]
+            r = body(frame)
+            if r is TAILCALL:
+                return _trampoline(frame)
+            if r is RETURN:
+                return frame[1]
+            return NO_VALUES
+        return chunk
+
+    # ----------------------------------------
+    # Variables
+    # ----------------------------------------
+    def getter(self, name):
+        scope = self.scope
+        where = scope.lookup(name)
+        if where is not None:
+            slot, boxed = where
+            if boxed:
+                return lambda f: f[slot][0]
+            return lambda f: f[slot]
+        index = scope.upvalue(name)
+        if index is not None:
+            return lambda f: f[0][index][0]
+        gget = self.G.hash.get
+        return lambda f: gget(name)
+
+    def setter(self, name):
+        scope = self.scope
+        where = scope.lookup(name)
+        if where is not None:
+            slot, boxed = where
+            if boxed:
+                def set_cell(f, v):
+                    f[slot][0] = v
+                return set_cell
+            def set_local(f, v):
+                f[slot] = v
+            return set_local
+        index = scope.upvalue(name)
+        if index is not None:
+            def set_upvalue(f, v):
+                f[0][index][0] = v
+            return set_upvalue
+        gset = self.G.set
+        return lambda f, v: gset(name, v)
+
+    def binder(self, slot, boxed):
+        '''
+        b(frame, value) that initializes a new local.
+        '''
+        if boxed:
+            def bind_cell(f, v):
+                f[slot] = [v]
+            return bind_cell
+        def bind(f, v):
+            f[slot] = v
+        return bind
+
+    def path_getter(self, path):
+        '''
+        Reads a dotted name such as 'math.floor'.
+        '''
+        parts = path.split('.')
+        get = self.getter(parts[0])
+        for key in parts[1:]:
+            get = self._index_const(get, key)
+        return get
+
+    def path_setter(self, path):
+        parts = path.split('.')
+        if len(parts) == 1:
+            return self.setter(path)
+        get = self.path_getter('.'.join(parts[:-1]))
+        key = parts[-1]
+        def set_field(f, v):
+            lua_setindex(get(f), key, v)
+        return set_field
+
+    def target(self, node):
+        '''
+        Setter s(frame, value) for an assignment target.
+        '''
+        if isinstance(node, CallTable):
+            table = self.expr(node.field)
+            key = self.expr(node.table)
+            def set_index(f, v):
+                t = table(f)
+                if t.__class__ is LuaTable:
+                    k = key(f)
+                    # parte arreglo sin llamar a set()
+                    if k.__class__ is int and 0 < k <= len(t.array):
+                        t.array[k - 1] = v
+                    else:
+                        t.set(k, v)
+                else:
+                    lua_setindex(t, key(f), v)
+            return set_index
+        return self.path_setter(node.value)
+
+    # ----------------------------------------
+    # Expresiones
+    # ----------------------------------------
+    def expr(self, node):
+        is_const, value = _constant(node)
+        if is_const:
+            return lambda f: value
+        method = getattr(self, 'expr_' + node.__class__.__name__, None)
+        if method is None:
+            raise LuaError(f'cannot evaluate {node.__class__.__name__}')
+        return method(node)
+
+    def expr_Name(self, node):
+        return self.path_getter(node.value)
+
+    expr_Var = expr_Name
+
+    def expr_Not(self, node):
+        value = self.expr(node.value)
+        def not_(f):
+            v = value(f)
+            return v is None or v is False
+        return not_
+
+    def expr_Table(self, node):
+        array = array_fields(node)
+        if array:
+            values = [self.expr(e) for e in array]
+            def table(f):
+                return LuaTable(None, [value(f) for value in values])
+            return table
+        fields = []
+        for data in source_order(node.data):
+            if isinstance(data.value, Name):
+                key = data.value.value
+                fields.append((lambda f, key=key: key, self.expr(data.exp)))
+            else:
+                fields.append((self.expr(data.value), self.expr(data.exp)))
+        def table(f):
+            t = LuaTable()
+            for key, value in fields:
+                t.set(key(f), value(f))
+            return t
+        return table
+
+    def _index_const(self, table, key):
+        def index(f):
+            t = table(f)
+            if t.__class__ is LuaTable:
+                return t.get(key)
+            return lua_index(t, key)
+        return index
+
+    def expr_CallTable(self, node):
+        table = self.expr(node.table)
+        is_const, key = _constant(node.field)
+        if is_const:
+            return self._index_const(table, key)
+        key = self.expr(node.field)
+        def index(f):
+            t = table(f)
+            if t.__class__ is LuaTable:
+                k = key(f)
+                # parte arreglo sin llamar a get()
+                if k.__class__ is int and 0 < k <= len(t.array):
+                    return t.array[k - 1]
+                return t.get(k)
+            return lua_index(t, key(f))
+        return index
+
+    def expr_FunctionBody(self, node):
+        return self.function(node)
+
+    def expr_CallFunction(self, node):
+        call = self.call(node)
+        def call1(f):
+            r = call(f)
+            if r.__class__ is tuple:
+                return r[0] if r else None
+            return r
+        return call1
+
+    def expr_Binop(self, node):
+        op = node.operator
+        if op == '..':
+            return self.concat(node)
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if op == 'and':
+            def and_(f):
+                v = left(f)
+                if v is None or v is False:
+                    return v
+                return right(f)
+            return and_
+        if op == 'or':
+            def or_(f):
+                v = left(f)
+                if v is None or v is False:
+                    return right(f)
+                return v
+            return or_
+        is_const, b = _constant(node.right)
+        if is_const and b.__class__ in _NUMBERS:
+            return self._binop_const(op, left, b)
+        if op == '+':
+            def add(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a + b
+                return arith('+', a, b)
+            return add
+        if op == '-':
+            def sub(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a - b
+                return arith('-', a, b)
+            return sub
+        if op == '*':
+            def mul(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a * b
+                return arith('*', a, b)
+            return mul
+        if op == '/':
+            return lambda f: lua_div(left(f), right(f))
+        if op == '%':
+            return lambda f: lua_mod(left(f), right(f))
+        if op == '^':
+            return lambda f: lua_pow(left(f), right(f))
+        if op == '==':
+            def eq(f):
+                a = left(f); b = right(f)
+                if a.__class__ is b.__class__:
+                    return a == b
+                return lua_eq(a, b)
+            return eq
+        if op == '~=':
+            def ne(f):
+                a = left(f); b = right(f)
+                if a.__class__ is b.__class__:
+                    return a != b
+                return not lua_eq(a, b)
+            return ne
+        if op == '<':
+            def lt(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a < b
+                return lua_lt(a, b)
+            return lt
+        if op == '<=':
+            def le(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a <= b
+                return lua_le(a, b)
+            return le
+        if op == '>':
+            def gt(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a > b
+                return lua_lt(b, a)
+            return gt
+        if op == '>=':
+            def ge(f):
+                a = left(f); b = right(f)
+                if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+                    return a >= b
+                return lua_le(b, a)
+            return ge
+        raise LuaError(f'unknown operator {op}')
+
+    def _binop_const(self, op, left, b):
+        '''
+        Binop whose right operand is a number literal, such as n - 1 or n < 2.
+        '''
+        if op == '+':
+            def add(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a + b
+                return arith('+', a, b)
+            return add
+        if op == '-':
+            def sub(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a - b
+                return arith('-', a, b)
+            return sub
+        if op == '*':
+            def mul(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a * b
+                return arith('*', a, b)
+            return mul
+        if op == '<':
+            def lt(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a < b
+                return lua_lt(a, b)
+            return lt
+        if op == '<=':
+            def le(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a <= b
+                return lua_le(a, b)
+            return le
+        if op == '>':
+            def gt(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a > b
+                return lua_lt(b, a)
+            return gt
+        if op == '>=':
+            def ge(f):
+                a = left(f)
+                if a.__class__ in _NUMBERS:
+                    return a >= b
+                return lua_le(b, a)
+            return ge
+        if op == '==':
+            return lambda f: lua_eq(left(f), b)
+        if op == '~=':
+            return lambda f: not lua_eq(left(f), b)
+        if op == '/':
+            return lambda f: lua_div(left(f), b)
+        if op == '%':
+            return lambda f: lua_mod(left(f), b)
+        if op == '^':
+            return lambda f: lua_pow(left(f), b)
+        raise LuaError(f'unknown operator {op}')
+
+    def concat(self, node):
+        '''
+        A chain a .. b .. c ... as a single lua_concat_all().
+        '''
+        operands = [self.expr(e) for e in concat_operands(node)]
+        if len(operands) == 2:
+            left, right = operands
+            return lambda f: lua_concat(left(f), right(f))
+        def concat(f):
+            return lua_concat_all(*[operand(f) for operand in operands])
+        return concat
+
+    def multi(self, node):
+        '''
+        Closure returning every value of {node} as a tuple.
+        Only calls can produce more than one value.
+        '''
+        if isinstance(node, CallFunction):
+            call = self.call(node)
+            def values(f):
+                r = call(f)
+                if r.__class__ is tuple:
+                    return r
+                return (r,)
+            return values
+        value = self.expr(node)
+        return lambda f: (value(f),)
+
+    def explist(self, nodes):
+        '''
+        Closure returning the list of values of {nodes}, in source
+        order, expanding the last call into all of its results.
+        '''
+        if not nodes:
+            return lambda f: []
+        fixed = [self.expr(n) for n in nodes[:-1]]
+        if isinstance(nodes[-1], CallFunction):
+            last = self.multi(nodes[-1])
+            def values(f):
+                return [e(f) for e in fixed] + list(last(f))
+            return values
+        exps = fixed + [self.expr(nodes[-1])]
+        return lambda f: [e(f) for e in exps]
+
+    def call(self, node):
+        '''
+        Closure performing the call. It returns what the callee
+        returned: a single value or a tuple (see Runtime.NO_VALUES).
+        '''
+        if isinstance(node.value, Name):
+            fn = self.path_getter(node.value.value)
+            what = f"'{node.value.value}'"
+        else:
+            fn = self.expr(node.value)
+            what = 'value'
+        args = call_args(node)
+
+        def fail(g):
+            return LuaError(f"attempt to call a {lua_type(g)} value ({what})")
+
+        if args and isinstance(args[-1], CallFunction):
+            values = self.explist(args)
+            def call_n(f):
+                g = fn(f)
+                try:
+                    return g(*values(f))
+                except TypeError:
+                    if not callable(g):
+                        raise fail(g)
+                    raise
+            return call_n
+        exps = [self.expr(a) for a in args]
+        if len(exps) == 0:
+            def call0(f):
+                g = fn(f)
+                try:
+                    return g()
+                except TypeError:
+                    if not callable(g):
+                        raise fail(g)
+                    raise
+            return call0
+        if len(exps) == 1:
+            a0, = exps
+            def call1(f):
+                g = fn(f)
+                try:
+                    return g(a0(f))
+                except TypeError:
+                    if not callable(g):
+                        raise fail(g)
+                    raise
+            return call1
+        if len(exps) == 2:
+            a0, a1 = exps
+            def call2(f):
+                g = fn(f)
+                try:
+                    return g(a0(f), a1(f))
+                except TypeError:
+                    if not callable(g):
+                        raise fail(g)
+                    raise
+            return call2
+        def call_n(f):
+            g = fn(f)
+            try:
+                return g(*[e(f) for e in exps])
+            except TypeError:
+                if not callable(g):
+                    raise fail(g)
+                raise
+        return call_n
+
+    def function(self, node):
+        '''
+        Compiles a FunctionBody. The result creates the Lua function
+        when it runs, capturing the cells of its upvalues.
+        '''
+        scope = _FunctionScope(self.scope, node.stmtlist)
+        self.scope = scope
+        params = [p.value for p in source_order(node.params)]
+        boxed = [scope.declare(name) for name in params]
+        boxed = [slot for slot, is_boxed in boxed if is_boxed]
+        body = self.block(node.stmtlist, new_scope=False)
+        self.scope = scope.parent
+
+        nparams = len(params)
+        missing = (None,) * nparams
+        pad = (None,) * (scope.nslots - 2 - nparams)
+        upvals = scope.upvals
+        def make(f):
+            up = [f[index] if instack else f[0][index] for instack, index in upvals]
+            def enter(args):
+                # frame y cuerpo de una llamada, sin ejecutarla
+                if len(args) != nparams:
+                    args = (tuple(args) + missing)[:nparams]
+                frame = [up, None, *args, *pad]
+                for slot in boxed:
+                    frame[slot] = [frame[slot]]
+                return frame, body
+            def lua_function(*args):
+                if len(args) != nparams:
+                    args = (args + missing)[:nparams]
+                frame = [up, None, *args, *pad]
+                for slot in boxed:
+                    frame[slot] = [frame[slot]]
+                r = body(frame)
+                if r is TAILCALL:
+                    return _trampoline(frame)
+                if r is RETURN:
+                    return frame[1]
+                return NO_VALUES
+            lua_function.lua_enter = enter
+            return lua_function
+        return make
+
+    # ----------------------------------------
+    # Statements
+    # ----------------------------------------
+    def stmt(self, node):
+        method = getattr(self, 'stmt_' + node.__class__.__name__, None)
+        if method is None:
+            raise LuaError(f'cannot execute {node.__class__.__name__}')
+        return method(node)
+
+    def block(self, stmtlist, new_scope=True):
+        if new_scope:
+            self.scope.blocks.append({})
+        stmts = [self.stmt(s) for s in stmtlist]
+        if new_scope:
+            self.scope.blocks.pop()
+        if not stmts:
+            return lambda f: None
+        if len(stmts) == 1:
+            return stmts[0]
+        if len(stmts) == 2:
+            s0, s1 = stmts
+            def block2(f):
+                r = s0(f)
+                if r is not None:
+                    return r
+                return s1(f)
+            return block2
+        def block_n(f):
+            for s in stmts:
+                r = s(f)
+                if r is not None:
+                    return r
+        return block_n
+
+    def stmt_Assignment(self, node):
+        targets = source_order(node.varlist)
+        exps = source_order(node.explist)
+        if node.local:
+            # Los valores se compilan antes de declarar los nombres:
+            # en 'local x = x' la x de la derecha es la exterior.
+            if len(targets) == 1 and len(exps) == 1:
+                value = self.expr(exps[0])
+                slot, boxed = self.scope.declare(targets[0].value)
+                if not boxed:
+                    def local1(f):
+                        f[slot] = value(f)
+                    return local1
+                def local1_cell(f):
+                    f[slot] = [value(f)]
+                return local1_cell
+            values = self.explist(exps)
+            binders = [self.binder(*self.scope.declare(t.value)) for t in targets]
+            n = len(binders)
+            def local_n(f):
+                vs = values(f)
+                if len(vs) < n:
+                    vs += [None] * (n - len(vs))
+                for bind, v in zip(binders, vs):
+                    bind(f, v)
+            return local_n
+        setters = [self.target(t) for t in targets]
+        if len(setters) == 1 and len(exps) == 1:
+            setter, = setters
+            value = self.expr(exps[0])
+            def assign1(f):
+                setter(f, value(f))
+            return assign1
+        values = self.explist(exps)
+        n = len(setters)
+        def assign_n(f):
+            vs = values(f)
+            if len(vs) < n:
+                vs += [None] * (n - len(vs))
+            for setter, v in zip(setters, vs):
+                setter(f, v)
+        return assign_n
+
+    def stmt_CallFunction(self, node):
+        call = self.call(node)
+        def call_stmt(f):
+            call(f)
+        return call_stmt
+
+    def stmt_DefFunction(self, node):
+        function = node.function
+        name = function.value.value
+        if node.local:
+            # El nombre ya es visible dentro de la funcion (recursion).
+            bind = self.binder(*self.scope.declare(name))
+            setter = self.setter(name)
+            make = self.function(function.funcbody)
+            def def_local(f):
+                bind(f, None)
+                setter(f, make(f))
+            return def_local
+        make = self.function(function.funcbody)
+        setter = self.path_setter(name)
+        def def_function(f):
+            setter(f, make(f))
+        return def_function
+
+    def stmt_Do(self, node):
+        return self.block(node.stmtlist)
+
+    def stmt_While(self, node):
+        cond = self.expr(node.cond)
+        body = self.loop_body(node.stmtlist)
+        def while_(f):
+            while True:
+                c = cond(f)
+                if c is None or c is False:
+                    return
+                r = body(f)
+                if r is not None:
+                    if r is BREAK:
+                        return
+                    return r
+        return while_
+
+    def stmt_If(self, node):
+        cond = self.expr(node.cond)
+        then = self.block(node.stmtlist)
+        if not node.elsepart:
+            def if_(f):
+                c = cond(f)
+                if c is not None and c is not False:
+                    return then(f)
+            return if_
+        orelse = self.block(node.elsepart)
+        def if_else(f):
+            c = cond(f)
+            if c is not None and c is not False:
+                return then(f)
+            return orelse(f)
+        return if_else
+
+    def stmt_Return(self, node):
+        exps = source_order(node.exprlist)
+        if not exps:
+            def return0(f):
+                f[1] = NO_VALUES
+                return RETURN
+            return return0
+        if len(exps) == 1:
+            if isinstance(exps[0], CallFunction):
+                return self.tail_call(exps[0])
+            value = self.expr(exps[0])
+            def return1(f):
+                f[1] = value(f)
+                return RETURN
+            return return1
+        values = self.explist(exps)
+        def return_n(f):
+            f[1] = tuple(values(f))
+            return RETURN
+        return return_n
+
+    def tail_call(self, node):
+        '''
+        'return f(args)': evaluates f and the arguments and leaves
+        them in frame[1]; the caller runs the call (_trampoline).
+        '''
+        if isinstance(node.value, Name):
+            fn = self.path_getter(node.value.value)
+            what = f"'{node.value.value}'"
+        else:
+            fn = self.expr(node.value)
+            what = 'value'
+        values = self.explist(call_args(node))
+        def tail_call(f):
+            g = fn(f)
+            if not callable(g):
+                raise LuaError(f"attempt to call a {lua_type(g)} value ({what})")
+            f[1] = (g, values(f))
+            return TAILCALL
+        return tail_call
+
+    def loop_body(self, stmtlist):
+        self.scope.loops += 1
+        body = self.block(stmtlist)
+        self.scope.loops -= 1
+        return body
+
+    def stmt_Break(self, node):
+        if not self.scope.loops:
+            raise LuaError('no loop to break')
+        return lambda f: BREAK
+
+    def stmt_For(self, node):
+        bounds = [node.assign.explist[0], node.limit, node.step]
+        self.scope.blocks.append({})
+        slot, boxed = self.scope.declare(node.assign.varlist[0].value)
+        body = self.loop_body(node.stmtlist)
+        if boxed:
+            inner = body
+            def body(f):
+                f[slot] = [f[slot]]
+                return inner(f)
+        self.scope.blocks.pop()
+        # Con inicio y paso enteros el contador es un range de Python:
+        # inicio, limite y paso se evaluan una vez, antes del ciclo.
+        values = self.for_range(bounds)
+        def loop(f, rng):
+            for i in rng:
+                f[slot] = i
+                r = body(f)
+                if r is not None:
+                    if r is BREAK:
+                        return
+                    return r
+        vector = match(node)
+        if vector is None:
+            def for_(f):
+                return loop(f, values(f))
+            return for_
+        # t[i] = a[i] * k + b[i]: con NumPy, si los valores lo permiten
+        names = [self.path_getter(name) for name in vector.names]
+        run = vector.run
+        def for_vector(f):
+            rng = values(f)
+            if rng.__class__ is range and run(rng, [get(f) for get in names]):
+                return
+            return loop(f, rng)
+        return for_vector
+
+    def for_range(self, bounds):
+        '''
+        r(frame) -> the values of the loop variable, for the
+        expressions {bounds} = [start, limit, step].
+        '''
+        if all(isinstance(e, Number) for e in bounds):
+            values = for_range(*(e.value for e in bounds))
+            if values.__class__ is range:
+                # limites literales: el mismo range sirve para cada ejecucion
+                return lambda f: values
+        start, limit, step = [self.expr(e) for e in bounds]
+        return lambda f: for_range(start(f), limit(f), step(f))
+
+    def stmt_Forin(self, node):
+        values = self.explist(source_order(node.exprlist))
+        self.scope.blocks.append({})
+        binders = [self.binder(*self.scope.declare(n.value)) for n in source_order(node.namelist)]
+        body = self.loop_body(node.stmtlist)
+        self.scope.blocks.pop()
+        n = len(binders)
+        def forin(f):
+            vs = values(f) + [None, None, None]
+            fn, state, control = vs[0], vs[1], vs[2]
+            if not callable(fn):
+                raise LuaError(f"attempt to call a {lua_type(fn)} value")
+            while True:
+                r = fn(state, control)
+                if r.__class__ is not tuple:
+                    r = (r,)
+                if not r or r[0] is None:
+                    return
+                control = r[0]
+                if len(r) < n:
+                    r = r + (None,) * n
+                for bind, v in zip(binders, r):
+                    bind(f, v)
+                r = body(f)
+                if r is not None:
+                    if r is BREAK:
+                        return
+                    return r
+        return forin
+
+def _trampoline(frame):
+    '''
+    Runs the tail calls left in {frame} one after the other, in
+    constant stack space. Returns the result of the last one.
+    '''
+    while True:
+        g, args = frame[1]
+        enter = getattr(g, 'lua_enter', None)
+        if enter is None:
+            return g(*args)
+        frame, body = enter(args)
+        r = body(frame)
+        if r is not TAILCALL:
+            return frame[1] if r is RETURN else NO_VALUES
+
+def run(program, G=None):
+    '''
+    Compiles and runs {program}. Returns what the main chunk returned.
+    '''
+    return call_deep(ClosureCompiler(G).compile(program))
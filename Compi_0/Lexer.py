@@ -1,4 +1,4 @@
-from Errors import error
+import Errors
 from sly import Lexer
 
 class LuaLexer(Lexer):
@@ -71,6 +71,12 @@ class LuaLexer(Lexer):
     NE = r'~='
     CONCAT = r'\.\.'
 
+    def __init__(self, diagnostics=None):
+        # sin sink, el global de Errors.py (imprime cada error)
+        self.diagnostics = Errors.default if diagnostics is None else diagnostics
+        # caracteres de la linea antes del texto, si no empieza una linea
+        self.column0 = 0
+
     @_(r'0x[0-9a-fA-F]+', r'\d+(\.\d+)?([eE][-+]?\d+)?')
     def NUMBER(self, t):
         if t.value.startswith('0x'):
@@ -84,6 +90,7 @@ class LuaLexer(Lexer):
 
     @_(r"'[^']*'", r'"[^"]*"')
     def STRING(self, t):
+        self.lineno += t.value.count('\n')
         # Revision secuencia de escape malas
         index = 0
         while index < len(t.value):
@@ -92,7 +99,8 @@ class LuaLexer(Lexer):
                     index += 2
                     continue
                 else:
-                    error(t.lineno, "Incomplete character escape sequence in string literal.")
+                    self.report("Incomplete character escape sequence in string literal",
+                                t.lineno, t.index + index, Errors.BAD_ESCAPE)
             index += 1
         return t
 
@@ -107,8 +115,19 @@ class LuaLexer(Lexer):
 
     @_(r'--\[\[[^\]]*')
     def ignore_untermcomment(self, t):
-        error(t.lineno, "Comentario largo sin cerrar.")
+        self.lineno += t.value.count('\n')
+        self.report("Comentario largo sin cerrar", t.lineno, t.index, Errors.UNTERMINATED_COMMENT)
 
     def error(self, t):
-        error("Caracter ilegal '%s'" % t.value[0], t.lineno)
+        self.report("Caracter ilegal '%s'" % t.value[0], t.lineno, t.index, Errors.ILLEGAL_CHARACTER)
         self.index += 1
+
+    def report(self, message, line, index, code):
+        self.diagnostics.report(f'LexerError: {message} in line {line}.', line, index, code,
+                                column=self.column(index))
+
+    def column(self, index):
+        newline = self.text.rfind('\n', 0, index)
+        if newline >= 0:
+            return index - newline
+        return self.column0 + index + 1
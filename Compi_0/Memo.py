@@ -0,0 +1,127 @@
+# ----------------------------------------
+# Memoizacion de funciones puras
+#
+# Analysis.pure_functions() encuentra las funciones globales
+# cuyo resultado depende solo de sus argumentos. MemoGlobals es
+# un _G que, al definirse una de esas funciones, guarda en su
+# lugar una version con un cache LRU acotado, indexado por los
+# valores de los argumentos. Sirve para los tres motores porque
+# todos definen las funciones globales con G.set.
+#
+#   G, memo = Memo.memo_globals(program)
+#   Interpreter.run(program, G)
+#   print(memo.report())
+# ----------------------------------------
+from collections import OrderedDict
+from Runtime import LuaTable, make_globals
+from Analysis import pure_functions
+
+MAXSIZE = 4096
+
+# Solo estos valores sirven de clave: una tabla puede cambiar
+# despues de la llamada.
+_KEYABLE = {int, float, str, bool, type(None)}
+
+class LRUCache:
+    '''
+    Results of one function, at most {maxsize} argument lists.
+    '''
+    def __init__(self, fn, maxsize=MAXSIZE):
+        self.fn = fn
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = 0
+
+    def __call__(self, *args):
+        for a in args:
+            if a.__class__ not in _KEYABLE:
+                self.bypassed += 1
+                return self.fn(*args)
+        # 1, 1.0 y True son iguales como claves de un dict
+        key = args + tuple(a.__class__ for a in args)
+        data = self.data
+        try:
+            result = data[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            data.move_to_end(key)
+            return result
+        self.misses += 1
+        result = self.fn(*args)
+        data[key] = result
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def stats(self):
+        calls = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / calls if calls else 0.0,
+                'evictions': self.evictions, 'bypassed': self.bypassed,
+                'size': len(self.data), 'maxsize': self.maxsize}
+
+class Memoizer:
+    '''
+    The caches of the functions {names}.
+    '''
+    def __init__(self, names, maxsize=MAXSIZE):
+        self.names = frozenset(names)
+        self.maxsize = maxsize
+        self.caches = {}
+
+    def wrap(self, name, fn):
+        cache = LRUCache(fn, self.maxsize)
+        self.caches[name] = cache
+        return cache
+
+    def stats(self):
+        '''
+        Statistics per function plus the totals.
+        '''
+        functions = {name: cache.stats() for name, cache in sorted(self.caches.items())}
+        hits = sum(s['hits'] for s in functions.values())
+        misses = sum(s['misses'] for s in functions.values())
+        return {'functions': functions,
+                'hits': hits, 'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'evictions': sum(s['evictions'] for s in functions.values())}
+
+    def report(self):
+        lines = [f"{'function':<16}{'hits':>10}{'misses':>10}{'hit rate':>10}{'evictions':>11}{'size':>8}"]
+        for name, s in self.stats()['functions'].items():
+            lines.append(f"{name:<16}{s['hits']:>10}{s['misses']:>10}{s['hit_rate']:>10.1%}"
+                         f"{s['evictions']:>11}{s['size']:>8}")
+        if len(lines) == 1:
+            lines.append('(no pure functions)')
+        return '\n'.join(lines)
+
+class MemoGlobals(LuaTable):
+    '''
+    _G that memoizes the functions of {memo} when they are
+    assigned. It shares the array and hash parts of {G}.
+    '''
+    __slots__ = ('memo',)
+
+    def __init__(self, G, memo):
+        super().__init__(G.hash, G.array)
+        self.memo = memo
+        self.hash['_G'] = self
+
+    def set(self, key, value):
+        if key in self.memo.names and callable(value):
+            value = self.memo.wrap(key, value)
+        LuaTable.set(self, key, value)
+
+def memo_globals(program, maxsize=MAXSIZE, G=None):
+    '''
+    Globals for running {program} with its pure functions
+    memoized, and the Memoizer with their statistics.
+    '''
+    memo = Memoizer(pure_functions(program), maxsize)
+    return MemoGlobals(make_globals() if G is None else G, memo), memo
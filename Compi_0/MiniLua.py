@@ -1,60 +1,350 @@
-def showAST(source):
+import os
+import sys
+
+def optimizeTree(root, stats=None):
     '''
-    Transform the source code {source} in a Abstract Syntax Tree (AST).\n
-    Shows the AST.
+    Runs the AST optimization passes (Optimizer.py) over {root}.\n
+    Prints what each pass did on stderr and returns the tree.
+    '''
+    import Optimizer
+
+    if root is None:
+        return None
+    if stats is not None:
+        with stats.phase('optimize'):
+            root, report = Optimizer.optimize(root)
+    else:
+        root, report = Optimizer.optimize(root)
+    print(Optimizer.format_report(report), file=sys.stderr)
+    return root
+
+def memoGlobals(root):
+    '''
+    Globals for running {root} with its pure functions memoized,
+    and the Memo.Memoizer that keeps their statistics.
+    '''
+    import Memo
+
+    return Memo.memo_globals(root)
+
+def parseTree(source):
+    '''
+    Lexes and parses {source}, printing its diagnostics.\n
+    Returns the AST, or None if the source has errors: the tree
+    the parser recovers after a syntax error is never used.
     '''
     from Parser import LuaParser
-    from Parser import ASTRender
     from Lexer import LuaLexer
+    from Errors import Diagnostics
 
-    l = LuaLexer()
-    p = LuaParser()
-    root = p.parse(l.tokenize(source))
+    diagnostics = Diagnostics(echo=True, source=source)
+    root = LuaParser(diagnostics).parse(LuaLexer(diagnostics).tokenize(source))
+    if diagnostics:
+        return None
+    return root
+
+def showAST(source, stats=None, optimize=False):
+    '''
+    Transform the source code {source} in a Abstract Syntax Tree (AST).\n
+    Shows the AST, optimized if {optimize}. With {stats} (a
+    Stats.Stats) every phase is measured.
+    '''
+    from Parser import ASTRender
+    import ParseCache
+
+    if stats is not None:
+        import Stats
+
+        root = Stats.parse(Stats.tokenize(source, stats), stats)
+        if optimize:
+            root = optimizeTree(root, stats)
+        if root is not None:
+            Stats.view(Stats.render(root, stats), stats)
+        return
+    root = ParseCache.parse(source)
+    if root is None:
+        return
+    if optimize:
+        root = optimizeTree(root)
     dot = ASTRender()
     root.accept(dot)
     dot.dot.view()
 
-def parseSource(source):
+def streamAST(source, optimize=False, max_depth=None, max_nodes=None):
     '''
     Transform the source code {source} in a Abstract Syntax Tree (AST).\n
-    Shows the results of the parser.
+    Writes the AST to AST.gv while walking it (StreamRender), without
+    building the graph in memory or running Graphviz. Subtrees deeper
+    than {max_depth} and the nodes after the first {max_nodes} are
+    collapsed.
     '''
-    from Parser import LuaParser
-    from Lexer import LuaLexer
+    from StreamRender import StreamRender
+    import ParseCache
+
+    root = ParseCache.parse(source)
+    if root is None:
+        return
+    if optimize:
+        root = optimizeTree(root)
+    nodes = StreamRender.write(root, 'AST.gv', max_depth=max_depth, max_nodes=max_nodes)
+    print(f'AST.gv: {nodes} nodes', file=sys.stderr)
 
-    l = LuaLexer()
-    p = LuaParser()
-    root = p.parse(l.tokenize(source))
+def parseSource(source, stats=None, optimize=False, binary=None):
+    '''
+    Transform the source code {source} in a Abstract Syntax Tree (AST).\n
+    Shows the results of the parser, optimized if {optimize}. With
+    {binary} (a file name) the AST is written there in the compact
+    binary format of BinaryAST.py instead. Unchanged sources
+    are read from the AST cache (__astcache__), except when
+    {stats} is given: then the source is always lexed and
+    parsed, and measured.
+    '''
+    import ParseCache
+
+    if stats is not None:
+        import Stats
+
+        root = Stats.parse(Stats.tokenize(source, stats), stats)
+    else:
+        root = ParseCache.parse(source)
+        if root is None:
+            return
+    if optimize:
+        root = optimizeTree(root, stats)
+    if binary is not None:
+        import BinaryAST
+
+        if root is not None:
+            BinaryAST.dump(root, binary)
+            print(f'{binary}: {os.path.getsize(binary)} bytes', file=sys.stderr)
+        return
     print(root)
 
-def tokenizeSource(source):
+def tokenizeFile(filename):
+    '''
+    Transform the Lua file {filename} in a list of Tokens.\n
+    The file is read by blocks (mmap), so huge files can be
+    tokenized in bounded memory. Prints the list in console.
+    '''
+    from StreamLexer import tokenize_file
+
+    for tok in tokenize_file(filename):
+        print(tok)
+
+def tokenizeSource(source, stats=None):
     '''
     Transform the source code {source} in a list of Tokens.\n
-    Prints the list in console.
+    Prints the list in console. With {stats} the lexer is
+    measured.
     '''
     from Lexer import LuaLexer
 
-    l = LuaLexer()
-    for tok in l.tokenize(source):
+    if stats is not None:
+        import Stats
+
+        tokens = Stats.tokenize(source, stats)
+    else:
+        tokens = LuaLexer().tokenize(source)
+    for tok in tokens:
         print(tok)
 
+def runLua(source, optimize=False, memoize=False):
+    '''
+    Transform the source code {source} in a Abstract Syntax Tree (AST).\n
+    Compiles the AST to Python closures and runs it. With {optimize} the
+    AST is optimized first; with {memoize} the pure functions are
+    memoized (Memo.py).
+    '''
+    from Runtime import LuaError
+    import Interpreter
+
+    root = parseTree(source)
+    if root is None:
+        return
+    if optimize:
+        root = optimizeTree(root)
+    G, memo = memoGlobals(root) if memoize else (None, None)
+    try:
+        Interpreter.run(root, G)
+    except LuaError as e:
+        print(f'LuaError: {e}')
+    if memo is not None:
+        print(memo.report(), file=sys.stderr)
+
+def runVM(source, optimize=False, memoize=False):
+    '''
+    Transform the source code {source} in a Abstract Syntax Tree (AST).\n
+    Compiles the AST to register bytecode and runs it on the VM.
+    With {optimize} the AST is optimized first; with {memoize} the
+    pure functions are memoized (Memo.py).
+    '''
+    from Runtime import LuaError
+    import VM
+
+    root = parseTree(source)
+    if root is None:
+        return
+    if optimize:
+        root = optimizeTree(root)
+    G, memo = memoGlobals(root) if memoize else (None, None)
+    try:
+        VM.run(root, G)
+    except LuaError as e:
+        print(f'LuaError: {e}')
+    if memo is not None:
+        print(memo.report(), file=sys.stderr)
+
+def disassemble(source, optimize=False):
+    '''
+    Transform the source code {source} in register bytecode.\n
+    Prints the listing of every function. With {optimize} the
+    AST is optimized first.
+    '''
+    import Bytecode
+
+    root = parseTree(source)
+    if root is None:
+        return
+    if optimize:
+        root = optimizeTree(root)
+    print(Bytecode.disassemble(Bytecode.compile_program(root)))
+
+def runPython(source, filename='<lua>', optimize=False, memoize=False):
+    '''
+    Translates the source code {source} to Python and runs it.\n
+    The compiled code object is cached on disk (__luacache__), so
+    running the same source again skips the lexer and the parser.
+    With {optimize} the AST is optimized before the translation;
+    with {memoize} the pure functions are memoized (Memo.py).
+    '''
+    from Runtime import LuaError
+    import CodeCache
+    import ParseCache
+
+    G = memo = None
+    if memoize:
+        root = ParseCache.parse(source)
+        if root is None:
+            return
+        G, memo = memoGlobals(root)
+    try:
+        CodeCache.run_source(source, filename, G, optimize=optimize)
+    except LuaError as e:
+        print(f'LuaError: {e}')
+    if memo is not None:
+        print(memo.report(), file=sys.stderr)
+
+def checkBatch(args):
+    '''
+    Lexes and parses every Lua file named by {args} (files,
+    directories or globs) in parallel processes.\n
+    Prints the diagnostics of each file and the throughput.
+    Use -j N to choose the number of workers, --threads to use
+    threads instead of processes and --max-errors N to report at
+    most N errors per file. The options can go before or after
+    the paths.
+    '''
+    import Batch
+
+    workers = None
+    threads = False
+    max_errors = None
+    paths = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('-j', '--workers', '--max-errors'):
+            if i + 1 >= len(args) or not args[i + 1].isdigit():
+                raise SystemExit(f'{arg} needs a number.')
+            if arg == '--max-errors':
+                max_errors = int(args[i + 1])
+            else:
+                workers = int(args[i + 1])
+            i += 2
+            continue
+        if arg == '--threads':
+            threads = True
+        else:
+            paths.append(arg)
+        i += 1
+    result = Batch.check(paths, workers, threads, max_errors)
+    print(result.report())
+    if result.failed:
+        raise SystemExit(1)
+
+# Acciones que aceptan --stats
+STATS_ACTIONS = {}
+for _name in ('0', '-tokenize', '-token', '-t'):
+    STATS_ACTIONS[_name] = tokenizeSource
+for _name in ('1', '-parserize', '-parse', '-p'):
+    STATS_ACTIONS[_name] = parseSource
+for _name in ('2', '-showast', '-sast', '-s'):
+    STATS_ACTIONS[_name] = showAST
+
 def main(argv):
-    if len(argv) != 3:
-        raise SystemExit(f'Usage: {argv[0]} -action filename\nAllowed actions:\n0: Tokenize, Token, T.\n1: Parserize, Parse, P.\n2: ShowAST, SAST, S.\n3: RunLua, Run, R.\n')
+    stats = None
+    optimize = '-O' in argv or '--optimize' in argv
+    memoize = '--memo' in argv
+    argv = [arg for arg in argv if arg not in ('-O', '--optimize', '--memo')]
+    binary = '--binary' in argv
+    argv = [arg for arg in argv if arg != '--binary']
+    stream = '--stream' in argv
+    argv = [arg for arg in argv if arg != '--stream']
+    limits = {}
+    for option in ('--max-depth', '--max-nodes'):
+        if option in argv:
+            i = argv.index(option)
+            if i + 1 >= len(argv) or not argv[i + 1].isdigit():
+                raise SystemExit(f'{option} needs a number.')
+            limits[option[2:].replace('-', '_')] = int(argv[i + 1])
+            del argv[i:i + 2]
+            stream = True
+    if '--stats' in argv:
+        import Stats
+
+        argv = [arg for arg in argv if arg != '--stats']
+        stats = Stats.Stats()
+        if len(argv) == 3 and argv[1].lower() in STATS_ACTIONS:
+            with open(argv[2]) as file:
+                source = file.read()
+            action = STATS_ACTIONS[argv[1].lower()]
+            if action is tokenizeSource:
+                action(source, stats)
+            else:
+                action(source, stats, optimize)
+            print(stats.to_json(), file=sys.stderr)
+            return
+        raise SystemExit('--stats works with one file and the actions 0, 1 and 2.')
+    if len(argv) > 2 and (argv[1] == '7' or argv[1].lower() == '-batch' or argv[1].lower() == '-b'):
+        checkBatch(argv[2:])
+    elif len(argv) != 3:
+        raise SystemExit(f'Usage: {argv[0]} -action filename [--stats] [-O] [--memo]\n       {argv[0]} -showast filename --stream [--max-depth N] [--max-nodes N]\n       {argv[0]} -parse filename --binary\n       {argv[0]} -batch [-j N] [--threads] [--max-errors N] paths...\nAllowed actions:\n0: Tokenize, Token, T.\n1: Parserize, Parse, P.\n2: ShowAST, SAST, S.\n3: RunLua, Run, R.\n4: RunVM, VM, V.\n5: Disassemble, Dis, D.\n6: RunPython, Py, Y.\n7: Batch, B (files, directories or globs; -j N workers).\n')
     else:
         with open(argv[2]) as file:
             if argv[1] == '0' or argv[1].lower() == '-tokenize' or argv[1].lower() == '-token' or argv[1].lower() == '-t':
-                tokenizeSource(file.read())
+                tokenizeFile(argv[2])
             elif argv[1] == '1' or argv[1].lower() == '-parserize' or argv[1].lower() == '-parse' or argv[1].lower() == '-p':
-                parseSource(file.read())
+                if binary:
+                    parseSource(file.read(), optimize=optimize,
+                                binary=os.path.splitext(argv[2])[0] + '.ast')
+                else:
+                    parseSource(file.read(), optimize=optimize)
             elif argv[1] == '2' or argv[1].lower() == '-showast' or argv[1].lower() == '-sast' or argv[1].lower() == '-s':
-                showAST(file.read())
+                if stream:
+                    streamAST(file.read(), optimize, **limits)
+                else:
+                    showAST(file.read(), optimize=optimize)
             elif argv[1] == '3' or argv[1].lower() == '-runlua' or argv[1].lower() == '-run' or argv[1].lower() == '-r':
-                raise SystemExit("WIP")
+                runLua(file.read(), optimize=optimize, memoize=memoize)
+            elif argv[1] == '4' or argv[1].lower() == '-runvm' or argv[1].lower() == '-vm' or argv[1].lower() == '-v':
+                runVM(file.read(), optimize=optimize, memoize=memoize)
+            elif argv[1] == '5' or argv[1].lower() == '-disassemble' or argv[1].lower() == '-dis' or argv[1].lower() == '-d':
+                disassemble(file.read(), optimize=optimize)
+            elif argv[1] == '6' or argv[1].lower() == '-runpython' or argv[1].lower() == '-py' or argv[1].lower() == '-y':
+                runPython(file.read(), argv[2], optimize, memoize)
             else:
-                raise SystemExit(f'\nAction: [{argv[1]}] not recognized.\nAllowed actions:\n0: Tokenize, Token, T.\n1: Parserize, Parse, P.\n2: ShowAST, SAST, S.\n3: RunLua, Run, R.\n')
+                raise SystemExit(f'\nAction: [{argv[1]}] not recognized.\nAllowed actions:\n0: Tokenize, Token, T.\n1: Parserize, Parse, P.\n2: ShowAST, SAST, S.\n3: RunLua, Run, R.\n4: RunVM, VM, V.\n5: Disassemble, Dis, D.\n6: RunPython, Py, Y.\n7: Batch, B (files, directories or globs; -j N workers).\n')
         
 
 if __name__ == "__main__":
-    import sys
     main(sys.argv)
\ No newline at end of file
@@ -0,0 +1,300 @@
+# ----------------------------------------
+# Optimizaciones AST -> AST
+#
+# Cada pase recibe el Program de LuaParser, lo modifica en su
+# lugar y lo devuelve; summary() resume lo que hizo. optimize()
+# aplica todos los pases en orden.
+#
+# - ConstantFolder: evalua Binop y Not cuyos operandos son
+#   literales (Number, String, Boolean, Nil), con la semantica
+#   de Lua de Runtime.py.
+# - DeadCodeEliminator: quita sentencias inalcanzables, If con
+#   condicion literal, ciclos que no se ejecutan y algunos
+#   bloques vacios.
+# ----------------------------------------
+import math
+from dataclasses import fields, is_dataclass
+from Parser import (Number, String, Boolean, Nil, Binop, Not, Name, Var,
+                    Assignment, DefFunction, Return, Break, If, While,
+                    For, Do)
+from Runtime import (LuaError, lua_string_literal, arith, lua_concat,
+                     lua_eq, lua_lt, lua_le)
+from Analysis import walk
+
+_LITERALS = (Number, String, Boolean, Nil)
+
+def _value(node):
+    '''
+    Lua value of the literal {node}.
+    '''
+    cls = node.__class__
+    if cls is String:
+        return lua_string_literal(node.value)
+    if cls is Nil:
+        return None
+    return node.value
+
+_ESCAPES = {'\a': 'a', '\b': 'b', '\f': 'f', '\n': 'n', '\r': 'r',
+            '\t': 't', '\v': 'v', '\\': '\\'}
+
+def _string_literal(value):
+    '''
+    STRING token for {value}, in the form LuaLexer accepts: the
+    delimiter cannot appear inside, and only the escapes of
+    _ESCAPES are allowed. None if {value} cannot be written.
+    '''
+    if '"' not in value:
+        quote = '"'
+    elif "'" not in value:
+        quote = "'"
+    else:
+        return None
+    out = [quote]
+    for c in value:
+        if c in _ESCAPES:
+            out.append('\\' + _ESCAPES[c])
+        elif c < ' ' or c == '\x7f':
+            return None
+        else:
+            out.append(c)
+    out.append(quote)
+    return ''.join(out)
+
+def _literal(value):
+    '''
+    Literal node for the Lua {value}, or None if it has none
+    (inf and nan cannot be written as a Number).
+    '''
+    if value is None:
+        return Nil()
+    if value is True or value is False:
+        return Boolean(value)
+    if value.__class__ is str:
+        literal = _string_literal(value)
+        return String(literal) if literal is not None else None
+    if value.__class__ is float and not math.isfinite(value):
+        return None
+    return Number(value)
+
+def _truthy(value):
+    return value is not None and value is not False
+
+def _compare(op, a, b):
+    if op == '==':
+        return lua_eq(a, b)
+    if op == '~=':
+        return not lua_eq(a, b)
+    if op == '<':
+        return lua_lt(a, b)
+    if op == '<=':
+        return lua_le(a, b)
+    if op == '>':
+        return lua_lt(b, a)
+    if op == '>=':
+        return lua_le(b, a)
+    raise LuaError(f'unknown operator {op}')
+
+def _size(node):
+    return sum(1 for _ in walk(node))
+
+class ConstantFolder:
+    '''
+    Replaces Binop and Not nodes over literals with the literal
+    they evaluate to. Operations that would fail at run time
+    (1 + {}, "a" < 1) or give inf/nan are left for the engines.
+    '''
+    name = 'constant folding'
+
+    def __init__(self):
+        self.folded = 0
+        self.eliminated = 0
+
+    def run(self, program):
+        return self.fold(program)
+
+    def summary(self):
+        return {'expressions folded': self.folded, 'nodes eliminated': self.eliminated}
+
+    def fold(self, node):
+        if isinstance(node, list):
+            node[:] = [self.fold(item) for item in node]
+            return node
+        if not is_dataclass(node):
+            return node
+        for f in fields(node):
+            setattr(node, f.name, self.fold(getattr(node, f.name)))
+        if node.__class__ is Binop:
+            result = self.binop(node)
+        elif node.__class__ is Not:
+            result = self.not_(node)
+        else:
+            return node
+        if result is None:
+            return node
+        self.folded += 1
+        self.eliminated += _size(node) - 1
+        return result
+
+    def binop(self, node):
+        left, op, right = node.left, node.operator, node.right
+        if not isinstance(left, _LITERALS):
+            return None
+        a = _value(left)
+        if op == 'and' or op == 'or':
+            # si decide el operando izquierdo, el derecho no se evalua
+            if _truthy(a) == (op == 'or'):
+                return left
+            return right if isinstance(right, _LITERALS) else None
+        if not isinstance(right, _LITERALS):
+            return None
+        b = _value(right)
+        try:
+            if op == '..':
+                # un resultado largo llega como LuaRope
+                value = str(lua_concat(a, b))
+            elif op in ('+', '-', '*', '/', '%', '^'):
+                value = arith(op, a, b)
+            else:
+                value = _compare(op, a, b)
+        except (LuaError, OverflowError):
+            return None
+        return _literal(value)
+
+    def not_(self, node):
+        if not isinstance(node.value, _LITERALS):
+            return None
+        return Boolean(not _truthy(_value(node.value)))
+
+# Campos que son listas de sentencias
+_BLOCKS = ('stmtlist', 'elsepart')
+
+def _declares_locals(stmts):
+    return any(isinstance(stmt, (Assignment, DefFunction)) and stmt.local for stmt in stmts)
+
+class DeadCodeEliminator:
+    '''
+    Cleans every statement list (Program, function bodies, If,
+    While, For, Forin, Do): statements after a return or break
+    are dropped, If chains with a literal condition are replaced
+    by the branch taken, and loops that never run are removed.
+    Empty blocks go only where that keeps the side effects: an
+    empty Do, an empty For with literal bounds, an empty If on a
+    variable; an If with an empty then-branch is inverted
+    (if c then else S end -> if not c then S end). Run it after
+    ConstantFolder, so conditions like 1 > 2 are already literals.
+    '''
+    name = 'dead code elimination'
+
+    def __init__(self):
+        self.unreachable = 0
+        self.branches = 0
+        self.loops = 0
+        self.empty = 0
+        self.inverted = 0
+        self.negations = 0      # Not agregados al invertir
+        self.eliminated = 0
+
+    def run(self, program):
+        before = _size(program)
+        self.clean(program)
+        self.eliminated = before - _size(program) + self.negations
+        return program
+
+    def summary(self):
+        return {'unreachable statements': self.unreachable,
+                'constant branches collapsed': self.branches,
+                'dead loops removed': self.loops,
+                'empty blocks removed': self.empty,
+                'empty branches inverted': self.inverted,
+                'nodes eliminated': self.eliminated}
+
+    def clean(self, node):
+        '''
+        Cleans the statement lists in {node} and below (functions
+        inside expressions included).
+        '''
+        if isinstance(node, list):
+            for item in node:
+                self.clean(item)
+            return
+        if not is_dataclass(node):
+            return
+        for f in fields(node):
+            value = getattr(node, f.name)
+            if f.name in _BLOCKS:
+                value[:] = self.block(value)
+            else:
+                self.clean(value)
+
+    def block(self, stmts):
+        out = []
+        for stmt in stmts:
+            self.clean(stmt)
+            out.extend(self.statement(stmt))
+        for i, stmt in enumerate(out):
+            if isinstance(stmt, (Return, Break)):
+                self.unreachable += len(out) - i - 1
+                del out[i + 1:]
+                break
+        return out
+
+    def statement(self, stmt):
+        '''
+        Statements that replace {stmt} (already cleaned) in its block.
+        '''
+        cls = stmt.__class__
+        if cls is If:
+            if isinstance(stmt.cond, _LITERALS):
+                self.branches += 1
+                return self.inline(stmt.stmtlist if _truthy(_value(stmt.cond)) else stmt.elsepart)
+            # leer una variable no tiene efectos, se puede omitir
+            if not stmt.stmtlist and not stmt.elsepart and isinstance(stmt.cond, (Name, Var)):
+                self.empty += 1
+                return []
+            # la condicion se evalua igual una vez; solo cambia la rama
+            if not stmt.stmtlist and stmt.elsepart:
+                self.inverted += 1
+                if stmt.cond.__class__ is Not:
+                    stmt.cond = stmt.cond.value
+                else:
+                    stmt.cond = Not(stmt.cond)
+                    self.negations += 1
+                stmt.stmtlist, stmt.elsepart = stmt.elsepart, []
+        elif cls is While:
+            if isinstance(stmt.cond, _LITERALS) and not _truthy(_value(stmt.cond)):
+                self.loops += 1
+                return []
+        elif cls is For:
+            bounds = stmt.assign.explist + [stmt.limit, stmt.step]
+            if not stmt.stmtlist and all(isinstance(e, Number) for e in bounds):
+                self.empty += 1
+                return []
+        elif cls is Do:
+            if not stmt.stmtlist:
+                self.empty += 1
+                return []
+        return [stmt]
+
+    def inline(self, stmts):
+        # los locales del bloque no deben quedar visibles afuera
+        if _declares_locals(stmts):
+            return [Do(stmts)]
+        return stmts
+
+PASSES = [ConstantFolder, DeadCodeEliminator]
+
+def optimize(program, passes=PASSES):
+    '''
+    Runs every pass of {passes} over {program}. Returns the
+    optimized program and a list of (pass name, summary).
+    '''
+    report = []
+    for cls in passes:
+        opt = cls()
+        program = opt.run(program)
+        report.append((opt.name, opt.summary()))
+    return program, report
+
+def format_report(report):
+    return '\n'.join(f'{name}: ' + ', '.join(f'{value} {key}' for key, value in summary.items())
+                     for name, summary in report)
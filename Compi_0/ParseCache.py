@@ -0,0 +1,173 @@
+# ----------------------------------------
+# Cache en disco de los AST de LuaParser
+#
+# Cada entrada es el Program serializado (tuplas + marshal,
+# comprimido con zlib) indexado por el hash del fuente y la
+# version de la gramatica. El cache tiene un tamano maximo y
+# descarta primero las entradas usadas hace mas tiempo (LRU,
+# usando la fecha de modificacion de cada archivo).
+# ----------------------------------------
+import os
+import zlib
+import hashlib
+import marshal
+from dataclasses import fields, is_dataclass
+import Lexer
+import Parser
+from Lexer import LuaLexer
+from Parser import LuaParser, Node
+from Errors import Diagnostics
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__astcache__')
+MAX_BYTES = 32 * 1024 * 1024
+
+# Cambia si cambia el formato de serializacion.
+FORMAT_VERSION = 1
+
+# ----------------------------------------
+# Serializacion: cada nodo es (tag, campo1, campo2, ...)
+# y cada lista del AST es una lista.
+# ----------------------------------------
+NODE_TYPES = [c for c in vars(Parser).values()
+              if isinstance(c, type) and issubclass(c, Node) and is_dataclass(c)]
+_TAGS = {cls: tag for tag, cls in enumerate(NODE_TYPES)}
+_FIELDS = {cls: tuple(f.name for f in fields(cls)) for cls in NODE_TYPES}
+
+def _encode(value):
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    cls = value.__class__
+    if cls in _TAGS:
+        return (_TAGS[cls],) + tuple(_encode(getattr(value, name)) for name in _FIELDS[cls])
+    return value
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if isinstance(value, tuple):
+        return NODE_TYPES[value[0]](*[_decode(item) for item in value[1:]])
+    return value
+
+def dumps(program):
+    return zlib.compress(marshal.dumps(_encode(program)), 1)
+
+def loads(data):
+    return _decode(marshal.loads(zlib.decompress(data)))
+
+def grammar_version():
+    '''
+    Hash of the lexer and parser sources: any change to the grammar
+    or to the AST nodes invalidates the cache.
+    '''
+    h = hashlib.sha256(str(FORMAT_VERSION).encode())
+    for module in (Lexer, Parser):
+        with open(module.__file__, 'rb') as file:
+            h.update(file.read())
+    return h.hexdigest()[:16]
+
+class ParseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = grammar_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+
+    def key(self, source):
+        return hashlib.sha256(source.encode('utf-8')).hexdigest() + '-' + self.version
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.ast')
+
+    def get(self, source):
+        '''
+        Cached Program for {source}, or None.
+        '''
+        path = self._path(self.key(source))
+        try:
+            with open(path, 'rb') as file:
+                program = loads(file.read())
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError, IndexError, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return program
+
+    def put(self, source, program):
+        data = dumps(program)
+        path = self._path(self.key(source))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            size = self._current_size()
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as file:
+                file.write(data)
+            if os.path.exists(path):
+                size -= os.path.getsize(path)
+            os.replace(tmp, path)
+            self._size = size + len(data)
+            if self._size > self.max_bytes:
+                self._evict(keep=path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.ast'):
+                yield entry
+
+    def _current_size(self):
+        if self._size is None:
+            self._size = sum(e.stat().st_size for e in self._entries())
+        return self._size
+
+    def _evict(self, keep):
+        '''
+        Removes the least recently used entries until the cache fits.
+        '''
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            if entry.path == keep:
+                continue
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def parse(self, source):
+        '''
+        Program for {source}: from the cache if it is there, otherwise
+        parsed and stored. For sources with errors the diagnostics
+        are printed and None is returned; they are never cached.
+        '''
+        program = self.get(source)
+        if program is not None:
+            return program
+        diagnostics = Diagnostics(echo=True, source=source)
+        program = LuaParser(diagnostics).parse(LuaLexer(diagnostics).tokenize(source))
+        if program is None or diagnostics:
+            return None
+        self.put(source, program)
+        return program
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+_default = None
+
+def parse(source):
+    '''
+    Parses {source} through the shared on-disk cache.
+    '''
+    global _default
+    if _default is None:
+        _default = ParseCache()
+    return _default.parse(source)
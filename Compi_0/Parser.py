@@ -5,9 +5,10 @@
 # ----------------------------------------
 from dataclasses import dataclass, field
 from typing import Any, List
-from Errors import error
+import Errors
 from Lexer import LuaLexer
-from multimethod import multimeta
+import ParserTables
+from Dispatch import Visitor
 from graphviz import Source
 from graphviz import render as ren
 from graphviz import Digraph
@@ -15,147 +16,149 @@ import sly
 import os
 os.environ["PATH"] += os.pathsep + 'C:/Graphviz/bin'
 
-@dataclass
-class Visitor(metaclass=multimeta):
-    pass
-
-@dataclass
+@dataclass(slots=True)
 class Node:
     def accept(self, visitor: Visitor, *args, **kwargs):
         return visitor.visit(self, *args, **kwargs)
 
-@dataclass
+@dataclass(slots=True)
 class Statement(Node):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Node):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Literal(Expression):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Number(Literal):
     value: float
 
-@dataclass
+@dataclass(slots=True)
 class Nil(Literal):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class Boolean(Literal):
     value: bool = field(default_factory=False)
 
-@dataclass
+@dataclass(slots=True)
 class String(Literal):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class Var(Literal):
     value: str
 
-@dataclass
+@dataclass(slots=True)
 class Name(Literal):
     value: str
     def _add(self,s):
         self.value = self.value + '.' + s
 
-@dataclass
+@dataclass(slots=True)
 class Not(Expression):
     value: Expression
 
-@dataclass
+@dataclass(slots=True)
 class TableData(Expression):
     value: str
     exp: Expression
 
-@dataclass
+@dataclass(slots=True)
 class Table(Expression):
     data: List[TableData] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class CallTable(Expression):
     field: Expression
     table: List[Name] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Binop(Expression):
     left: [Expression] = field(default_factory=list)
     operator: str = field(default_factory='')
     right: List[Expression] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class FunctionBody(Statement):
     params: List[Literal] = field(default_factory=list)
     stmtlist: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Function(Statement):
     value: Name
     funcbody: FunctionBody
 
-@dataclass
+@dataclass(slots=True)
 class DefFunction(Statement):
     function: Function
     local: bool = field(default_factory=bool)
 
-@dataclass
+@dataclass(slots=True)
 class CallFunction(Statement):
     value: Name
     explist: List[Expression] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Do(Statement):
     stmtlist: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Program(Statement):
     stmtlist: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Assignment(Statement):
     varlist: List[Var] = field(default_factory=list)
     explist: List[Expression] = field(default_factory=list)
     local: bool = field(default_factory=bool)
 
-@dataclass
+@dataclass(slots=True)
 class While(Statement):
     cond: Expression
     stmtlist: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Return(Statement):
     exprlist: List[Expression] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Break(Statement):
     pass
 
-@dataclass
+@dataclass(slots=True)
 class If(Statement):
     cond: Expression
     stmtlist: List[Statement] = field(default_factory=list)
     elsepart: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class For(Statement):
     assign: Assignment
     limit: Expression
     step: Expression
     stmtlist: List[Statement] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class Forin(Statement):
     namelist: List[Literal] = field(default_factory=list)
     exprlist: List[Expression] = field(default_factory=list)
     stmtlist: List[Statement] = field(default_factory=list)
 
 class LuaParser(sly.Parser):
-    debugfile = 'AFD.txt'
+    # El archivo de depuracion (AFD.txt) es opcional:
+    #   MINILUA_DEBUGFILE=AFD.txt python MiniLua.py ...
+    debugfile = os.environ.get('MINILUA_DEBUGFILE')
     tokens = LuaLexer.tokens
 
+    def __init__(self, diagnostics=None):
+        # sin sink, el global de Errors.py (imprime cada error)
+        self.diagnostics = Errors.default if diagnostics is None else diagnostics
+
     precedence = (
         ('left', 'OR'),
         ('left', 'AND'),
@@ -177,7 +180,8 @@ class LuaParser(sly.Parser):
 
     @_("stmtlist stmt ';'")
     def stmtlist(self, p):
-        return p.stmtlist + [p.stmt]
+        p.stmtlist.append(p.stmt)
+        return p.stmtlist
 
     @_("varlist '=' explist")
     def stmt(self, p):
@@ -280,7 +284,8 @@ class LuaParser(sly.Parser):
 
     @_("NAME ',' namelist")
     def namelist(self, p):
-        return p.namelist + [Name(p.NAME)]
+        p.namelist.append(Name(p.NAME))
+        return p.namelist
 
     @_("var")
     def varlist(self, p): 
@@ -288,7 +293,8 @@ class LuaParser(sly.Parser):
 
     @_("var ',' varlist")
     def varlist(self, p):
-        return p.varlist + [p.var]
+        p.varlist.append(p.var)
+        return p.varlist
 
     @_("NAME")
     def var(self, p):
@@ -308,7 +314,8 @@ class LuaParser(sly.Parser):
 
     @_("exp ',' explist")
     def explist(self, p):
-        return p.explist + [p.exp]
+        p.explist.append(p.exp)
+        return p.explist
 
     @_("exp OR exp",
         "exp AND exp",
@@ -441,7 +448,8 @@ class LuaParser(sly.Parser):
 
     @_("field ',' fieldlist")
     def fieldlist(self, p):
-        return p.fieldlist + [p.field]
+        p.fieldlist.append(p.field)
+        return p.fieldlist
 
     @_("'[' exp ']' '=' exp")
     def field(self, p):
@@ -455,11 +463,17 @@ class LuaParser(sly.Parser):
     def empty(self, p):
         pass
 
+    @classmethod
+    def _build(cls, definitions):
+        # Las tablas LALR se cargan de disco (ver ParserTables.py)
+        ParserTables.build(cls, definitions)
+
     def error(self, p):
         if p:
-            print(p.lineno, "Error de sintaxis en la entrada en el token '%s'" % p.value)
+            self.diagnostics.report("%s Error de sintaxis en la entrada en el token '%s'" % (p.lineno, p.value),
+                                    p.lineno, p.index, Errors.SYNTAX_ERROR)
         else:
-            print('EOF', 'Error de sintaxis. No mas entrada.')
+            self.diagnostics.report('EOF Error de sintaxis. No mas entrada.', code=Errors.UNEXPECTED_EOF)
 
 # ----------------------------------------
 # NO MODIFIQUE NADA A CONTINUACION
@@ -0,0 +1,94 @@
+# ----------------------------------------
+# Tablas LALR precompiladas para LuaParser
+#
+# sly construye las tablas LALR cada vez que se crea la
+# clase del parser (es decir, en cada import de Parser.py).
+# Aqui se guardan en disco (marshal) junto con una huella
+# de la gramatica y se cargan en los siguientes imports;
+# solo se vuelven a construir si la gramatica cambia.
+# ----------------------------------------
+import os
+import hashlib
+import marshal
+import sly
+from sly.yacc import YaccError
+
+TABLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'LuaParser.tables')
+
+# Cambia si cambia el formato del archivo de tablas.
+FORMAT_VERSION = 1
+
+class LoadedTables:
+    '''
+    The part of sly's LRTable that Parser.parse() uses.
+    '''
+    def __init__(self, lr_action, lr_goto, defaulted_states):
+        self.lr_action = lr_action
+        self.lr_goto = lr_goto
+        self.defaulted_states = defaulted_states
+
+def grammar_fingerprint(grammar):
+    '''
+    Hash of everything the LALR tables depend on: the productions
+    (in order), their precedence and the sly version.
+    '''
+    h = hashlib.sha256(f'{FORMAT_VERSION} {sly.__version__}\n'.encode())
+    for p in grammar.Productions:
+        h.update(f'{p.name} -> {" ".join(p.prod)} {p.prec}\n'.encode())
+    return h.hexdigest()
+
+def load(path, fingerprint):
+    try:
+        with open(path, 'rb') as file:
+            data = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get('fingerprint') != fingerprint:
+        return None
+    return LoadedTables(data['action'], data['goto'], data['defaulted'])
+
+def save(path, fingerprint, lrtable):
+    data = {
+        'fingerprint': fingerprint,
+        'action': lrtable.lr_action,
+        'goto': lrtable.lr_goto,
+        'defaulted': lrtable.defaulted_states,
+    }
+    try:
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            marshal.dump(data, file)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def build(cls, definitions, path=TABLES_FILE):
+    '''
+    Replacement for sly.Parser._build: the grammar is always built
+    (it binds the rule functions), the LALR tables are loaded from
+    {path} when the grammar has not changed. The debug file needs the
+    full tables, so it forces a rebuild.
+    '''
+    # Los pasos de sly.Parser._build son metodos privados de sly.
+    rules = cls._Parser__collect_rules(definitions)
+    if not cls._Parser__validate_specification():
+        raise YaccError('Invalid parser specification')
+    cls._Parser__build_grammar(rules)
+
+    fingerprint = grammar_fingerprint(cls._grammar)
+    if not cls.debugfile:
+        tables = load(path, fingerprint)
+        if tables is not None:
+            cls._lrtable = tables
+            return
+
+    if not cls._Parser__build_lrtables():
+        raise YaccError("Can't build parsing tables")
+    save(path, fingerprint, cls._lrtable)
+
+    if cls.debugfile:
+        with open(cls.debugfile, 'w') as f:
+            f.write(str(cls._grammar))
+            f.write('\n')
+            f.write(str(cls._lrtable))
+        cls.log.info('Parser debugging for %s written to %s', cls.__qualname__, cls.debugfile)
@@ -0,0 +1,1038 @@
+# ----------------------------------------
+# Runtime para MiniLua
+#
+# Valores, tablas y biblioteca base compartidos
+# por los motores de ejecucion.
+# ----------------------------------------
+import math
+import random
+import re
+import sys
+import threading
+import time
+
+class LuaError(Exception):
+    '''
+    Error raised while running a Lua program.
+    '''
+    pass
+
+class LuaTable:
+    '''
+    Lua table, split like the tables of the reference Lua: the
+    values of the keys 1..len(array) live in the list {array}
+    (array[0] is t[1], None is nil) and every other key/value
+    pair in the dict {hash}. Assigning nil to a key removes it.
+
+    The array part has a capacity, not a length: it grows when
+    t[len(array) + 1] is assigned, to the largest power of two
+    that keeps it more than half full (as luaH_resize does),
+    and takes from the hash the keys that now fall inside it.
+    '''
+    __slots__ = ('array', 'hash')
+
+    def __init__(self, data=None, array=None):
+        self.hash = {} if data is None else data
+        self.array = [] if array is None else array
+
+    def get(self, key):
+        cls = key.__class__
+        if cls is int:
+            array = self.array
+            if 0 < key <= len(array):
+                return array[key - 1]
+        elif cls is float and key.is_integer():
+            return self.get(int(key))
+        return self.hash.get(key)
+
+    def set(self, key, value):
+        if key.__class__ is int:
+            array = self.array
+            if 0 < key <= len(array):
+                array[key - 1] = value
+                return
+            if key == len(array) + 1 and value is not None:
+                if self.hash or None in array:
+                    self._resize(key)
+                else:
+                    # arreglo lleno (el caso de t[#t + 1] = v): se duplica
+                    n = key - 1
+                    array.extend([None] * (n if n >= 4 else 4 - n))
+                if key <= len(array):
+                    array[key - 1] = value
+                    return
+        elif key.__class__ is float and key.is_integer():
+            return self.set(int(key), value)
+        elif key.__class__ is LuaRope:
+            key = str(key)
+        if value is None:
+            self.hash.pop(key, None)
+        elif key is None:
+            raise LuaError('table index is nil')
+        elif key.__class__ is float and key != key:
+            raise LuaError('table index is NaN')
+        else:
+            self.hash[key] = value
+
+    def _resize(self, key):
+        '''
+        Resizes the array part before {key} is added.
+        '''
+        array = self.array
+        hash = self.hash
+        if None not in array:
+            # arreglo lleno (el caso de t[#t + 1] = v): se duplica
+            size = max(4, 2 * len(array))
+        else:
+            size = _array_size(array, hash, key)
+        old = len(array)
+        if size > old:
+            array.extend([None] * (size - old))
+            if hash:
+                for k in [k for k in hash if k.__class__ is int and old < k <= size]:
+                    array[k - 1] = hash.pop(k)
+                # lleno salvo el lugar de {key}: las claves que
+                # siguen pueden estar en el hash
+                if array.count(None) == 1 and hash.get(size + 1) is not None:
+                    self._resize(size + 1)
+        elif size < old:
+            for k in range(size + 1, old + 1):
+                if array[k - 1] is not None:
+                    hash[k] = array[k - 1]
+            del array[size:]
+
+    def set_range(self, first, values):
+        '''
+        t[first], t[first + 1], ... = {values} (no nil among them),
+        leaving the table as set() would in ascending order.
+        '''
+        array = self.array
+        end = first + len(values) - 1
+        if 0 < first and end <= len(array):
+            array[first - 1:end] = values
+            return
+        # el arreglo crece de una vez si los valores lo continuan
+        # y el hash no tiene claves que set() pasaria al arreglo
+        if (0 < first <= len(array) + 1 and None not in array[:first - 1]
+                and not any(k.__class__ is int for k in self.hash)):
+            array[first - 1:] = values
+            return
+        for key, value in enumerate(values, first):
+            self.set(key, value)
+
+    def length(self):
+        '''
+        Border of the table, what Lua returns for #t: a binary
+        search in the array part, or in the hash when the array
+        is full (luaH_getn).
+        '''
+        array = self.array
+        j = len(array)
+        if j and array[j - 1] is None:
+            i = 0
+            while j - i > 1:
+                m = (i + j) // 2
+                if array[m - 1] is None:
+                    j = m
+                else:
+                    i = m
+            return i
+        hash = self.hash
+        if not hash or hash.get(j + 1) is None:
+            return j
+        i, j = j + 1, 2 * (j + 1)
+        while hash.get(j) is not None:
+            i, j = j, 2 * j
+        while j - i > 1:
+            m = (i + j) // 2
+            if hash.get(m) is None:
+                j = m
+            else:
+                i = m
+        return i
+
+    def next(self, key):
+        '''
+        Key/value pair that follows {key}, or None at the end.
+        The array part comes first, in order.
+        '''
+        array = self.array
+        if key is None:
+            index = 0
+        elif key.__class__ in _NUMBERS and key == key and 0 < key <= len(array) and key == int(key):
+            index = int(key)
+        else:
+            index = None
+        if index is not None:
+            # siguiente valor no nil del arreglo, y despues el hash
+            while index < len(array):
+                value = array[index]
+                if value is not None:
+                    return index + 1, value
+                index += 1
+            keys = list(self.hash)
+            index = 0
+        else:
+            keys = list(self.hash)
+            try:
+                index = keys.index(key) + 1
+            except ValueError:
+                raise LuaError('invalid key to next')
+        if index < len(keys):
+            k = keys[index]
+            return k, self.hash[k]
+        return None
+
+    def items(self):
+        out = [(i, v) for i, v in enumerate(self.array, 1) if v is not None]
+        out.extend(self.hash.items())
+        return out
+
+    def __repr__(self):
+        return 'table: 0x%08x' % (id(self) & 0xffffffff)
+
+# Largo desde el que .. deja el resultado como LuaRope
+ROPE_MIN = 1024
+
+class LuaRope:
+    '''
+    Lua string built by .. and not joined yet: the parts[:size]
+    strings, {length} characters in total. Appending to the last
+    rope of a chain extends its list in place, so s = s .. x in
+    a loop is linear instead of quadratic. str() joins the parts
+    once, when the string is printed, compared, hashed or passed
+    to the string library, and keeps the result.
+    '''
+    __slots__ = ('parts', 'size', 'length')
+
+    def __init__(self, parts, length):
+        self.parts = parts
+        self.size = len(parts)
+        self.length = length
+
+    def append(self, parts, length):
+        '''
+        Rope for self .. parts[0] .. parts[1] ... ({parts} are str).
+        '''
+        own = self.parts
+        if len(own) != self.size:
+            # otra cuerda ya agrego partes a esta lista
+            own = own[:self.size]
+        own.extend(parts)
+        return LuaRope(own, self.length + length)
+
+    def __str__(self):
+        parts = self.parts
+        if self.size == 1:
+            return parts[0]
+        value = ''.join(parts if len(parts) == self.size else parts[:self.size])
+        self.parts = [value]
+        self.size = 1
+        return value
+
+    def __len__(self):
+        return self.length
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __eq__(self, other):
+        if other.__class__ is LuaRope or other.__class__ is str:
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if other.__class__ is LuaRope or other.__class__ is str:
+            return str(self) != str(other)
+        return NotImplemented
+
+    def __getitem__(self, index):
+        return str(self)[index]
+
+    def __repr__(self):
+        return repr(str(self))
+
+# Tamano maximo de la parte arreglo
+_MAXABITS = 31
+_MAXASIZE = 1 << _MAXABITS
+
+def _array_size(array, hash, key):
+    '''
+    Size of the array part for the positive integer keys of
+    {array} and {hash} plus {key}: the largest power of two n
+    such that more than n/2 of the keys 1..n are in use
+    (computesizes in ltable.c).
+    '''
+    # nums[i]: claves en (2^(i-1), 2^i]
+    nums = [0] * (_MAXABITS + 1)
+    total = 0
+    for k, v in enumerate(array, 1):
+        if v is not None:
+            nums[(k - 1).bit_length()] += 1
+            total += 1
+    for k in hash:
+        if k.__class__ is int and 0 < k <= _MAXASIZE:
+            nums[(k - 1).bit_length()] += 1
+            total += 1
+    nums[(key - 1).bit_length()] += 1
+    total += 1
+    size = 0
+    count = 0
+    for i, n in enumerate(nums):
+        twotoi = 1 << i
+        if total <= twotoi // 2:
+            break
+        count += n
+        if count > twotoi // 2:
+            size = twotoi
+    return size
+
+_NUMBERS = (int, float)
+
+_escapes = {
+    'a': '\a', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r',
+    't': '\t', 'v': '\v', '\\': '\\', '"': '"', "'": "'", '\n': '\n',
+}
+
+def lua_string_literal(raw):
+    '''
+    Value of a STRING token. The lexer keeps the quotes
+    and the escape sequences, so they are removed here.
+    '''
+    body = raw[1:-1]
+    if '\\' not in body:
+        return body
+    out = []
+    index = 0
+    while index < len(body):
+        c = body[index]
+        if c == '\\' and index + 1 < len(body):
+            n = body[index+1]
+            if n.isdigit():
+                digits = n
+                while len(digits) < 3 and index + 1 + len(digits) < len(body) and body[index+1+len(digits)].isdigit():
+                    digits += body[index+1+len(digits)]
+                out.append(chr(int(digits)))
+                index += 1 + len(digits)
+                continue
+            out.append(_escapes.get(n, n))
+            index += 2
+            continue
+        out.append(c)
+        index += 1
+    return ''.join(out)
+
+def lua_type(value):
+    if value is None:
+        return 'nil'
+    if value is True or value is False:
+        return 'boolean'
+    if value.__class__ in _NUMBERS:
+        return 'number'
+    if value.__class__ is str or value.__class__ is LuaRope:
+        return 'string'
+    if isinstance(value, LuaTable):
+        return 'table'
+    if callable(value):
+        return 'function'
+    return 'userdata'
+
+# Enteros que %.14g escribe con todas sus cifras
+_INT_DIGITS = 10 ** 14
+
+def lua_tostring(value):
+    if value is None:
+        return 'nil'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    cls = value.__class__
+    if cls is str:
+        return value
+    if cls is LuaRope:
+        return str(value)
+    if cls is int:
+        if -_INT_DIGITS < value < _INT_DIGITS:
+            return str(value)
+        # los numeros de Lua son doubles: los enteros que no entran
+        # en 14 cifras se escriben como el double que serian
+        try:
+            value = float(value)
+        except OverflowError:
+            return 'inf' if value > 0 else '-inf'
+        cls = float
+    if cls is float:
+        if value != value:
+            return 'nan'
+        if value in (math.inf, -math.inf):
+            return 'inf' if value > 0 else '-inf'
+        return '%.14g' % value
+    if isinstance(value, LuaTable):
+        return repr(value)
+    if callable(value):
+        return 'function: 0x%08x' % (id(value) & 0xffffffff)
+    return str(value)
+
+def lua_tonumber(value, base=None):
+    if value.__class__ in _NUMBERS and base is None:
+        return value
+    if value.__class__ is LuaRope:
+        value = str(value)
+    if value.__class__ is not str:
+        return None
+    text = value.strip()
+    try:
+        if base is not None:
+            return int(text, int(base))
+        if text[:2].lower() == '0x':
+            return int(text[2:], 16)
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    except ValueError:
+        return None
+
+def _arith_operand(value, op):
+    number = lua_tonumber(value) if value.__class__ is str or value.__class__ is LuaRope else None
+    if value.__class__ in _NUMBERS:
+        return value
+    if number is None:
+        raise LuaError(f"attempt to perform arithmetic on a {lua_type(value)} value")
+    return number
+
+def arith(op, a, b):
+    '''
+    Slow path of the arithmetic operators: coerces strings
+    to numbers and reports errors the way Lua does.
+    '''
+    a = _arith_operand(a, op)
+    b = _arith_operand(b, op)
+    if op == '+':
+        return a + b
+    if op == '-':
+        return a - b
+    if op == '*':
+        return a * b
+    if op == '/':
+        return lua_div(a, b)
+    if op == '%':
+        return lua_mod(a, b)
+    if op == '^':
+        return lua_pow(a, b)
+    raise LuaError(f'unknown arithmetic operator {op}')
+
+def lua_div(a, b):
+    if a.__class__ not in _NUMBERS or b.__class__ not in _NUMBERS:
+        return arith('/', a, b)
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.inf if a > 0 else -math.inf
+
+def lua_mod(a, b):
+    if a.__class__ not in _NUMBERS or b.__class__ not in _NUMBERS:
+        return arith('%', a, b)
+    try:
+        return a % b
+    except ZeroDivisionError:
+        return math.nan
+
+def lua_pow(a, b):
+    if a.__class__ not in _NUMBERS or b.__class__ not in _NUMBERS:
+        return arith('^', a, b)
+    try:
+        return float(a) ** b
+    except OverflowError:
+        return math.inf
+    except ZeroDivisionError:
+        return math.inf
+
+def _concat_operand(value):
+    cls = value.__class__
+    if cls is str:
+        return value
+    if cls in _NUMBERS:
+        return lua_tostring(value)
+    if cls is LuaRope:
+        return str(value)
+    raise LuaError(f"attempt to concatenate a {lua_type(value)} value")
+
+def lua_concat(a, b):
+    '''
+    a .. b. Results of ROPE_MIN characters or more are left as
+    a LuaRope; a rope on the left is extended instead of copied.
+    '''
+    if a.__class__ is LuaRope:
+        b = _concat_operand(b)
+        return a.append([b], len(b))
+    a = _concat_operand(a)
+    b = _concat_operand(b)
+    if len(a) + len(b) < ROPE_MIN:
+        return a + b
+    return LuaRope([a, b], len(a) + len(b))
+
+def lua_concat_all(*values):
+    '''
+    A chain a .. b .. c ... flattened by the engines: one join
+    instead of a new string per operator.
+    '''
+    head = values[0]
+    try:
+        if head.__class__ is LuaRope:
+            parts = [v if v.__class__ is str else _concat_operand(v) for v in values[1:]]
+            return head.append(parts, sum(map(len, parts)))
+        value = ''.join([v if v.__class__ is str else _concat_operand(v) for v in values])
+    except LuaError:
+        raise _concat_error(values)
+    if len(value) < ROPE_MIN:
+        return value
+    return LuaRope([value], len(value))
+
+def _concat_error(values):
+    # el error que daria a .. (b .. (c .. d)): primero el par de
+    # la derecha, despues los operandos de derecha a izquierda
+    n = len(values)
+    for i in [n - 2, n - 1] + list(range(n - 3, -1, -1)):
+        try:
+            _concat_operand(values[i])
+        except LuaError as e:
+            return e
+    return LuaError('attempt to concatenate')
+
+def lua_eq(a, b):
+    # sin atajo por identidad: 0/0 es siempre el mismo math.nan y
+    # nan == nan es falso
+    if a.__class__ is b.__class__:
+        return a == b
+    if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+        return a == b
+    if a.__class__ is LuaRope or b.__class__ is LuaRope:
+        return a == b
+    return False
+
+def _compare_error(a, b):
+    ta, tb = lua_type(a), lua_type(b)
+    if ta == tb:
+        return LuaError(f'attempt to compare two {ta} values')
+    return LuaError(f'attempt to compare {ta} with {tb}')
+
+def _strings(a, b):
+    '''
+    ({a}, {b}) as str if both are strings, else None.
+    '''
+    if a.__class__ is LuaRope:
+        a = str(a)
+    if b.__class__ is LuaRope:
+        b = str(b)
+    if a.__class__ is str and b.__class__ is str:
+        return a, b
+    return None
+
+def lua_lt(a, b):
+    if (a.__class__ in _NUMBERS and b.__class__ in _NUMBERS) or (a.__class__ is str and b.__class__ is str):
+        return a < b
+    pair = _strings(a, b)
+    if pair is not None:
+        return pair[0] < pair[1]
+    raise _compare_error(a, b)
+
+def lua_le(a, b):
+    if (a.__class__ in _NUMBERS and b.__class__ in _NUMBERS) or (a.__class__ is str and b.__class__ is str):
+        return a <= b
+    pair = _strings(a, b)
+    if pair is not None:
+        return pair[0] <= pair[1]
+    raise _compare_error(a, b)
+
+def lua_index(obj, key):
+    if isinstance(obj, LuaTable):
+        return obj.get(key)
+    if obj.__class__ is str or obj.__class__ is LuaRope:
+        return _string_lib.get(key)
+    raise LuaError(f"attempt to index a {lua_type(obj)} value")
+
+def lua_setindex(obj, key, value):
+    if isinstance(obj, LuaTable):
+        obj.set(key, value)
+    else:
+        raise LuaError(f"attempt to index a {lua_type(obj)} value")
+
+# Resultado de una llamada, en los tres motores y en la
+# biblioteca: una tupla con todos los valores, () si la funcion
+# no devuelve ninguno, o un solo valor que no es tupla (el caso
+# comun, sin crear la tupla). None es un nil, no "ningun valor":
+# 'return nil' y tonumber("x") devuelven None, y una funcion sin
+# 'return' devuelve ().
+NO_VALUES = ()
+
+def lua_call(fn, args):
+    '''
+    Calls {fn} with the list {args}. Returns a tuple with
+    every value the function returned.
+    '''
+    if not callable(fn):
+        raise LuaError(f"attempt to call a {lua_type(fn)} value")
+    r = fn(*args)
+    if r.__class__ is tuple:
+        return r
+    return (r,)
+
+def first(r):
+    '''
+    First value of a call result, as Lua does when a call
+    is used inside an expression.
+    '''
+    if r.__class__ is tuple:
+        return r[0] if r else None
+    return r
+
+def lua_add(a, b):
+    if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+        return a + b
+    return arith('+', a, b)
+
+def lua_sub(a, b):
+    if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+        return a - b
+    return arith('-', a, b)
+
+def lua_mul(a, b):
+    if a.__class__ in _NUMBERS and b.__class__ in _NUMBERS:
+        return a * b
+    return arith('*', a, b)
+
+def lua_gt(a, b):
+    return lua_lt(b, a)
+
+def lua_ge(a, b):
+    return lua_le(b, a)
+
+def values(r):
+    '''
+    Every value of a call result, as a tuple.
+    '''
+    if r.__class__ is tuple:
+        return r
+    return (r,)
+
+def adjust(vs, n):
+    '''
+    Exactly {n} values from {vs}, padding with nil.
+    '''
+    if len(vs) == n:
+        return vs
+    return (tuple(vs) + (None,) * n)[:n]
+
+def make_table(*pairs):
+    t = LuaTable()
+    for key, value in pairs:
+        t.set(key, value)
+    return t
+
+def make_array(*values):
+    '''
+    Table with {values} at the keys 1..n, built directly in the
+    array part (a constructor like {[1] = a, [2] = b}).
+    '''
+    return LuaTable(None, list(values))
+
+def _float_range(i, stop, step):
+    if step > 0:
+        while i <= stop:
+            yield i
+            i += step
+    else:
+        while i >= stop:
+            yield i
+            i += step
+
+def for_range(start, stop, step):
+    '''
+    Values taken by the variable of a numeric for.
+    '''
+    i = lua_tonumber(start)
+    stop = lua_tonumber(stop)
+    step = lua_tonumber(step)
+    if i is None:
+        raise LuaError("'for' initial value must be a number")
+    if stop is None:
+        raise LuaError("'for' limit must be a number")
+    if step is None:
+        raise LuaError("'for' step must be a number")
+    if i.__class__ is int and step.__class__ is int and step != 0 and math.isfinite(stop):
+        if step > 0:
+            return range(i, math.floor(stop) + 1, step)
+        return range(i, math.ceil(stop) - 1, step)
+    return _float_range(i, stop, step)
+
+def for_in(fn, state, control, n):
+    '''
+    Tuples of {n} values produced by the iterator of a generic for.
+    '''
+    if not callable(fn):
+        raise LuaError(f"attempt to call a {lua_type(fn)} value")
+    while True:
+        r = fn(state, control)
+        if r.__class__ is not tuple:
+            r = (r,)
+        if not r or r[0] is None:
+            return
+        control = r[0]
+        if len(r) != n:
+            r = (r + (None,) * n)[:n]
+        yield r
+
+# Limites de call_deep(): profundidad de la recursion de Python
+# y tamano de la pila del hilo que ejecuta el programa.
+RECURSION_LIMIT = 1_000_000
+STACK_SIZE = 1 << 30
+
+def call_deep(fn, *args):
+    '''
+    Calls {fn} in a thread with a STACK_SIZE stack and the
+    recursion limit raised to RECURSION_LIMIT, so deep (non-tail)
+    Lua recursion does not hit Python's default limit. Running
+    out of stack anyway raises LuaError('stack overflow').
+    '''
+    outcome = []
+    def target():
+        try:
+            outcome.append((True, fn(*args)))
+        except RecursionError:
+            outcome.append((False, LuaError('stack overflow')))
+        except BaseException as e:
+            outcome.append((False, e))
+
+    old_limit = sys.getrecursionlimit()
+    old_size = threading.stack_size()
+    sys.setrecursionlimit(RECURSION_LIMIT)
+    try:
+        threading.stack_size(STACK_SIZE)
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+    finally:
+        threading.stack_size(old_size)
+    try:
+        thread.join()
+    finally:
+        sys.setrecursionlimit(old_limit)
+    ok, value = outcome[0]
+    if not ok:
+        raise value
+    return value
+
+# ----------------------------------------
+# Biblioteca base
+# ----------------------------------------
+
+def _print(*args):
+    sys.stdout.write('\t'.join([lua_tostring(a) for a in args]) + '\n')
+    return NO_VALUES
+
+def _type(value=None, *rest):
+    return lua_type(value)
+
+def _tostring(value=None, *rest):
+    return lua_tostring(value)
+
+def _tonumber(value=None, base=None, *rest):
+    return lua_tonumber(value, base)
+
+def _next(table, key=None, *rest):
+    pair = table.next(key)
+    if pair is None:
+        return None
+    return pair
+
+def _pairs(table, *rest):
+    if not isinstance(table, LuaTable):
+        raise LuaError(f"bad argument #1 to 'pairs' (table expected, got {lua_type(table)})")
+    items = iter(table.items())
+    def iterator(state=None, control=None, *rest):
+        return next(items, None)
+    return iterator, table, None
+
+def _ipairs(table, *rest):
+    if not isinstance(table, LuaTable):
+        raise LuaError(f"bad argument #1 to 'ipairs' (table expected, got {lua_type(table)})")
+    def iterator(state, control, *rest):
+        control += 1
+        array = state.array
+        value = array[control - 1] if control <= len(array) else state.get(control)
+        if value is None:
+            return None
+        return control, value
+    return iterator, table, 0
+
+def _unpack(table, i=1, j=None, *rest):
+    if j is None:
+        j = table.length()
+    i, j = int(i), int(j)
+    if 0 < i and j <= len(table.array):
+        return tuple(table.array[i-1:j])
+    return tuple(table.get(k) for k in range(i, j + 1))
+
+def _select(n, *args):
+    if n == '#':
+        return len(args)
+    return tuple(args[int(n)-1:])
+
+def _error(message=None, *rest):
+    raise LuaError(lua_tostring(message))
+
+def _assert(value=None, message='assertion failed!', *rest):
+    if value is None or value is False:
+        raise LuaError(lua_tostring(message))
+    return (value, message) + rest
+
+def _rawget(table, key, *rest):
+    return table.get(key)
+
+def _rawset(table, key, value, *rest):
+    table.set(key, value)
+    return table
+
+_format_spec = re.compile(r'%([-+ #0]*\d*(?:\.\d+)?)([diouxXeEfgGqsc%])')
+
+def _format(fmt, *args):
+    args = list(args)
+    def convert(match):
+        flags, conv = match.groups()
+        if conv == '%':
+            return '%'
+        if not args:
+            raise LuaError("bad argument to 'format' (no value)")
+        value = args.pop(0)
+        if conv == 's':
+            return ('%' + flags + 's') % lua_tostring(value)
+        if conv == 'q':
+            return '"%s"' % lua_tostring(value).replace('\\', '\\\\').replace('"', '\\"')
+        if conv == 'c':
+            return chr(int(value))
+        number = lua_tonumber(value)
+        if number is None:
+            raise LuaError(f"bad argument to 'format' (number expected, got {lua_type(value)})")
+        if conv in 'diouxX':
+            number = int(number)
+            conv = 'd' if conv == 'i' or conv == 'u' else conv
+        return ('%' + flags + conv) % number
+    return _format_spec.sub(convert, fmt)
+
+def _random(m=None, n=None, *rest):
+    if m is None:
+        return random.random()
+    if n is None:
+        return random.randint(1, int(m))
+    return random.randint(int(m), int(n))
+
+def _randomseed(seed=None, *rest):
+    random.seed(seed)
+    return NO_VALUES
+
+def _write(*args):
+    for a in args:
+        sys.stdout.write(lua_tostring(a))
+    return NO_VALUES
+
+def _sub(s, i=1, j=-1, *rest):
+    n = len(s)
+    i, j = int(i), int(j)
+    if i < 0:
+        i = max(n + i + 1, 1)
+    elif i == 0:
+        i = 1
+    if j < 0:
+        j = n + j + 1
+    elif j > n:
+        j = n
+    return s[i-1:j]
+
+def _insert(table, *args):
+    if len(args) == 1:
+        table.set(table.length() + 1, args[0])
+    else:
+        pos, value = int(args[0]), args[1]
+        n = table.length()
+        array = table.array
+        if 0 < pos <= n < len(array):
+            # desplaza t[pos..n] de una vez, como los set() de abajo
+            array[pos:n+1] = array[pos-1:n]
+            array[pos-1] = value
+            return NO_VALUES
+        for k in range(n, pos - 1, -1):
+            table.set(k + 1, table.get(k))
+        table.set(pos, value)
+    return NO_VALUES
+
+def _remove(table, pos=None, *rest):
+    n = table.length()
+    if n == 0:
+        return NO_VALUES
+    pos = n if pos is None else int(pos)
+    array = table.array
+    if 0 < pos <= n <= len(array):
+        value = array[pos-1]
+        array[pos-1:n-1] = array[pos:n]
+        array[n-1] = None
+        return value
+    value = table.get(pos)
+    for k in range(pos, n):
+        table.set(k, table.get(k + 1))
+    table.set(n, None)
+    return value
+
+def _concat(table, sep='', i=1, j=None, *rest):
+    if j is None:
+        j = table.length()
+    i, j = int(i), int(j)
+    if 0 < i and j <= len(table.array):
+        return sep.join([lua_tostring(v) for v in table.array[i-1:j]])
+    return sep.join(lua_tostring(table.get(k)) for k in range(i, j + 1))
+
+# ----------------------------------------
+# Argumentos de la biblioteca
+#
+# Las funciones de la biblioteca no revisan sus argumentos: un
+# nil donde va un numero falla en Python (TypeError,
+# AttributeError...). _library() convierte ese error en el
+# LuaError de Lua ("bad argument #1 to 'floor' (number
+# expected, got nil)"), revisando los argumentos solo despues
+# del error. {kinds} tiene un caracter por argumento: n numero,
+# s string (o numero), t tabla; un '*' al final repite el
+# anterior para el resto de los argumentos.
+# ----------------------------------------
+
+_KINDS = {
+    'n': ('number', lambda v: v.__class__ in _NUMBERS),
+    's': ('string', lambda v: v.__class__ in (str, LuaRope, int, float)),
+    't': ('table', lambda v: isinstance(v, LuaTable)),
+}
+
+_ARGUMENT_ERRORS = (TypeError, AttributeError, ValueError, IndexError, OverflowError)
+
+def _bad_argument(name, kinds, args, error):
+    '''
+    LuaError for the call {name}({args}) that failed with {error}.
+    '''
+    rest = None
+    if kinds.endswith('*'):
+        kinds, rest = kinds[:-1], kinds[-2]
+    for i in range(max(len(kinds), len(args)) if rest else len(kinds)):
+        kind = kinds[i] if i < len(kinds) else rest
+        expected, check = _KINDS[kind]
+        if i >= len(args):
+            got = 'no value'
+        elif check(args[i]):
+            continue
+        else:
+            got = lua_type(args[i])
+        return LuaError(f"bad argument #{i+1} to '{name}' ({expected} expected, got {got})")
+    return LuaError(f"bad argument to '{name}' ({error})")
+
+def _library(name, fn, kinds):
+    '''
+    {fn} with the errors of bad arguments reported as LuaError.
+    '''
+    def call(*args):
+        try:
+            return fn(*args)
+        except _ARGUMENT_ERRORS as e:
+            raise _bad_argument(name, kinds, args, e) from None
+    return call
+
+def _string_function(name, fn, kinds='s'):
+    '''
+    {fn} with a first argument that is a LuaRope or a number
+    turned into a str, as Lua does, and the errors of bad
+    arguments reported as LuaError.
+    '''
+    def call(*args):
+        if args and args[0].__class__ is not str:
+            first = args[0]
+            if first.__class__ is LuaRope:
+                args = (str(first),) + args[1:]
+            elif first.__class__ in _NUMBERS:
+                args = (lua_tostring(first),) + args[1:]
+        try:
+            return fn(*args)
+        except _ARGUMENT_ERRORS as e:
+            raise _bad_argument(name, kinds, args, e) from None
+    return call
+
+_string_lib = {name: _string_function(name, fn, kinds) for name, (fn, kinds) in {
+    'format': (_format, 's'),
+    'len': (lambda s, *rest: len(s), 's'),
+    'sub': (_sub, 'snn'),
+    'upper': (lambda s, *rest: s.upper(), 's'),
+    'lower': (lambda s, *rest: s.lower(), 's'),
+    'rep': (lambda s, n, *rest: s * int(n), 'sn'),
+    'reverse': (lambda s, *rest: s[::-1], 's'),
+    'byte': (lambda s, i=1, *rest: ord(s[int(i)-1]), 'sn'),
+}.items()}
+_string_lib['char'] = _library('char', lambda *args: ''.join(chr(int(c)) for c in args), 'n*')
+
+def _math_lib():
+    functions = {
+        'abs': (lambda x, *rest: abs(x), 'n'),
+        'ceil': (lambda x, *rest: math.ceil(x), 'n'),
+        'floor': (lambda x, *rest: math.floor(x), 'n'),
+        'sqrt': (lambda x, *rest: math.sqrt(x) if x >= 0 else math.nan, 'n'),
+        'sin': (lambda x, *rest: math.sin(x), 'n'),
+        'cos': (lambda x, *rest: math.cos(x), 'n'),
+        'tan': (lambda x, *rest: math.tan(x), 'n'),
+        'exp': (lambda x, *rest: math.exp(x), 'n'),
+        'log': (lambda x, *rest: math.log(x) if x > 0 else -math.inf if x == 0 else math.nan, 'n'),
+        'fmod': (lambda x, y, *rest: math.fmod(x, y), 'nn'),
+        'pow': (lambda x, y, *rest: lua_pow(x, y), 'nn'),
+        'max': (lambda *args: max(args), 'n*'),
+        'min': (lambda *args: min(args), 'n*'),
+        'random': (_random, 'nn'),
+        'randomseed': (_randomseed, 'n'),
+    }
+    lib = {name: _library(name, fn, kinds) for name, (fn, kinds) in functions.items()}
+    lib['pi'] = math.pi
+    lib['huge'] = math.inf
+    return lib
+
+def make_globals():
+    '''
+    Global environment (_G) with the Lua base library.
+    '''
+    G = LuaTable()
+    env = {
+        'print': _print,
+        'type': _type,
+        'tostring': _tostring,
+        'tonumber': _tonumber,
+        'next': _library('next', _next, 't'),
+        'pairs': _pairs,
+        'ipairs': _ipairs,
+        'unpack': _library('unpack', _unpack, 'tnn'),
+        'select': _library('select', _select, 'n'),
+        'error': _error,
+        'assert': _assert,
+        'rawget': _library('rawget', _rawget, 't'),
+        'rawset': _library('rawset', _rawset, 't'),
+        'math': LuaTable(_math_lib()),
+        'string': LuaTable(dict(_string_lib)),
+        'table': LuaTable({
+            'insert': _library('insert', _insert, 't'),
+            'remove': _library('remove', _remove, 'tn'),
+            'concat': _library('concat', _concat, 'tsnn'),
+            'getn': _library('getn', lambda t, *rest: t.length(), 't'),
+            'unpack': _library('unpack', _unpack, 'tnn'),
+        }),
+        'io': LuaTable({'write': _write}),
+        'os': LuaTable({
+            'time': lambda *rest: int(time.time()),
+            'clock': lambda *rest: time.process_time(),
+        }),
+    }
+    for key, value in env.items():
+        G.set(key, value)
+    G.set('_G', G)
+    return G
@@ -0,0 +1,167 @@
+# ----------------------------------------
+# Instrumentacion opcional de las fases del compilador
+#
+# Mide el tiempo de pared y la memoria pico de cada fase
+# (lexer, parser, construccion del DOT, Graphviz) y cuenta
+# tokens, reducciones del parser LALR y los nodos alcanzables
+# desde la raiz del AST que resulta (no cuenta los nodos que se
+# crean y se descartan, p.ej. al recuperarse de un error de
+# sintaxis). Solo se usa cuando se pide (MiniLua --stats o la
+# API de este modulo); el camino normal no cambia.
+#
+#   stats = Stats()
+#   tokens = tokenize(source, stats)
+#   program = parse(tokens, stats)
+#   print(stats.to_json())
+# ----------------------------------------
+import copy
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import fields, is_dataclass
+from types import SimpleNamespace
+
+class Stats:
+    '''
+    Measurements of one compilation. {memory} turns on peak
+    memory tracking (tracemalloc), which slows the phases down.
+    '''
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.phases = {}
+        self.tokens = 0
+        self.reductions = 0
+        self.ast_nodes_reachable = 0
+        self.build_seconds = 0.0
+        self.peak_bytes = 0
+
+    @contextmanager
+    def phase(self, name):
+        started = False
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.phases.setdefault(name, {'seconds': 0.0})
+            record['seconds'] += time.perf_counter() - start
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                record['peak_bytes'] = max(record.get('peak_bytes', 0), peak)
+                self.peak_bytes = max(self.peak_bytes, peak)
+                if started:
+                    tracemalloc.stop()
+
+    def as_dict(self):
+        report = {
+            'phases': self.phases,
+            'total_seconds': sum(p['seconds'] for p in self.phases.values()),
+            'tokens': self.tokens,
+            'reductions': self.reductions,
+            'ast_nodes_reachable': self.ast_nodes_reachable,
+            'ast_build_seconds': self.build_seconds,
+        }
+        if self.memory:
+            report['peak_bytes'] = self.peak_bytes
+        return report
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent)
+
+def _counting_parser(stats):
+    '''
+    LuaParser with its own copy of the productions, whose
+    functions count the reductions and the time spent building
+    nodes into {stats}. The class and every other parser (in
+    other threads too) keep the plain functions.
+    '''
+    from Parser import LuaParser
+
+    clock = time.perf_counter
+
+    def wrap(func):
+        def counted(parser, p):
+            start = clock()
+            try:
+                return func(parser, p)
+            finally:
+                stats.reductions += 1
+                stats.build_seconds += clock() - start
+        return counted
+
+    productions = []
+    for p in LuaParser._grammar.Productions:
+        if p.func:
+            p = copy.copy(p)
+            p.func = wrap(p.func)
+        productions.append(p)
+    parser = LuaParser()
+    # sly lee self._grammar.Productions en cada parse()
+    parser._grammar = SimpleNamespace(Productions=productions)
+    return parser
+
+def count_nodes(root):
+    '''
+    Number of AST nodes reachable from {root}.
+    '''
+    from Parser import Node
+
+    count = 0
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, Node):
+            count += 1
+            if is_dataclass(item):
+                stack.extend(getattr(item, f.name) for f in fields(item))
+    return count
+
+def tokenize(source, stats):
+    '''
+    List of the tokens of {source}.
+    '''
+    from Lexer import LuaLexer
+
+    with stats.phase('lex'):
+        tokens = list(LuaLexer().tokenize(source))
+    stats.tokens += len(tokens)
+    return tokens
+
+def parse(tokens, stats):
+    '''
+    AST of the list {tokens}. The reductions and the nodes
+    reachable from the root of the AST are counted; the AST cache is not used, so the time is
+    real.
+    '''
+    parser = _counting_parser(stats)
+    with stats.phase('parse'):
+        program = parser.parse(iter(tokens))
+    if program is not None:
+        stats.ast_nodes_reachable += count_nodes(program)
+    return program
+
+def render(program, stats):
+    '''
+    ASTRender of {program}, with the DOT graph built.
+    '''
+    from Parser import ASTRender
+
+    with stats.phase('render'):
+        dot = ASTRender()
+        program.accept(dot)
+    return dot
+
+def view(dot, stats):
+    '''
+    Runs Graphviz on the graph of {dot} and opens the result.
+    '''
+    with stats.phase('graphviz'):
+        dot.dot.view()
@@ -0,0 +1,137 @@
+# ----------------------------------------
+# Tokenizacion por bloques de fuentes grandes
+#
+# Lee el archivo por bloques (de un mmap o de cualquier
+# objeto con read()) y entrega los tokens de LuaLexer a
+# medida que se producen. Lo que queda despues del ultimo
+# espacio de un bloque, o un comentario o cadena que no
+# termina dentro del bloque, se vuelve a tokenizar junto
+# con el bloque siguiente.
+# ----------------------------------------
+import codecs
+import io
+import mmap
+import re
+from Lexer import LuaLexer
+
+BLOCK_SIZE = 1 << 20
+
+_LONG_COMMENT = re.compile(r'--\[=*\[')
+
+class _Incomplete(Exception):
+    '''
+    The block ends inside a token; lexing restarts at {index}.
+    '''
+    def __init__(self, index, lineno):
+        self.index = index
+        self.lineno = lineno
+
+class ChunkLexer(LuaLexer):
+    '''
+    LuaLexer over one block of a larger source. Tokens that end
+    after {limit} are lexed again with the next block, so their
+    errors are not reported here.
+    '''
+    tokens = LuaLexer.tokens
+    limit = 0
+
+    @_(LuaLexer.ignore_comment_line)
+    def ignore_comment_line(self, t):
+        # '--' al final del bloque puede ser el inicio de '--[[', y un
+        # '--[[' sin cerrar puede cerrarse en el bloque siguiente.
+        if t.end >= len(self.text) or _LONG_COMMENT.match(t.value):
+            raise _Incomplete(t.index, t.lineno)
+
+    @_(LuaLexer.ignore_untermcomment.pattern)
+    def ignore_untermcomment(self, t):
+        raise _Incomplete(t.index, t.lineno)
+
+    @_(LuaLexer.STRING.pattern)
+    def STRING(self, t):
+        if t.end > self.limit:
+            return t
+        return LuaLexer.STRING(self, t)
+
+    def error(self, t):
+        # una comilla sin cerrar puede cerrarse en el bloque siguiente
+        if self.index > self.limit or t.value[0] in '\'"':
+            raise _Incomplete(self.index, self.lineno)
+        LuaLexer.error(self, t)
+
+def _blocks(file, block_size):
+    '''
+    Text blocks of {file}; bytes are decoded as UTF-8 (without
+    splitting a character between two blocks) and newlines are
+    translated as open() does in text mode, so offsets match.
+    '''
+    decoder = None
+    while True:
+        block = file.read(block_size)
+        if isinstance(block, bytes):
+            if decoder is None:
+                decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder('utf-8')(), True)
+            block = decoder.decode(block, final=not block)
+        if not block:
+            return
+        yield block
+
+def _last_space(text):
+    return max(text.rfind(' '), text.rfind('\t'), text.rfind('\r'), text.rfind('\n'))
+
+def _shift(tok, offset):
+    tok.index += offset
+    tok.end += offset
+    return tok
+
+def tokenize_stream(file, block_size=BLOCK_SIZE, diagnostics=None):
+    '''
+    Tokens of the Lua source read from {file} block by block. The
+    tokens are the same (type, value, lineno, index, end) that
+    LuaLexer().tokenize() gives for the whole text, and errors go
+    to {diagnostics} as LuaLexer(diagnostics) reports them.
+    '''
+    carry = ''
+    offset = 0
+    lineno = 1
+    # Un solo lexer para todos los bloques: sly guarda el texto en el
+    # lexer, y cada instancia queda en un ciclo de referencias.
+    lexer = ChunkLexer(diagnostics)
+    for block in _blocks(file, block_size):
+        text = carry + block
+        lexer.limit = _last_space(text)
+        cut = None
+        try:
+            for tok in lexer.tokenize(text, lineno):
+                if tok.end > lexer.limit:
+                    cut = (tok.index, tok.lineno)
+                    break
+                yield _shift(tok, offset)
+        except _Incomplete as e:
+            cut = (e.index, e.lineno)
+        if cut is None:
+            cut = (len(text), lexer.lineno)
+        index, lineno = cut
+        # solo la columna donde empieza el resto, no el texto de su
+        # linea: una linea sin fin no ocupa memoria
+        newline = text.rfind('\n', 0, index)
+        lexer.column0 = index - newline - 1 if newline >= 0 else lexer.column0 + index
+        carry = text[index:]
+        offset += index
+
+    tail = LuaLexer(diagnostics)
+    tail.column0 = lexer.column0
+    for tok in tail.tokenize(carry, lineno):
+        yield _shift(tok, offset)
+
+def tokenize_file(filename, block_size=BLOCK_SIZE, diagnostics=None):
+    '''
+    Tokens of the Lua file {filename}, read through mmap.
+    '''
+    with open(filename, 'rb') as file:
+        try:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # archivo vacio: no se puede mapear
+            return
+        with source:
+            yield from tokenize_stream(source, block_size, diagnostics)
@@ -0,0 +1,141 @@
+# ----------------------------------------
+# Render del AST en DOT, escrito a medida que se recorre
+#
+# ASTRender arma todo el grafo en un graphviz.Digraph antes de
+# escribirlo, y sus visit() para Expression y Statement ponen en
+# la etiqueta el repr de todo el subarbol (cuadratico en el
+# tamano del arbol). StreamRender usa los mismos visit() de
+# ASTRender, pero cada nodo y cada arista se escriben en el
+# archivo en cuanto se visitan, y ademas:
+#
+# - las etiquetas se cortan a {max_label} caracteres;
+# - los nodos sin visit() propio (Do, ...) se dibujan con el
+#   nombre de su clase y sus hijos, no con su repr;
+# - los subarboles a mas de {max_depth} niveles de la raiz se
+#   dibujan como un solo nodo con la cuenta de sus nodos;
+# - pasados {max_nodes} nodos, todo lo que falta va a un unico
+#   nodo final con la cuenta de lo que no se dibujo.
+#
+#   StreamRender.write(program, 'AST.gv', max_depth=20)
+# ----------------------------------------
+from Parser import ASTRender, Expression, Statement
+from Analysis import children, walk
+from Dispatch import Visitor
+
+# Largo maximo de una etiqueta
+LABEL_MAX = 60
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': ''})
+
+def _quote(text):
+    return '"' + text.translate(_ESCAPES) + '"'
+
+class DotWriter:
+    '''
+    The node() and edge() of graphviz.Digraph, writing each
+    line to {file} instead of keeping the graph.
+    '''
+    def __init__(self, file, max_label=LABEL_MAX):
+        self.file = file
+        self.max_label = max_label
+        self.sink = None        # nodo al que cada padre llega una sola vez
+        self.linked = set()
+
+    def begin(self, name, comment, node_attrs, edge_attrs):
+        self.file.write(f'// {comment}\ndigraph {name} {{\n')
+        self.file.write(f'\tnode{self._attrs(node_attrs)}\n')
+        if edge_attrs:
+            self.file.write(f'\tedge{self._attrs(edge_attrs)}\n')
+
+    def end(self):
+        self.file.write('}\n')
+
+    def node(self, name, label, **attrs):
+        if len(label) > self.max_label:
+            label = label[:self.max_label - 3] + '...'
+        attrs['label'] = label
+        self.file.write(f'\t{name}{self._attrs(attrs)}\n')
+
+    def edge(self, tail, head):
+        if head == self.sink:
+            if tail in self.linked:
+                return
+            self.linked.add(tail)
+        self.file.write(f'\t{tail} -> {head}\n')
+
+    @staticmethod
+    def _attrs(attrs):
+        return ' [' + ' '.join(f'{key}={_quote(str(value))}' for key, value in attrs.items()) + ']'
+
+class StreamRender(ASTRender):
+    '''
+    ASTRender that writes the DOT graph to {file} while it walks
+    the tree, in memory bounded by the depth of the tree.
+    '''
+    def __init__(self, file, max_label=LABEL_MAX, max_depth=None, max_nodes=None):
+        self.dot = DotWriter(file, max_label)
+        self.id = 0
+        self.depth = 0
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.rest = None        # nodo con lo que quedo fuera de max_nodes
+        self.omitted = 0
+
+    @classmethod
+    def write(cls, program, filename, **options):
+        '''
+        Writes the DOT graph of {program} to {filename}. Returns
+        the number of nodes drawn.
+        '''
+        with open(filename, 'w', encoding='utf-8') as file:
+            renderer = cls(file, **options)
+            renderer.dot.begin('AST', 'AST para MiniLua', cls._node_defaults, cls._edge_defaults)
+            program.accept(renderer)
+            renderer.finish()
+        return renderer.id
+
+    def finish(self):
+        if self.rest is not None:
+            self.dot.node(self.rest, f'... {self.omitted} more nodes', color='gray')
+        self.dot.end()
+
+    def collapsed(self, node):
+        '''
+        One node in place of the subtree {node}.
+        '''
+        size = sum(1 for _ in walk(node))
+        if self.max_nodes is not None and self.id >= self.max_nodes:
+            self.omitted += size
+            if self.rest is None:
+                self.rest = self.dot.sink = self._id()
+            return self.rest
+        name = self._id()
+        self.dot.node(name, f'{node.__class__.__name__}\n... {size} nodes', color='gray')
+        return name
+
+    def visit(self, node: Expression, type=''):
+        name = self._id()
+        self.dot.node(name, f'{type}{node.__class__.__name__}', color='orange')
+        for child in children(node):
+            self.dot.edge(name, self.visit(child))
+        return name
+
+    def visit(self, node: Statement, type=''):
+        name = self._id()
+        self.dot.node(name, f'{type}{node.__class__.__name__}', color='orange')
+        for child in children(node):
+            self.dot.edge(name, self.visit(child))
+        return name
+
+def _visit(self, node, *args, **kwargs):
+    if ((self.max_nodes is not None and self.id >= self.max_nodes)
+            or (self.max_depth is not None and self.depth >= self.max_depth)):
+        return self.collapsed(node)
+    self.depth += 1
+    try:
+        return Visitor.visit(self, node, *args, **kwargs)
+    finally:
+        self.depth -= 1
+
+# fuera del cuerpo de la clase, para que no cuente como una version
+StreamRender.visit = _visit
@@ -0,0 +1,116 @@
+# ----------------------------------------
+# Buffer compacto de tokens (struct-of-arrays)
+#
+# Guarda la salida de LuaLexer en arreglos paralelos: el tipo
+# de cada token como un entero pequeno, su posicion, largo y
+# linea, y un indice a una tabla donde cada valor distinto
+# (nombres, cadenas, numeros, palabras reservadas) se guarda
+# una sola vez.
+# ----------------------------------------
+from array import array
+from sly.lex import Token
+from Lexer import LuaLexer
+
+# Tipos de token en un orden fijo; el indice es el codigo.
+KINDS = sorted(LuaLexer.tokens) + list(LuaLexer.literals)
+_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+class TokenBuffer:
+    '''
+    Tokens stored column-wise. tokens() gives them back as sly
+    Tokens, one at a time, so LuaParser can consume the buffer:
+
+        LuaParser().parse(buffer.tokens())
+    '''
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('q')
+        self.lengths = array('I')
+        self.lines = array('I')
+        self.value_ids = array('I')
+        self.values = []
+        self._intern = {}
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        buffer = cls()
+        buffer.extend(tokens)
+        return buffer
+
+    @classmethod
+    def from_source(cls, source):
+        return cls.from_tokens(LuaLexer().tokenize(source))
+
+    def intern(self, value):
+        # 1, 1.0 y True son iguales como claves de un dict
+        key = (value.__class__, value)
+        vid = self._intern.get(key)
+        if vid is None:
+            vid = self._intern[key] = len(self.values)
+            self.values.append(value)
+        return vid
+
+    def append(self, tok):
+        self.kinds.append(_CODES[tok.type])
+        self.starts.append(tok.index)
+        self.lengths.append(tok.end - tok.index)
+        self.lines.append(tok.lineno)
+        self.value_ids.append(self.intern(tok.value))
+
+    def extend(self, tokens):
+        # Version de append() con las busquedas fuera del ciclo.
+        codes = _CODES
+        intern = self._intern
+        values = self.values
+        kinds = self.kinds.append
+        starts = self.starts.append
+        lengths = self.lengths.append
+        lines = self.lines.append
+        value_ids = self.value_ids.append
+        for tok in tokens:
+            value = tok.value
+            key = (value.__class__, value)
+            vid = intern.get(key)
+            if vid is None:
+                vid = intern[key] = len(values)
+                values.append(value)
+            kinds(codes[tok.type])
+            starts(tok.index)
+            lengths(tok.end - tok.index)
+            lines(tok.lineno)
+            value_ids(vid)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type(self, i):
+        return KINDS[self.kinds[i]]
+
+    def value(self, i):
+        return self.values[self.value_ids[i]]
+
+    def token(self, i):
+        tok = Token()
+        tok.type = KINDS[self.kinds[i]]
+        tok.value = self.values[self.value_ids[i]]
+        tok.lineno = self.lines[i]
+        tok.index = self.starts[i]
+        tok.end = tok.index + self.lengths[i]
+        return tok
+
+    def tokens(self):
+        '''
+        Iterator of sly Tokens, created on demand.
+        '''
+        kinds, values = KINDS, self.values
+        for code, start, length, line, vid in zip(self.kinds, self.starts, self.lengths,
+                                                 self.lines, self.value_ids):
+            tok = Token()
+            tok.type = kinds[code]
+            tok.value = values[vid]
+            tok.lineno = line
+            tok.index = start
+            tok.end = start + length
+            yield tok
+
+    __iter__ = tokens
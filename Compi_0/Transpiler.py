@@ -0,0 +1,553 @@
+# ----------------------------------------
+# Traductor de Lua a Python para MiniLua
+#
+# Genera codigo fuente de Python a partir del AST de
+# LuaParser y lo compila con compile(), asi los ciclos
+# y la aritmetica corren sobre el bytecode de CPython.
+# ----------------------------------------
+import re
+from Parser import (Number, Boolean, Name, Not, CallTable, Binop, CallFunction,
+                    Return, If)
+from Runtime import LuaError, lua_string_literal
+from Analysis import source_order, call_args, captured_names, array_fields, concat_operands
+
+_SIMPLE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*(\[0\])?$')
+
+_HELPERS = {
+    '+': 'lua_add', '-': 'lua_sub', '*': 'lua_mul', '/': 'lua_div',
+    '%': 'lua_mod', '^': 'lua_pow', '..': 'lua_concat', '==': 'lua_eq',
+    '<': 'lua_lt', '<=': 'lua_le', '>': 'lua_gt', '>=': 'lua_ge',
+}
+
+_COMPARISONS = ('==', '~=', '<', '<=', '>', '>=')
+
+class _Scope:
+    '''
+    Lua function being translated. Every Lua local becomes a
+    Python local with a unique name; locals used by inner
+    functions are kept in a cell ([value]) that the inner
+    function receives as a keyword-only default (_u0, _u1, ...).
+    '''
+    def __init__(self, parent, stmtlist):
+        self.parent = parent
+        self.blocks = [{}]
+        self.captured = captured_names(stmtlist)
+        self.upvals = {}
+        self.defaults = []
+        self.loops = 0
+
+    def lookup(self, name):
+        for block in reversed(self.blocks):
+            if name in block:
+                return block[name]
+        return None
+
+    def upvalue(self, name):
+        if name in self.upvals:
+            return self.upvals[name]
+        if self.parent is None:
+            return None
+        where = self.parent.lookup(name)
+        if where is not None:
+            source = where[0]
+        else:
+            source = self.parent.upvalue(name)
+            if source is None:
+                return None
+        param = f'_u{len(self.defaults)}'
+        self.upvals[name] = param
+        self.defaults.append((param, source))
+        return param
+
+class PythonGenerator:
+    '''
+    Translates a Program into the source of a Python module
+    that defines chunk(), the main chunk of the Lua program.
+    '''
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+        self.scope = None
+        self.counter = 0
+
+    def generate(self, program):
+        self.scope = _Scope(None, program.stmtlist)
+        self.emit('def chunk():')
+        self.indent += 1
+        self.block(program.stmtlist)
+        self.end_function(program.stmtlist)
+        self.indent -= 1
+        self.scope = None
+        return '\n'.join(self.lines) + '\n'
+
+    # ----------------------------------------
+    # Utilidades
+    # ----------------------------------------
+    def emit(self, text):
+        self.lines.append('    ' * self.indent + text)
+
+    def new_name(self, base):
+        self.counter += 1
+        return f'{base}_{self.counter}'
+
+    def temp(self):
+        self.counter += 1
+        return f'_t{self.counter}'
+
+    def capture(self, fn, *args):
+        '''
+        Runs fn(*args) collecting the lines it emits apart.
+        Returns (result, lines).
+        '''
+        saved = self.lines
+        self.lines = []
+        try:
+            result = fn(*args)
+            return result, self.lines
+        finally:
+            self.lines = saved
+
+    def declare(self, name):
+        py = self.new_name(name)
+        boxed = name in self.scope.captured
+        self.scope.blocks[-1][name] = (py, boxed)
+        return py, boxed
+
+    def load(self, name):
+        where = self.scope.lookup(name)
+        if where is not None:
+            py, boxed = where
+            return f'{py}[0]' if boxed else py
+        param = self.scope.upvalue(name)
+        if param is not None:
+            return f'{param}[0]'
+        return f'Gget({name!r})'
+
+    def store(self, name, value):
+        where = self.scope.lookup(name)
+        if where is not None:
+            py, boxed = where
+            self.emit(f'{py}[0] = {value}' if boxed else f'{py} = {value}')
+            return
+        param = self.scope.upvalue(name)
+        if param is not None:
+            self.emit(f'{param}[0] = {value}')
+            return
+        self.emit(f'Gset({name!r}, {value})')
+
+    def store_path(self, path, value):
+        parts = path.split('.')
+        if len(parts) == 1:
+            self.store(path, value)
+            return
+        table = self.path('.'.join(parts[:-1]))
+        self.emit(f'lua_setindex({table}, {parts[-1]!r}, {value})')
+
+    def path(self, path):
+        parts = path.split('.')
+        code = self.load(parts[0])
+        for key in parts[1:]:
+            code = f'lua_index({code}, {key!r})'
+        return code
+
+    # ----------------------------------------
+    # Expresiones
+    # ----------------------------------------
+    def expr(self, node):
+        method = getattr(self, 'expr_' + node.__class__.__name__, None)
+        if method is None:
+            raise LuaError(f'cannot translate {node.__class__.__name__}')
+        return method(node)
+
+    def expr_Number(self, node):
+        return repr(node.value) if node.value >= 0 else f'({node.value!r})'
+
+    def expr_String(self, node):
+        return repr(lua_string_literal(node.value))
+
+    def expr_Boolean(self, node):
+        return 'True' if node.value else 'False'
+
+    def expr_Nil(self, node):
+        return 'None'
+
+    def expr_Name(self, node):
+        return self.path(node.value)
+
+    expr_Var = expr_Name
+
+    def truth(self, node):
+        '''
+        Python condition that is true when {node} is not nil/false.
+        '''
+        if isinstance(node, Binop) and node.operator in _COMPARISONS:
+            return self.expr(node)
+        if isinstance(node, (Not, Boolean)):
+            return self.expr(node)
+        code = self.expr(node)
+        if _SIMPLE.match(code):
+            return f'({code} is not None and {code} is not False)'
+        t = self.temp()
+        return f'(({t} := {code}) is not None and {t} is not False)'
+
+    def expr_Not(self, node):
+        code = self.expr(node.value)
+        if _SIMPLE.match(code):
+            return f'({code} is None or {code} is False)'
+        t = self.temp()
+        return f'(({t} := {code}) is None or {t} is False)'
+
+    def expr_Table(self, node):
+        if not node.data:
+            return 'LuaTable()'
+        array = array_fields(node)
+        if array is not None:
+            return f'make_array({", ".join(self.expr(e) for e in array)})'
+        pairs = []
+        for data in source_order(node.data):
+            if isinstance(data.value, Name):
+                key = repr(data.value.value)
+            else:
+                key = self.expr(data.value)
+            pairs.append(f'({key}, {self.expr(data.exp)})')
+        return f'make_table({", ".join(pairs)})'
+
+    def expr_CallTable(self, node):
+        table = self.expr(node.table)
+        key = self.expr(node.field)
+        if _SIMPLE.match(table):
+            code = f'({table}.get({key}) if {table}.__class__ is LuaTable else lua_index({table}, {key}))'
+            if _SIMPLE.match(key):
+                # parte arreglo sin llamar a get()
+                code = (f'({table}.array[{key} - 1] if {table}.__class__ is LuaTable and {key}.__class__ is int'
+                        f' and 0 < {key} <= len({table}.array) else {code})')
+            return code
+        return f'lua_index({table}, {key})'
+
+    def expr_FunctionBody(self, node):
+        name = self.new_name('_function')
+        self.function(node, name)
+        return name
+
+    def expr_CallFunction(self, node):
+        return f'first({self.call(node)})'
+
+    def expr_Binop(self, node):
+        op = node.operator
+        if op == 'and' or op == 'or':
+            left = self.expr(node.left)
+            right = self.expr(node.right)
+            t = self.temp()
+            test = f'(({t} := {left}) is not None and {t} is not False)'
+            if op == 'and':
+                return f'({right} if {test} else {t})'
+            return f'({t} if {test} else {right})'
+        if op == '..':
+            operands = [self.expr(e) for e in concat_operands(node)]
+            if len(operands) == 2:
+                return f'lua_concat({operands[0]}, {operands[1]})'
+            return f'lua_concat_all({", ".join(operands)})'
+        a = self.expr(node.left)
+        b = self.expr(node.right)
+        a_num = isinstance(node.left, Number)
+        b_num = isinstance(node.right, Number)
+        a_simple = a_num or _SIMPLE.match(a)
+        b_simple = b_num or _SIMPLE.match(b)
+        if a_simple and b_simple:
+            checks = [f'{code}.__class__ in _N' for code, is_num in ((a, a_num), (b, b_num)) if not is_num]
+            if op in ('+', '-', '*', '<', '<=', '>', '>='):
+                if not checks:
+                    return f'({a} {op} {b})'
+                return f'({a} {op} {b} if {" and ".join(checks)} else {_HELPERS[op]}({a}, {b}))'
+            if op in ('==', '~=') and (a_num or b_num):
+                if not checks:
+                    return f'({a} {"==" if op == "==" else "!="} {b})'
+                if op == '==':
+                    return f'({checks[0]} and {a} == {b})'
+                return f'(not {checks[0]} or {a} != {b})'
+            if op == '==':
+                return f'({a} == {b} if {a}.__class__ is {b}.__class__ else lua_eq({a}, {b}))'
+            if op == '~=':
+                return f'({a} != {b} if {a}.__class__ is {b}.__class__ else not lua_eq({a}, {b}))'
+        if op == '~=':
+            return f'(not lua_eq({a}, {b}))'
+        if op not in _HELPERS:
+            raise LuaError(f'unknown operator {op}')
+        return f'{_HELPERS[op]}({a}, {b})'
+
+    def explist(self, nodes):
+        '''
+        Comma separated values of {nodes}, expanding a final call.
+        '''
+        codes = [self.expr(n) for n in nodes[:-1]]
+        if nodes:
+            last = nodes[-1]
+            if isinstance(last, CallFunction):
+                codes.append(f'*values({self.call(last)})')
+            else:
+                codes.append(self.expr(last))
+        return ', '.join(codes)
+
+    def adjusted(self, nodes, n):
+        '''
+        Expression for exactly {n} values of {nodes}, as a tuple.
+        '''
+        if len(nodes) == n and not (nodes and isinstance(nodes[-1], CallFunction)):
+            return f'({", ".join(self.expr(e) for e in nodes)},)'
+        return f'adjust(({self.explist(nodes)},), {n})' if nodes else f'({"None, " * n})'
+
+    def call(self, node):
+        fn = self.expr(node.value)
+        return f'{fn}({self.explist(call_args(node))})'
+
+    def function(self, node, pyname):
+        '''
+        Emits 'def pyname(...)' for a FunctionBody.
+        '''
+        scope = _Scope(self.scope, node.stmtlist)
+        self.scope = scope
+        params = [self.declare(p.value) for p in source_order(node.params)]
+        saved_lines, saved_indent = self.lines, self.indent
+        self.lines, self.indent = [], 1
+        for py, boxed in params:
+            if boxed:
+                self.emit(f'{py} = [{py}]')
+        self.block(node.stmtlist)
+        self.end_function(node.stmtlist)
+        body = self.lines
+        self.lines, self.indent = saved_lines, saved_indent
+        self.scope = scope.parent
+
+        signature = [f'{py}=None' for py, _ in params] + ['*_']
+        signature += [f'{param}={source}' for param, source in scope.defaults]
+        self.emit(f'def {pyname}({", ".join(signature)}):')
+        prefix = '    ' * self.indent
+        self.lines.extend(prefix + line for line in body)
+
+    # ----------------------------------------
+    # Statements
+    # ----------------------------------------
+    def stmt(self, node):
+        method = getattr(self, 'stmt_' + node.__class__.__name__, None)
+        if method is None:
+            raise LuaError(f'cannot translate {node.__class__.__name__}')
+        method(node)
+
+    def block(self, stmtlist, new_scope=True):
+        start = len(self.lines)
+        if new_scope:
+            self.scope.blocks.append({})
+        for stmt in stmtlist:
+            self.stmt(stmt)
+        if new_scope:
+            self.scope.blocks.pop()
+        if len(self.lines) == start:
+            self.emit('pass')
+
+    def stmt_Assignment(self, node):
+        targets = source_order(node.varlist)
+        exps = source_order(node.explist)
+        if node.local:
+            if len(targets) == 1 and len(exps) == 1:
+                value = self.expr(exps[0])
+                py, boxed = self.declare(targets[0].value)
+                self.emit(f'{py} = [{value}]' if boxed else f'{py} = {value}')
+                return
+            values = self.adjusted(exps, len(targets))
+            names = [self.declare(t.value) for t in targets]
+            self.emit(f'{", ".join(py for py, _ in names)}, = {values}')
+            for py, boxed in names:
+                if boxed:
+                    self.emit(f'{py} = [{py}]')
+            return
+        if len(targets) == 1 and len(exps) == 1:
+            self.assign(targets[0], self.expr(exps[0]))
+            return
+        temps = [self.temp() for _ in targets]
+        self.emit(f'{", ".join(temps)}, = {self.adjusted(exps, len(targets))}')
+        for target, t in zip(targets, temps):
+            self.assign(target, t)
+
+    def assign(self, target, value):
+        if isinstance(target, CallTable):
+            table = self.expr(target.field)
+            key = self.expr(target.table)
+            if _SIMPLE.match(table) and _SIMPLE.match(key):
+                # parte arreglo sin llamar a set()
+                self.emit(f'if {table}.__class__ is LuaTable and {key}.__class__ is int and 0 < {key} <= len({table}.array):')
+                self.emit(f'    {table}.array[{key} - 1] = {value}')
+                self.emit('else:')
+                self.emit(f'    {table}.set({key}, {value}) if {table}.__class__ is LuaTable else lua_setindex({table}, {key}, {value})')
+            elif _SIMPLE.match(table):
+                self.emit(f'{table}.set({key}, {value}) if {table}.__class__ is LuaTable else lua_setindex({table}, {key}, {value})')
+            else:
+                self.emit(f'lua_setindex({table}, {key}, {value})')
+            return
+        self.store_path(target.value, value)
+
+    def stmt_CallFunction(self, node):
+        self.emit(self.call(node))
+
+    def stmt_DefFunction(self, node):
+        function = node.function
+        name = function.value.value
+        if node.local:
+            py, boxed = self.declare(name)
+            if boxed:
+                self.emit(f'{py} = [None]')
+                pyname = self.new_name(name)
+                self.function(function.funcbody, pyname)
+                self.emit(f'{py}[0] = {pyname}')
+            else:
+                self.function(function.funcbody, py)
+            return
+        pyname = self.new_name(name.replace('.', '_'))
+        self.function(function.funcbody, pyname)
+        self.store_path(name, pyname)
+
+    def stmt_Do(self, node):
+        self.emit('if True:')
+        self.indent += 1
+        self.block(node.stmtlist)
+        self.indent -= 1
+
+    def loop_body(self, stmtlist):
+        self.scope.loops += 1
+        self.block(stmtlist)
+        self.scope.loops -= 1
+
+    def stmt_While(self, node):
+        self.indent += 1
+        cond, pre = self.capture(self.truth, node.cond)
+        self.indent -= 1
+        if not pre:
+            self.emit(f'while {cond}:')
+            self.indent += 1
+        else:
+            self.emit('while True:')
+            self.indent += 1
+            self.lines.extend(pre)
+            self.emit(f'if not {cond}:')
+            self.emit('    break')
+        self.loop_body(node.stmtlist)
+        self.indent -= 1
+
+    def stmt_If(self, node, keyword='if'):
+        self.emit(f'{keyword} {self.truth(node.cond)}:')
+        self.indent += 1
+        self.block(node.stmtlist)
+        self.indent -= 1
+        if not node.elsepart:
+            return
+        if len(node.elsepart) == 1 and isinstance(node.elsepart[0], If):
+            inner = node.elsepart[0]
+            # elseif: si la condicion necesita lineas previas
+            # se traduce como 'else:' con un if anidado.
+            self.indent += 1
+            cond, pre = self.capture(self.truth, inner.cond)
+            self.indent -= 1
+            if not pre:
+                self.stmt_If_tail(inner, cond)
+                return
+        self.emit('else:')
+        self.indent += 1
+        self.block(node.elsepart)
+        self.indent -= 1
+
+    def stmt_If_tail(self, node, cond):
+        '''
+        Emits an 'elif' whose condition has already been translated.
+        '''
+        self.emit(f'elif {cond}:')
+        self.indent += 1
+        self.block(node.stmtlist)
+        self.indent -= 1
+        if not node.elsepart:
+            return
+        if len(node.elsepart) == 1 and isinstance(node.elsepart[0], If):
+            inner = node.elsepart[0]
+            self.indent += 1
+            cond, pre = self.capture(self.truth, inner.cond)
+            self.indent -= 1
+            if not pre:
+                self.stmt_If_tail(inner, cond)
+                return
+        self.emit('else:')
+        self.indent += 1
+        self.block(node.elsepart)
+        self.indent -= 1
+
+    def stmt_Return(self, node):
+        exps = source_order(node.exprlist)
+        if not exps:
+            self.emit('return ()')
+        elif len(exps) == 1:
+            if isinstance(exps[0], CallFunction):
+                self.emit(f'return {self.call(exps[0])}')
+            else:
+                self.emit(f'return {self.expr(exps[0])}')
+        else:
+            self.emit(f'return ({self.explist(exps)},)')
+
+    def end_function(self, stmtlist):
+        # sin 'return' al final la funcion no devuelve valores; un
+        # 'return' de Python sin valor seria un nil (Runtime.NO_VALUES)
+        if not stmtlist or not isinstance(stmtlist[-1], Return):
+            self.emit('return ()')
+
+    def stmt_Break(self, node):
+        if not self.scope.loops:
+            raise LuaError('no loop to break')
+        self.emit('break')
+
+    def stmt_For(self, node):
+        start = self.expr(node.assign.explist[0])
+        limit = self.expr(node.limit)
+        step = self.expr(node.step)
+        self.scope.blocks.append({})
+        py, boxed = self.declare(node.assign.varlist[0].value)
+        self.emit(f'for {py} in for_range({start}, {limit}, {step}):')
+        self.indent += 1
+        if boxed:
+            self.emit(f'{py} = [{py}]')
+        self.loop_body(node.stmtlist)
+        self.indent -= 1
+        self.scope.blocks.pop()
+
+    def stmt_Forin(self, node):
+        exps = self.adjusted(source_order(node.exprlist), 3)
+        self.scope.blocks.append({})
+        names = [self.declare(n.value) for n in source_order(node.namelist)]
+        targets = ', '.join(py for py, _ in names)
+        self.emit(f'for {targets}, in for_in(*{exps}, {len(names)}):')
+        self.indent += 1
+        for py, boxed in names:
+            if boxed:
+                self.emit(f'{py} = [{py}]')
+        self.loop_body(node.stmtlist)
+        self.indent -= 1
+        self.scope.blocks.pop()
+
+def transpile(program):
+    '''
+    Python source equivalent to {program}.
+    '''
+    return PythonGenerator().generate(program)
+
+def compile_program(program, filename='<lua>'):
+    '''
+    Code object of the Python module generated for {program}.
+    The code is compiled as <lua:filename>: its line numbers are
+    those of the generated Python, not of the Lua file.
+    '''
+    if not filename.startswith('<'):
+        filename = f'<lua:{filename}>'
+    return compile(transpile(program), filename, 'exec')
+
+if __name__ == '__main__':
+    import sys
+    from Lexer import LuaLexer
+    from Parser import LuaParser
+
+    with open(sys.argv[1]) as file:
+        print(transpile(LuaParser().parse(LuaLexer().tokenize(file.read()))))
@@ -0,0 +1,292 @@
+# ----------------------------------------
+# Maquina virtual de registros para MiniLua
+#
+# Ejecuta los Proto generados por Bytecode.py con un
+# ciclo de despacho. Las llamadas entre funciones Lua
+# no usan la pila de Python: cada llamada agrega un
+# frame a la pila de la VM.
+# ----------------------------------------
+from Bytecode import (MOVE, LOADK, LOADNIL, GETGLOBAL, SETGLOBAL, GETUPVAL, SETUPVAL,
+                      GETCELL, SETCELL, BOX, GETTABLE, SETTABLE, NEWTABLE, ADD, SUB,
+                      MUL, DIV, MOD, POW, CONCAT, NOT, EQ, NE, LT, LE, JMP, JMPIF,
+                      JMPIFNOT, CALL, RETURN, FORPREP, FORLOOP, TFORLOOP, CLOSURE,
+                      CONCATN, compile_program)
+from Runtime import (LuaError, LuaTable, make_globals, lua_type,
+                     lua_tonumber, arith, lua_div, lua_mod, lua_pow,
+                     lua_concat, lua_concat_all, lua_eq, lua_lt, lua_le, lua_index,
+                     lua_setindex)
+
+_NUMBERS = (int, float)
+
+class LuaClosure:
+    '''
+    A Lua function at run time: its Proto plus captured upvalues.
+    Calling it from Python (e.g. from a library function) runs it
+    on the VM that created it.
+    '''
+    __slots__ = ('proto', 'upvals', 'vm')
+
+    def __init__(self, proto, upvals, vm):
+        self.proto = proto
+        self.upvals = upvals
+        self.vm = vm
+
+    def __call__(self, *args):
+        return self.vm.execute(self, args)
+
+    def __repr__(self):
+        return 'function: 0x%08x' % (id(self) & 0xffffffff)
+
+def _results(r):
+    if r.__class__ is tuple:
+        return list(r)
+    return [r]
+
+def _pack(values):
+    '''
+    Results of a Lua function, with the calling convention used by
+    Runtime: a single value or a tuple, () for no values.
+    '''
+    if not values:
+        return ()
+    if len(values) == 1:
+        return values[0]
+    return tuple(values)
+
+class VM:
+    def __init__(self, G=None):
+        self.G = make_globals() if G is None else G
+
+    def run(self, proto):
+        return self.execute(LuaClosure(proto, [], self), ())
+
+    def _frame(self, closure, args):
+        proto = closure.proto
+        R = list(args[:proto.nparams])
+        R.extend([None] * (proto.maxstack - len(R)))
+        return R
+
+    def execute(self, closure, args):
+        '''
+        Runs {closure} until it returns.
+        '''
+        G = self.G
+        gget = G.hash.get
+        gset = G.set
+        stack = []
+        cl = closure
+        proto = cl.proto
+        code = proto.code
+        K = proto.constants
+        U = cl.upvals
+        R = self._frame(cl, args)
+        pc = 0
+        top = 0
+        while True:
+            op = code[pc]
+            a = code[pc+1]
+            b = code[pc+2]
+            c = code[pc+3]
+            pc += 4
+            if op == MOVE:
+                R[a] = R[b]
+            elif op == LOADK:
+                R[a] = K[b]
+            elif op == GETTABLE:
+                t = R[b]
+                key = R[c] if c >= 0 else K[~c]
+                if t.__class__ is LuaTable:
+                    # parte arreglo sin llamar a get()
+                    if key.__class__ is int and 0 < key <= len(t.array):
+                        R[a] = t.array[key - 1]
+                    else:
+                        R[a] = t.get(key)
+                else:
+                    R[a] = lua_index(t, key)
+            elif op == ADD:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                if x.__class__ in _NUMBERS and y.__class__ in _NUMBERS:
+                    R[a] = x + y
+                else:
+                    R[a] = arith('+', x, y)
+            elif op == SUB:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                if x.__class__ in _NUMBERS and y.__class__ in _NUMBERS:
+                    R[a] = x - y
+                else:
+                    R[a] = arith('-', x, y)
+            elif op == JMPIFNOT:
+                x = R[a]
+                if x is None or x is False:
+                    pc = b
+            elif op == FORLOOP:
+                step = R[a+2]
+                i = R[a] + step
+                R[a] = i
+                if (i <= R[a+1]) if step > 0 else (i >= R[a+1]):
+                    R[a+3] = i
+                    pc = b
+            elif op == EQ:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                R[a] = x == y if x.__class__ is y.__class__ else lua_eq(x, y)
+            elif op == LT:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                if x.__class__ in _NUMBERS and y.__class__ in _NUMBERS:
+                    R[a] = x < y
+                else:
+                    R[a] = lua_lt(x, y)
+            elif op == LE:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                if x.__class__ in _NUMBERS and y.__class__ in _NUMBERS:
+                    R[a] = x <= y
+                else:
+                    R[a] = lua_le(x, y)
+            elif op == GETGLOBAL:
+                R[a] = gget(K[b])
+            elif op == SETTABLE:
+                t = R[a]
+                key = R[b] if b >= 0 else K[~b]
+                value = R[c] if c >= 0 else K[~c]
+                if t.__class__ is LuaTable:
+                    if key.__class__ is int and 0 < key <= len(t.array):
+                        t.array[key - 1] = value
+                    else:
+                        t.set(key, value)
+                else:
+                    lua_setindex(t, key, value)
+            elif op == CALL:
+                fn = R[a]
+                if b:
+                    fargs = R[a+1:a+b]
+                else:
+                    fargs = R[a+1:top]
+                if fn.__class__ is LuaClosure:
+                    stack.append((cl, R, pc, a, c))
+                    cl = fn
+                    proto = cl.proto
+                    code = proto.code
+                    K = proto.constants
+                    U = cl.upvals
+                    R = self._frame(cl, fargs)
+                    pc = 0
+                    continue
+                if not callable(fn):
+                    raise LuaError(f'attempt to call a {lua_type(fn)} value')
+                results = _results(fn(*fargs))
+                if c == 0:
+                    R[a:a+len(results)] = results
+                    top = a + len(results)
+                elif c == 2:
+                    R[a] = results[0] if results else None
+                else:
+                    for i in range(c - 1):
+                        R[a+i] = results[i] if i < len(results) else None
+            elif op == RETURN:
+                if b == 0:
+                    results = R[a:top]
+                else:
+                    results = R[a:a+b-1]
+                if not stack:
+                    return _pack(results)
+                cl, R, pc, a, c = stack.pop()
+                proto = cl.proto
+                code = proto.code
+                K = proto.constants
+                U = cl.upvals
+                if c == 0:
+                    R[a:a+len(results)] = results
+                    top = a + len(results)
+                elif c == 2:
+                    R[a] = results[0] if results else None
+                else:
+                    for i in range(c - 1):
+                        R[a+i] = results[i] if i < len(results) else None
+            elif op == JMP:
+                pc = b
+            elif op == JMPIF:
+                x = R[a]
+                if x is not None and x is not False:
+                    pc = b
+            elif op == MUL:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                if x.__class__ in _NUMBERS and y.__class__ in _NUMBERS:
+                    R[a] = x * y
+                else:
+                    R[a] = arith('*', x, y)
+            elif op == DIV:
+                R[a] = lua_div(R[b] if b >= 0 else K[~b], R[c] if c >= 0 else K[~c])
+            elif op == MOD:
+                R[a] = lua_mod(R[b] if b >= 0 else K[~b], R[c] if c >= 0 else K[~c])
+            elif op == POW:
+                R[a] = lua_pow(R[b] if b >= 0 else K[~b], R[c] if c >= 0 else K[~c])
+            elif op == CONCAT:
+                R[a] = lua_concat(R[b] if b >= 0 else K[~b], R[c] if c >= 0 else K[~c])
+            elif op == CONCATN:
+                R[a] = lua_concat_all(*R[b:b+c])
+            elif op == NE:
+                x = R[b] if b >= 0 else K[~b]
+                y = R[c] if c >= 0 else K[~c]
+                R[a] = x != y if x.__class__ is y.__class__ else not lua_eq(x, y)
+            elif op == NOT:
+                x = R[b]
+                R[a] = x is None or x is False
+            elif op == GETUPVAL:
+                R[a] = U[b][0]
+            elif op == SETUPVAL:
+                U[b][0] = R[a]
+            elif op == GETCELL:
+                R[a] = R[b][0]
+            elif op == SETCELL:
+                R[a][0] = R[b]
+            elif op == BOX:
+                R[a] = [R[a]]
+            elif op == SETGLOBAL:
+                gset(K[b], R[a])
+            elif op == LOADNIL:
+                for i in range(a, a + b):
+                    R[i] = None
+            elif op == NEWTABLE:
+                R[a] = LuaTable()
+            elif op == FORPREP:
+                init = lua_tonumber(R[a])
+                limit = lua_tonumber(R[a+1])
+                step = lua_tonumber(R[a+2])
+                if init is None:
+                    raise LuaError("'for' initial value must be a number")
+                if limit is None:
+                    raise LuaError("'for' limit must be a number")
+                if step is None:
+                    raise LuaError("'for' step must be a number")
+                R[a] = init - step
+                R[a+1] = limit
+                R[a+2] = step
+                pc = b
+            elif op == TFORLOOP:
+                fn = R[a]
+                if not callable(fn):
+                    raise LuaError(f'attempt to call a {lua_type(fn)} value')
+                results = _results(fn(R[a+1], R[a+2]))
+                for i in range(c):
+                    R[a+3+i] = results[i] if i < len(results) else None
+                if R[a+3] is not None:
+                    R[a+2] = R[a+3]
+                    pc = b
+            elif op == CLOSURE:
+                child = proto.protos[b]
+                upvals = [R[index] if instack else U[index]
+                          for instack, index in child.upvals]
+                R[a] = LuaClosure(child, upvals, self)
+            else:
+                raise LuaError(f'bad opcode {op}')
+
+def run(program, G=None):
+    '''
+    Compiles {program} to bytecode and runs it on a new VM.
+    '''
+    return VM(G).run(compile_program(program))
@@ -0,0 +1,288 @@
+# ----------------------------------------
+# Vectorizacion de for numericos con NumPy
+#
+# Un for cuyo cuerpo solo tiene asignaciones t[i] = exp, donde
+# exp combina con + - * / lecturas a[i], la variable i, numeros
+# y variables que el cuerpo no cambia, se puede correr como
+# operaciones de NumPy sobre la parte arreglo de las tablas:
+# cada iteracion solo toca el indice i, asi que hacer cada
+# sentencia de una vez para todos los indices da lo mismo que
+# hacerlas iteracion por iteracion.
+#
+#   for i = 1, 100 do secrets[i] = i; end;
+#   for i = 1, n do t[i] = a[i] * k + b[i]; end;
+#
+# match() reconoce el patron al compilar. VectorLoop.run()
+# revisa al ejecutar que los valores lo permitan (tablas con
+# esos indices en la parte arreglo, numeros de un solo tipo por
+# tabla, enteros que no desbordan int64, divisores distintos de
+# cero); si no, devuelve False sin haber cambiado nada y el
+# interprete corre el ciclo normal. NumPy es opcional: se
+# importa la primera vez que corre un ciclo y, si no esta
+# instalado, todos los ciclos van por el camino normal.
+# ----------------------------------------
+from Parser import Number, Name, Var, CallTable, Binop, Assignment
+from Runtime import LuaTable
+from Analysis import source_order
+
+# Iteraciones desde las que conviene: en ciclos mas cortos
+# cuesta mas convertir a arreglos de NumPy que correr el ciclo.
+VECTOR_MIN = 32
+
+OPERATORS = ('+', '-', '*', '/')
+
+# Los enteros de Python no desbordan; los de NumPy son int64.
+_INT_MAX = 2 ** 63 - 1
+# Enteros que pasan a float sin redondeo (para /)
+_EXACT_MAX = 2 ** 53
+
+_np = None
+
+def numpy():
+    '''
+    The numpy module, imported on first use; None if it is not
+    installed.
+    '''
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            _np = False
+        else:
+            _np = numpy
+    return _np or None
+
+class _Pattern(Exception):
+    pass
+
+class _Fallback(Exception):
+    pass
+
+class VectorLoop:
+    '''
+    Body of a numeric for in the vectorizable form. {names} are
+    the tables and scalar variables it reads or writes, in the
+    order of the ('name', index) leaves of {stmts}, a list of
+    (index of the table, expression tree) assignments.
+    '''
+    def __init__(self, var):
+        self.var = var
+        self.names = []
+        self.stmts = []
+
+    def name(self, node):
+        if node.value == self.var:
+            raise _Pattern()
+        if node.value not in self.names:
+            self.names.append(node.value)
+        return self.names.index(node.value)
+
+    def expr(self, node):
+        '''
+        Expression tree of {node}:
+            ('const', value)        numero
+            ('var',)                la variable del for
+            ('name', index)         variable que no cambia en el ciclo
+            ('read', index)         tabla[variable del for]
+            ('op', op, left, right)
+        '''
+        cls = node.__class__
+        if cls is Number:
+            return ('const', node.value)
+        if cls is Name or cls is Var:
+            if node.value == self.var:
+                return ('var',)
+            return ('name', self.name(node))
+        if cls is CallTable:
+            # como valor, field es la clave y table la tabla
+            if self.index(node.field) and node.table.__class__ in (Name, Var):
+                return ('read', self.name(node.table))
+            raise _Pattern()
+        if cls is Binop and node.operator in OPERATORS:
+            return ('op', node.operator, self.expr(node.left), self.expr(node.right))
+        raise _Pattern()
+
+    def index(self, node):
+        return node.__class__ in (Name, Var) and node.value == self.var
+
+    def stmt(self, node):
+        if node.__class__ is not Assignment or node.local:
+            raise _Pattern()
+        targets = source_order(node.varlist)
+        exps = source_order(node.explist)
+        if len(targets) != 1 or len(exps) != 1:
+            raise _Pattern()
+        target = targets[0]
+        # como destino, field es la tabla y table la clave
+        if (target.__class__ is not CallTable or not self.index(target.table)
+                or target.field.__class__ not in (Name, Var)):
+            raise _Pattern()
+        value = self.expr(exps[0])
+        self.stmts.append((self.name(target.field), value))
+
+    def run(self, r, values):
+        '''
+        Runs the loop over the range {r}, with {values} the values
+        of self.names. Returns False, without changing anything,
+        if NumPy is missing or the values do not fit the pattern.
+        '''
+        if len(r) < VECTOR_MIN or r.start < 1 or r[-1] < 1:
+            return False
+        np = numpy()
+        if np is None:
+            return False
+        # los indices en orden ascendente: el orden no cambia el resultado
+        lo, hi, step = min(r.start, r[-1]), max(r.start, r[-1]), abs(r.step)
+        try:
+            with np.errstate(all='ignore'):
+                columns, written = _Evaluation(np, lo, hi, step, values).run(self.stmts)
+        except _Fallback:
+            return False
+        # dos nombres pueden ser la misma tabla
+        tables = list({id(values[index]): values[index] for index in written}.values())
+        if not all(_storable(table, lo, hi, r.step) for table in tables):
+            return False
+        for table in tables:
+            column = columns[id(table)][0].tolist()
+            if hi <= len(table.array):
+                table.array[lo - 1:hi:step] = column
+            else:
+                table.set_range(lo, column)
+        return True
+
+def match(node):
+    '''
+    VectorLoop for the For {node}, or None if its body is not in
+    the vectorizable form.
+    '''
+    if not node.stmtlist:
+        return None
+    loop = VectorLoop(node.assign.varlist[0].value)
+    try:
+        for stmt in node.stmtlist:
+            loop.stmt(stmt)
+    except _Pattern:
+        return None
+    return loop
+
+class _Evaluation:
+    '''
+    One run of a VectorLoop over the indices lo, lo + step, ...
+    up to {hi}. {columns} maps id(table) to the (values,
+    kind, bound) of that table at those indices, with the writes
+    of the statements already run.
+    '''
+    def __init__(self, np, lo, hi, step, values):
+        self.np = np
+        self.values = values
+        self.lo, self.hi, self.step = lo, hi, step
+        self.columns = {}
+
+    def run(self, stmts):
+        written = []
+        for index, tree in stmts:
+            table = self.values[index]
+            if table.__class__ is not LuaTable:
+                raise _Fallback()
+            value, kind, bound = self.eval(tree)
+            if value.__class__ is not self.np.ndarray:
+                value = self.np.full(len(range(self.lo, self.hi + 1, self.step)), value)
+            self.columns[id(table)] = (value, kind, bound)
+            if index not in written:
+                written.append(index)
+        return self.columns, written
+
+    def eval(self, tree):
+        '''
+        (value, kind, bound) of {tree}: a NumPy array or a Python
+        number, int or float, and for ints a bound of the absolute
+        value.
+        '''
+        what = tree[0]
+        if what == 'op':
+            return self.op(tree[1], self.eval(tree[2]), self.eval(tree[3]))
+        if what == 'var':
+            return (self.np.arange(self.lo, self.hi + 1, self.step, dtype=self.np.int64),
+                    int, self.hi)
+        if what == 'const':
+            return _scalar(tree[1])
+        if what == 'name':
+            return _scalar(self.values[tree[1]])
+        return self.read(self.values[tree[1]])
+
+    def read(self, table):
+        if table.__class__ is not LuaTable:
+            raise _Fallback()
+        column = self.columns.get(id(table))
+        if column is not None:
+            return column
+        array = table.array
+        if self.hi > len(array):
+            raise _Fallback()
+        items = array[self.lo - 1:self.hi:self.step]
+        kinds = set(map(type, items))
+        np = self.np
+        if kinds == {int}:
+            try:
+                value = np.array(items, dtype=np.int64)
+            except OverflowError:
+                raise _Fallback()
+            column = (value, int, max(int(value.max()), -int(value.min())))
+        elif kinds == {float}:
+            column = (np.array(items, dtype=np.float64), float, None)
+        else:
+            # nil, strings (que Lua convierte), booleanos o tipos mezclados
+            raise _Fallback()
+        self.columns[id(table)] = column
+        return column
+
+    def op(self, op, left, right):
+        a, kind_a, bound_a = left
+        b, kind_b, bound_b = right
+        if op == '/':
+            if kind_a is int and bound_a > _EXACT_MAX or kind_b is int and bound_b > _EXACT_MAX:
+                raise _Fallback()
+            # lua_div da inf o nan al dividir por cero, con el signo del dividendo
+            if (b == 0).any() if b.__class__ is self.np.ndarray else b == 0:
+                raise _Fallback()
+            if b.__class__ is not self.np.ndarray and a.__class__ is not self.np.ndarray:
+                return a / b, float, None
+            return self.np.true_divide(a, b, dtype=self.np.float64), float, None
+        if kind_a is int and kind_b is int:
+            bound = bound_a * bound_b if op == '*' else bound_a + bound_b
+            if bound > _INT_MAX:
+                raise _Fallback()
+        else:
+            bound = None
+        if op == '+':
+            value = a + b
+        elif op == '-':
+            value = a - b
+        else:
+            value = a * b
+        return value, int if bound is not None else float, bound
+
+def _scalar(value):
+    cls = value.__class__
+    if cls is int:
+        if abs(value) > _INT_MAX:
+            raise _Fallback()
+        return value, int, abs(value)
+    if cls is float:
+        return value, float, None
+    raise _Fallback()
+
+def _storable(table, lo, hi, step):
+    '''
+    True if writing the indices lo..hi of {table} at once leaves
+    it as the loop would: they are in the array part, or the
+    loop goes up by 1 and they continue it (LuaTable.set_range). Otherwise set() may move
+    keys between the hash and the array part depending on how
+    many times each one is written, which changes pairs().
+    '''
+    array = table.array
+    if hi <= len(array):
+        return True
+    return (step == 1 and lo <= len(array) + 1 and None not in array[:lo - 1]
+            and not any(k.__class__ is int for k in table.hash))